@@ -0,0 +1,48 @@
+"""Initial chat history schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created before migrations existed already have these tables
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'sessions' not in existing:
+        op.create_table(
+            'sessions',
+            sa.Column('id', sa.String(), nullable=False),
+            sa.Column('store_url', sa.String(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_active', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if 'messages' not in existing:
+        op.create_table(
+            'messages',
+            sa.Column('id', sa.String(), nullable=False),
+            sa.Column('session_id', sa.String(), nullable=False),
+            sa.Column('role', sa.String(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['session_id'], ['sessions.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('messages')
+    op.drop_table('sessions')
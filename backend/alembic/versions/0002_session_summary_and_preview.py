@@ -0,0 +1,39 @@
+"""Rolling history summary and sidebar preview on sessions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    sa.Column('history_summary', sa.Text(), nullable=True),
+    sa.Column('summarized_through', sa.DateTime(), nullable=True),
+    sa.Column('preview', sa.String(length=40), nullable=True),
+]
+
+
+def upgrade() -> None:
+    # Earlier create_all-based startups may have added some of them already
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('sessions')}
+    with op.batch_alter_table('sessions') as batch:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sessions') as batch:
+        for column in reversed(COLUMNS):
+            batch.drop_column(column.name)
@@ -0,0 +1,37 @@
+"""Composite indexes for the history window and the session list
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # Last N messages of a session (ORDER BY timestamp DESC LIMIT) and its first question
+    ('ix_messages_session_id_timestamp', 'messages', ['session_id', 'timestamp']),
+    # Keyset pages of the session list (ORDER BY last_active DESC, id DESC)
+    ('ix_sessions_last_active_id', 'sessions', ['last_active', 'id']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any
+
+from app.utils.money import to_cents
+
+# Order-level columns produced by build_orders_frame (kept stable for ShopifyService callers);
+# build_orders_frame also adds total_price_cents
+ORDER_COLUMNS = ['id', 'created_at', 'total_price', 'customer_id', 'email', 'city', 'line_items']
+
+# Line-item attributes carried into the exploded frame
+LINE_ITEM_FIELDS = ['title', 'quantity', 'price', 'product_id', 'variant_id']
+LINE_ITEM_COLUMNS = ['order_id', 'created_at', 'city', 'customer_id'] + LINE_ITEM_FIELDS
+
+
+def _order_row(order: Dict[str, Any]) -> tuple:
+    customer = order.get('customer') or {}
+    address = order.get('billing_address') or {}
+    return (
+        order.get('id'),
+        order.get('created_at'),
+        order.get('total_price'),
+        customer.get('id'),
+        customer.get('email'),
+        address.get('city'),
+        order.get('line_items') or [],
+    )
+
+
+def build_orders_frame(orders: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the order-level frame in a single pass over the raw records.
+    Only the needed fields are pulled out of each dict; type conversion is
+    done column-wise (UTC datetimes, float prices) instead of per order.
+    """
+    if not orders:
+        return pd.DataFrame()
+
+    df = pd.DataFrame.from_records([_order_row(order) for order in orders], columns=ORDER_COLUMNS)
+    df['created_at'] = pd.to_datetime(df['created_at'], utc=True, errors='coerce', format='ISO8601')
+    # Exact integer cents for aggregation; the float column is kept for display/REPL code
+    df['total_price_cents'] = to_cents(df['total_price'])
+    df['total_price'] = df['total_price_cents'] / 100
+    df['city'] = df['city'].fillna('Unknown')
+    return df
+
+
+def build_line_items_frame(orders_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explode the nested line_items column into one row per line item,
+    carrying the order keys needed for grouping (created_at, city, customer).
+    """
+    if orders_df.empty or 'line_items' not in orders_df.columns:
+        return pd.DataFrame(columns=LINE_ITEM_COLUMNS)
+
+    # Explode by offsets: one pass collects the needed line-item keys, and the
+    # order-level columns are broadcast with np.repeat instead of per-row copies
+    item_lists = [items if isinstance(items, list) else [] for items in orders_df['line_items'].tolist()]
+    counts = np.fromiter((len(items) for items in item_lists), dtype=np.int64, count=len(item_lists))
+    if not counts.sum():
+        return pd.DataFrame(columns=LINE_ITEM_COLUMNS)
+
+    items = pd.DataFrame.from_records(
+        [tuple(item.get(key) for key in LINE_ITEM_FIELDS) for order_items in item_lists for item in order_items],
+        columns=LINE_ITEM_FIELDS
+    )
+    positions = np.repeat(np.arange(len(item_lists)), counts)
+    order_columns = orders_df[['id', 'created_at', 'city', 'customer_id']].iloc[positions].reset_index(drop=True)
+    items = pd.concat([order_columns.rename(columns={'id': 'order_id'}), items], axis=1)
+
+    items['title'] = items['title'].fillna('Unknown Product')
+    items['quantity'] = pd.to_numeric(items['quantity'], errors='coerce').fillna(0).astype('int64')
+    items['price_cents'] = to_cents(items['price'])
+    items['price'] = items['price_cents'] / 100
+    items['revenue_cents'] = items['price_cents'] * items['quantity']
+    return items
+
+
+def render_markdown_table(df: pd.DataFrame, headers: List[str]) -> str:
+    """
+    Render a DataFrame as a Markdown table. Rows are assembled with
+    column-wise string concatenation rather than a Python loop per row.
+    """
+    if df.empty:
+        return "No data to display."
+
+    cells = df.astype(str)
+    rows = "| " + cells.iloc[:, 0]
+    for column in cells.columns[1:]:
+        rows = rows + " | " + cells[column]
+    rows = rows + " |"
+
+    header = f"| {' | '.join(headers)} |\n"
+    separator = f"| {' | '.join(['---'] * len(headers))} |\n"
+    return header + separator + "\n".join(rows.tolist()) + "\n"
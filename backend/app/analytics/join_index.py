@@ -0,0 +1,94 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+def normalize_title(value: Any) -> str:
+    """Case- and whitespace-insensitive title key ('  Wool  HAT' -> 'wool hat')."""
+    return " ".join(str(value).casefold().split()) if value else ""
+
+
+def normalize_email(value: Any) -> str:
+    return str(value).strip().casefold() if value else ""
+
+
+class JoinIndex:
+    """
+    Hash indexes for enriching orders in O(1) per row instead of scanning
+    the product or customer list for every line item.
+
+    - Products by variant_id, product_id and normalized title. Line items
+      often have no product_id, so lookups fall back from the most to the
+      least specific key.
+    - Customers by id and normalized email.
+    """
+
+    def __init__(self, products: Iterable[Any] = (), customers: Iterable[Any] = ()):
+        self.products_by_variant: Dict[Any, Mapping] = {}
+        self.products_by_id: Dict[Any, Mapping] = {}
+        self.products_by_title: Dict[str, Mapping] = {}
+        self.customers_by_id: Dict[Any, Mapping] = {}
+        self.customers_by_email: Dict[str, Mapping] = {}
+
+        for product in products or ():
+            if not isinstance(product, Mapping):
+                continue
+            if product.get('id') is not None:
+                self.products_by_id[product['id']] = product
+            for variant in product.get('variants') or []:
+                if isinstance(variant, Mapping) and variant.get('id') is not None:
+                    self.products_by_variant[variant['id']] = product
+            title = normalize_title(product.get('title'))
+            if title:
+                # First product wins on duplicate titles, like a left join on the catalogue order
+                self.products_by_title.setdefault(title, product)
+
+        for customer in customers or ():
+            if not isinstance(customer, Mapping):
+                continue
+            if customer.get('id') is not None:
+                self.customers_by_id[customer['id']] = customer
+            email = normalize_email(customer.get('email'))
+            if email:
+                self.customers_by_email.setdefault(email, customer)
+
+    def product_for(self, line_item: Mapping) -> Optional[Mapping]:
+        """Catalogue product of a line item: variant_id, then product_id, then title."""
+        variant_id = line_item.get('variant_id')
+        if variant_id is not None and variant_id in self.products_by_variant:
+            return self.products_by_variant[variant_id]
+        product_id = line_item.get('product_id')
+        if product_id is not None and product_id in self.products_by_id:
+            return self.products_by_id[product_id]
+        return self.products_by_title.get(normalize_title(line_item.get('title')))
+
+    def customer_for(self, order: Mapping) -> Optional[Mapping]:
+        """Customer record of an order (or of an embedded customer reference): id, then email."""
+        customer = order.get('customer') if isinstance(order.get('customer'), Mapping) else order
+        customer_id = customer.get('id')
+        if customer_id is not None and customer_id in self.customers_by_id:
+            return self.customers_by_id[customer_id]
+        email = normalize_email(customer.get('email') or order.get('email'))
+        return self.customers_by_email.get(email) if email else None
+
+    def line_items_frame(self, orders: Iterable[Any]) -> pd.DataFrame:
+        """One row per line item, enriched with its product and customer in a single pass."""
+        rows: List[tuple] = []
+        for order in orders or ():
+            if not isinstance(order, Mapping):
+                continue
+            customer = self.customer_for(order) or {}
+            customer_name = " ".join(filter(None, [customer.get('first_name'), customer.get('last_name')])) or None
+            for item in order.get('line_items') or []:
+                product = self.product_for(item) or {}
+                rows.append((
+                    order.get('id'), item.get('title'), item.get('quantity') or 0, item.get('price'),
+                    product.get('id'), product.get('product_type'), product.get('vendor'),
+                    customer.get('id'), customer_name
+                ))
+        return pd.DataFrame(rows, columns=[
+            'order_id', 'title', 'quantity', 'price',
+            'product_id', 'product_type', 'vendor',
+            'customer_id', 'customer_name'
+        ])
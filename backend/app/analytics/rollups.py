@@ -0,0 +1,227 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.analytics.snapshot import MISSING, MISSING_TIME, ColumnarSnapshot
+from app.utils.money import to_cents
+
+# Measures and the dimensions they can be grouped by
+ORDER_MEASURES = {'orders', 'revenue_cents'}
+ITEM_MEASURES = {'units', 'item_revenue_cents'}
+ORDER_DIMENSIONS = {'day', 'city', 'customer'}
+ITEM_DIMENSIONS = {'day', 'city', 'product'}
+
+# Cell layouts: order cells are [orders, revenue_cents], item cells [units, item_revenue_cents]
+_MEASURE_INDEX = {'orders': 0, 'revenue_cents': 1, 'units': 0, 'item_revenue_cents': 1}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def order_day(created_at: Optional[str]) -> Optional[date]:
+    """UTC calendar day of a Shopify timestamp."""
+    if not created_at:
+        return None
+    try:
+        moment = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date()
+
+
+@dataclass
+class OrderContribution:
+    """What one order added to the cubes, kept so an update can be reversed."""
+    day: date
+    order_key: Tuple[str, str]
+    revenue_cents: int
+    items: List[Tuple[Tuple[str, str], int, int]] = field(default_factory=list)
+
+
+class RollupCube:
+    """
+    Pre-aggregated daily cubes over synced orders.
+
+    - Order cube: day -> (city, customer) -> [orders, revenue_cents]
+    - Item cube:  day -> (city, product)  -> [units, item_revenue_cents]
+
+    Orders are upserted incrementally: an order seen again (because it was
+    updated) has its previous contribution subtracted first. Range queries
+    touch only the days in the window, so their cost is O(days x groups)
+    and does not depend on the number of orders.
+    """
+
+    def __init__(self):
+        self._order_cells: Dict[date, Dict[Tuple[str, str], List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._item_cells: Dict[date, Dict[Tuple[str, str], List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._contributions: Dict[str, OrderContribution] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The cell maps are nested defaultdicts of lambdas; pickle them as plain dicts
+        return {
+            'order_cells': {day: dict(cells) for day, cells in self._order_cells.items()},
+            'item_cells': {day: dict(cells) for day, cells in self._item_cells.items()},
+            'contributions': self._contributions,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__()
+        for day, cells in state['order_cells'].items():
+            self._order_cells[day].update(cells)
+        for day, cells in state['item_cells'].items():
+            self._item_cells[day].update(cells)
+        self._contributions = state['contributions']
+
+    def __len__(self) -> int:
+        return len(self._contributions)
+
+    def __contains__(self, order_id: Any) -> bool:
+        return str(order_id) in self._contributions
+
+    def contribution(self, order_id: Any) -> Optional[OrderContribution]:
+        """What an order currently adds to the cubes (None if absent or cancelled)."""
+        return self._contributions.get(str(order_id))
+
+    def contributions(self) -> List[OrderContribution]:
+        return list(self._contributions.values())
+
+    @property
+    def days(self) -> List[date]:
+        return sorted(self._order_cells)
+
+    def upsert_orders(self, orders: List[Dict[str, Any]]) -> int:
+        """Add new orders and replace updated ones. Returns the number applied."""
+        orders = [o for o in orders if isinstance(o, dict) and o.get('id') is not None]
+        if not orders:
+            return 0
+
+        revenue = to_cents([o.get('total_price') for o in orders]).tolist()
+        applied = 0
+        for order, revenue_cents in zip(orders, revenue):
+            order_id = str(order['id'])
+            day = order_day(order.get('created_at'))
+            if day is None or order.get('cancelled_at'):
+                self.remove_order(order_id)
+                continue
+
+            address = order.get('billing_address') or order.get('shipping_address') or {}
+            city = address.get('city') or 'Unknown'
+            customer = order.get('customer') or {}
+            customer_key = str(customer.get('id')) if customer.get('id') is not None else 'Guest'
+
+            contribution = OrderContribution(day=day, order_key=(city, customer_key), revenue_cents=revenue_cents)
+            line_items = [item for item in order.get('line_items') or [] if isinstance(item, dict)]
+            prices = to_cents([item.get('price') for item in line_items]).tolist() if line_items else []
+            for item, price_cents in zip(line_items, prices):
+                quantity = int(item.get('quantity') or 0)
+                item_key = (city, item.get('title') or 'Unknown Product')
+                contribution.items.append((item_key, quantity, price_cents * quantity))
+
+            self._replace(order_id, contribution)
+            applied += 1
+        return applied
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ColumnarSnapshot) -> "RollupCube":
+        """Rebuild the cubes from a columnar snapshot without touching JSON."""
+        cube = cls()
+        arrays = snapshot.arrays
+        cities = snapshot.vocabularies['cities']
+        titles = snapshot.vocabularies['titles']
+        offsets = arrays['item_offsets'].tolist()
+        item_titles = arrays['item_title'].tolist()
+        quantities = arrays['item_quantity'].tolist()
+        prices = arrays['item_price_cents'].tolist()
+
+        rows = zip(
+            arrays['id'].tolist(), arrays['created_at'].tolist(), arrays['total_price_cents'].tolist(),
+            arrays['customer_id'].tolist(), arrays['city'].tolist(), arrays['cancelled'].tolist()
+        )
+        for index, (order_id, created, revenue_cents, customer_id, city_code, cancelled) in enumerate(rows):
+            if cancelled or created == MISSING_TIME:
+                continue
+            city = cities[city_code] if city_code != MISSING else 'Unknown'
+            customer_key = str(customer_id) if customer_id != MISSING else 'Guest'
+            day = (_EPOCH + timedelta(seconds=created)).date()
+            contribution = OrderContribution(day=day, order_key=(city, customer_key), revenue_cents=revenue_cents)
+            for i in range(offsets[index], offsets[index + 1]):
+                title = titles[item_titles[i]] if item_titles[i] != MISSING else 'Unknown Product'
+                contribution.items.append(((city, title), quantities[i], prices[i] * quantities[i]))
+            cube._replace(str(order_id), contribution)
+        return cube
+
+    def remove_order(self, order_id: Any) -> None:
+        contribution = self._contributions.pop(str(order_id), None)
+        if contribution:
+            self._add(contribution, sign=-1)
+
+    def _replace(self, order_id: str, contribution: OrderContribution) -> None:
+        self.remove_order(order_id)
+        self._add(contribution, sign=1)
+        self._contributions[order_id] = contribution
+
+    def _add(self, contribution: OrderContribution, sign: int) -> None:
+        cell = self._order_cells[contribution.day][contribution.order_key]
+        cell[0] += sign
+        cell[1] += sign * contribution.revenue_cents
+        if cell[0] == 0:
+            del self._order_cells[contribution.day][contribution.order_key]
+
+        for item_key, units, revenue_cents in contribution.items:
+            cell = self._item_cells[contribution.day][item_key]
+            cell[0] += sign * units
+            cell[1] += sign * revenue_cents
+            if cell == [0, 0]:
+                del self._item_cells[contribution.day][item_key]
+
+    def aggregate(
+        self,
+        measure: str,
+        start: date,
+        end: date,
+        group_by: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Sum a measure over [start, end] (inclusive days), optionally grouped
+        by day, city, customer (order measures) or product (item measures).
+        Ungrouped results come back under the key 'total'.
+        """
+        if measure in ORDER_MEASURES:
+            cells, dimensions = self._order_cells, ORDER_DIMENSIONS
+        elif measure in ITEM_MEASURES:
+            cells, dimensions = self._item_cells, ITEM_DIMENSIONS
+        else:
+            raise ValueError(f"Unknown measure '{measure}'. Use one of: {sorted(ORDER_MEASURES | ITEM_MEASURES)}")
+        if group_by is not None and group_by not in dimensions:
+            raise ValueError(f"Measure '{measure}' cannot be grouped by '{group_by}'. Use one of: {sorted(dimensions)}")
+
+        index = _MEASURE_INDEX[measure]
+        result: Dict[str, int] = defaultdict(int)
+        day = start
+        while day <= end:
+            for (city, other), cell in cells.get(day, {}).items():
+                if group_by is None:
+                    key = 'total'
+                elif group_by == 'day':
+                    key = day.isoformat()
+                elif group_by == 'city':
+                    key = city
+                else:
+                    key = other
+                result[key] += cell[index]
+            day += timedelta(days=1)
+        return dict(result)
+
+    def top(
+        self,
+        measure: str,
+        group_by: str,
+        start: date,
+        end: date,
+        limit: int = 5
+    ) -> List[Tuple[str, int]]:
+        """Largest groups for a measure over the window, descending."""
+        totals = self.aggregate(measure, start, end, group_by=group_by)
+        return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
@@ -0,0 +1,321 @@
+import hashlib
+import math
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.analytics.rollups import OrderContribution
+
+Z_95 = 1.96  # Two-sided 95% normal quantile used for every reported bound
+
+
+def hash64(value: Any) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+@dataclass
+class Estimate:
+    """An approximate value and its 95% error bound in the same unit."""
+    value: float
+    error: float
+    exact: bool = False
+
+    def __str__(self) -> str:
+        if self.exact:
+            return f"{self.value:,.0f} (exact)"
+        return f"~{self.value:,.0f} (±{self.error:,.0f})"
+
+
+class HyperLogLog:
+    """
+    Distinct counter with 2^p one-byte registers. Standard error is
+    1.04/sqrt(2^p) (about 1.6% at p=12). Merge is an element-wise max.
+    """
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, value: Any) -> None:
+        h = hash64(value)
+        index = h >> (64 - self.p)
+        rest = (h << self.p) & 0xFFFFFFFFFFFFFFFF
+        rank = (64 - rest.bit_length()) + 1 if rest else 64 - self.p + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        return HyperLogLog.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, sketches: List["HyperLogLog"]) -> "HyperLogLog":
+        merged = cls(sketches[0].p)
+        merged.registers = np.maximum.reduce([sketch.registers for sketch in sketches])
+        return merged
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> Estimate:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while most registers are empty
+            raw = m * math.log(m / zeros)
+        return Estimate(raw, Z_95 * self.relative_error * raw)
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters in O(k) memory. Each tracked item keeps a count and
+    the overestimate it may carry: count - error <= true <= count.
+    """
+
+    def __init__(self, k: int = 64):
+        self.k = k
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+
+    def add(self, item: str, weight: int = 1) -> None:
+        if weight <= 0:
+            return
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.k:
+            self.counters[item] = [weight, 0]
+        else:
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + weight, floor]
+
+    def _floor(self) -> int:
+        # Upper bound on the count of any untracked item
+        if len(self.counters) < self.k:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        return SpaceSaving.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, sketches: List["SpaceSaving"]) -> "SpaceSaving":
+        """
+        Sum counters across sketches. A sketch that does not track an item
+        may still have seen it up to its floor, which is added to both the
+        count and the error (Agarwal et al., mergeable summaries).
+        """
+        merged = cls(max(sketch.k for sketch in sketches))
+        floors = [sketch._floor() for sketch in sketches]
+        total_floor = sum(floors)
+        sums: Dict[str, List[int]] = {}  # item -> [count, error, floors of sketches tracking it]
+        for sketch, floor in zip(sketches, floors):
+            for item, (count, error) in sketch.counters.items():
+                entry = sums.setdefault(item, [0, 0, 0])
+                entry[0] += count
+                entry[1] += error
+                entry[2] += floor
+        ranked = sorted(
+            ((item, count + total_floor - seen, error + total_floor - seen) for item, (count, error, seen) in sums.items()),
+            key=lambda row: row[1],
+            reverse=True
+        )[:merged.k]
+        merged.counters = {item: [count, error] for item, count, error in ranked}
+        return merged
+
+    def top(self, n: int) -> List[Tuple[str, int, int]]:
+        """(item, count, max overestimate) for the n heaviest items."""
+        ranked = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [(item, count, error) for item, (count, error) in ranked]
+
+
+class ReservoirSample:
+    """Uniform sample of at most k values from a stream of n, mergeable by weight."""
+
+    def __init__(self, k: int = 512, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.values: List[int] = []
+        self._random = random.Random(seed)
+
+    def add(self, value: int) -> None:
+        self.n += 1
+        if len(self.values) < self.k:
+            self.values.append(value)
+        else:
+            slot = self._random.randrange(self.n)
+            if slot < self.k:
+                self.values[slot] = value
+
+    def merge(self, other: "ReservoirSample") -> "ReservoirSample":
+        return ReservoirSample.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, samples: List["ReservoirSample"]) -> "ReservoirSample":
+        """Draw from each sample in proportion to the size of the stream it represents."""
+        merged = cls(max(sample.k for sample in samples))
+        merged._random = samples[0]._random
+        merged.n = sum(sample.n for sample in samples)
+        pooled = sum(len(sample.values) for sample in samples)
+        if pooled <= merged.k:
+            merged.values = [value for sample in samples for value in sample.values]
+            return merged
+
+        generator = np.random.default_rng(merged._random.getrandbits(32))
+        draws = generator.multinomial(merged.k, [sample.n / merged.n for sample in samples])
+        for sample, wanted in zip(samples, draws):
+            merged.values.extend(merged._random.sample(sample.values, min(int(wanted), len(sample.values))))
+        return merged
+
+    @property
+    def is_complete(self) -> bool:
+        return self.n == len(self.values)
+
+    def mean(self) -> Estimate:
+        if not self.values:
+            return Estimate(0.0, 0.0, exact=True)
+        values = np.asarray(self.values, dtype=np.float64)
+        if self.is_complete:
+            return Estimate(float(values.mean()), 0.0, exact=True)
+        return Estimate(float(values.mean()), Z_95 * float(values.std(ddof=1)) / math.sqrt(len(values)))
+
+    def quantile(self, q: float) -> Tuple[float, float]:
+        """Sample quantile and its 95% rank error as a fraction (0.05 = ±5 percentile points)."""
+        if not self.values:
+            return 0.0, 0.0
+        error = 0.0 if self.is_complete else Z_95 * math.sqrt(q * (1 - q) / len(self.values))
+        return float(np.quantile(np.asarray(self.values), q)), error
+
+
+class DistinctSample:
+    """
+    Hash-based sample of distinct keys with their exact frequencies (Gibbons'
+    distinct sampling). A key is kept iff its hash has `level` trailing zero
+    bits, so samples taken over different buckets stay consistent and merge
+    by summing counts. Used to estimate the share of repeat customers.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.level = 0
+        self.counts: Dict[int, int] = {}  # key hash -> frequency
+
+    @staticmethod
+    def _kept(key_hash: int, level: int) -> bool:
+        return key_hash & ((1 << level) - 1) == 0
+
+    def add(self, key: str, count: int = 1) -> None:
+        key_hash = hash64(key)
+        if not self._kept(key_hash, self.level):
+            return
+        self.counts[key_hash] = self.counts.get(key_hash, 0) + count
+        self._shrink()
+
+    def _shrink(self) -> None:
+        while len(self.counts) > self.capacity:
+            self.level += 1
+            self.counts = {h: count for h, count in self.counts.items() if self._kept(h, self.level)}
+
+    def merge(self, other: "DistinctSample") -> "DistinctSample":
+        return DistinctSample.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, samples: List["DistinctSample"]) -> "DistinctSample":
+        merged = cls(max(sample.capacity for sample in samples))
+        level = max(sample.level for sample in samples)
+        hashes = np.fromiter((h for sample in samples for h in sample.counts), dtype=np.uint64)
+        counts = np.fromiter((c for sample in samples for c in sample.counts.values()), dtype=np.int64)
+
+        # Vectorized: keep hashes passing the level, then sum counts per key
+        while True:
+            kept = (hashes & np.uint64((1 << level) - 1)) == 0
+            keys, inverse = np.unique(hashes[kept], return_inverse=True)
+            if len(keys) <= merged.capacity:
+                break
+            level += 1
+        merged.level = level
+        merged.counts = dict(zip(keys.tolist(), np.bincount(inverse, weights=counts[kept]).astype(np.int64).tolist()))
+        return merged
+
+    def repeat_rate(self) -> Estimate:
+        """Share (0-100) of distinct keys seen at least twice."""
+        sampled = len(self.counts)
+        if not sampled:
+            return Estimate(0.0, 0.0, exact=True)
+        share = sum(1 for count in self.counts.values() if count >= 2) / sampled
+        if self.level == 0:
+            return Estimate(share * 100, 0.0, exact=True)
+        return Estimate(share * 100, Z_95 * math.sqrt(share * (1 - share) / sampled) * 100)
+
+
+class SketchBucket:
+    """All sketches of one day; buckets of any date range merge into one."""
+
+    def __init__(self):
+        self.customers = HyperLogLog()
+        self.customer_sample = DistinctSample()
+        self.products = SpaceSaving()
+        self.cities = SpaceSaving()
+        self.order_values = ReservoirSample()
+        self.orders = 0
+
+    def add(self, contribution: OrderContribution) -> None:
+        city, customer = contribution.order_key
+        self.orders += 1
+        if customer != 'Guest':
+            self.customers.add(customer)
+            self.customer_sample.add(customer)
+        self.cities.add(city, contribution.revenue_cents)
+        self.order_values.add(contribution.revenue_cents)
+        for (_, title), units, _ in contribution.items:
+            self.products.add(title, units)
+
+    def merge(self, other: "SketchBucket") -> "SketchBucket":
+        return SketchBucket.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, buckets: List["SketchBucket"]) -> "SketchBucket":
+        merged = cls()
+        if not buckets:
+            return merged
+        merged.customers = HyperLogLog.merge_all([b.customers for b in buckets])
+        merged.customer_sample = DistinctSample.merge_all([b.customer_sample for b in buckets])
+        merged.products = SpaceSaving.merge_all([b.products for b in buckets])
+        merged.cities = SpaceSaving.merge_all([b.cities for b in buckets])
+        merged.order_values = ReservoirSample.merge_all([b.order_values for b in buckets])
+        merged.orders = sum(b.orders for b in buckets)
+        return merged
+
+
+class DailySketches:
+    """
+    Approximate analytics over synced orders: one SketchBucket per day,
+    fed once per order during sync and merged over any date range.
+
+    Sketches are insert-only, so an order is counted as it looked when it
+    was first synced; later edits are reflected by the exact rollups only.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[date, SketchBucket] = defaultdict(SketchBucket)
+
+    def add(self, contribution: OrderContribution) -> None:
+        self.buckets[contribution.day].add(contribution)
+
+    def window(self, start: date, end: date) -> SketchBucket:
+        """Merge the buckets of [start, end] in one pass."""
+        buckets = []
+        day = start
+        while day <= end:
+            bucket = self.buckets.get(day)
+            if bucket is not None:
+                buckets.append(bucket)
+            day += timedelta(days=1)
+        return SketchBucket.merge_all(buckets)
@@ -0,0 +1,312 @@
+import json
+import os
+import pickle
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.analytics.time_index import MISSING_TIME, TimeBound, TimeIndex, epoch_seconds
+from app.utils.money import to_cents
+
+# Column dtypes of the on-disk format. Timestamps are UTC epoch seconds,
+# money is int64 cents, strings are int32 codes into a vocabulary.
+ORDER_ARRAYS = {
+    'id': np.int64,
+    'created_at': np.int64,
+    'updated_at': np.int64,
+    'total_price_cents': np.int64,
+    'customer_id': np.int64,
+    'city': np.int32,
+    'email': np.int32,
+    'cancelled': np.bool_,
+}
+ITEM_ARRAYS = {
+    'item_title': np.int32,
+    'item_quantity': np.int64,
+    'item_price_cents': np.int64,
+    'item_product_id': np.int64,
+    'item_variant_id': np.int64,
+}
+# Dictionary-encoded columns and the vocabulary file they index into
+VOCABULARIES = {'city': 'cities', 'email': 'emails', 'item_title': 'titles'}
+
+MISSING = -1  # Missing id or string code
+CURRENT_FILE = 'CURRENT'
+# Rollups and sketches built by the writer, so readers need not rebuild them
+AGGREGATES_FILE = 'aggregates.pickle'
+
+
+class ColumnarSnapshot:
+    """
+    Immutable struct-of-arrays copy of the store's orders and line items.
+
+    Orders are sorted by created_at. Line items of order i live at
+    item_offsets[i]:item_offsets[i + 1]. Written by the sync process as one
+    .npy file per column and opened by every worker with mmap_mode='r', so
+    all processes share the same pages and nothing is re-parsed from JSON.
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        vocabularies: Dict[str, List[str]],
+        version: int = 0
+    ):
+        self.arrays = arrays
+        self.vocabularies = vocabularies
+        self.version = version
+        self._time_index: Optional[TimeIndex] = None
+
+    @classmethod
+    def empty(cls) -> "ColumnarSnapshot":
+        arrays = {name: np.zeros(0, dtype=dtype) for name, dtype in {**ORDER_ARRAYS, **ITEM_ARRAYS}.items()}
+        arrays['item_offsets'] = np.zeros(1, dtype=np.int64)
+        return cls(arrays, {name: [] for name in VOCABULARIES.values()})
+
+    @classmethod
+    def from_orders(cls, orders: List[Dict[str, Any]]) -> "ColumnarSnapshot":
+        return cls.empty().merge(orders)
+
+    @property
+    def n_orders(self) -> int:
+        return len(self.arrays['id'])
+
+    @property
+    def n_items(self) -> int:
+        return len(self.arrays['item_title'])
+
+    @property
+    def time_index(self) -> TimeIndex:
+        """Binary-search index over created_at (orders are stored sorted, so it is just a view)."""
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.arrays['created_at'])
+        return self._time_index
+
+    def window(self, start: TimeBound = None, end: TimeBound = None) -> "ColumnarSnapshot":
+        """
+        Orders created within [start, end] and their line items, as a snapshot
+        of array slices. Costs two binary searches; nothing is copied.
+        """
+        lo, hi = self.time_index.bounds(start, end)
+        offsets = self.arrays['item_offsets']
+        item_lo, item_hi = int(offsets[lo]), int(offsets[hi])
+
+        arrays = {name: self.arrays[name][lo:hi] for name in ORDER_ARRAYS}
+        arrays.update({name: self.arrays[name][item_lo:item_hi] for name in ITEM_ARRAYS})
+        arrays['item_offsets'] = np.asarray(offsets[lo:hi + 1]) - item_lo
+        return ColumnarSnapshot(arrays, self.vocabularies, version=self.version)
+
+    def _categories(self, column: str, missing: str) -> pd.Index:
+        # Missing values decode to a placeholder so the column never holds NaN
+        vocabulary = self.vocabularies[VOCABULARIES[column]]
+        return pd.Index(vocabulary + [missing]) if missing not in vocabulary else pd.Index(vocabulary)
+
+    def _codes(self, column: str, missing: str = 'Unknown') -> np.ndarray:
+        codes = np.asarray(self.arrays[column])
+        if not (codes == MISSING).any():
+            return codes
+        vocabulary = self.vocabularies[VOCABULARIES[column]]
+        fill = vocabulary.index(missing) if missing in vocabulary else len(vocabulary)
+        return np.where(codes == MISSING, fill, codes).astype(np.int32)
+
+    # --- Building ---
+
+    def merge(self, orders: List[Dict[str, Any]]) -> "ColumnarSnapshot":
+        """
+        New snapshot with `orders` upserted by id. Vocabularies only grow, so
+        existing codes stay valid and old columns are reused as-is.
+        """
+        latest = {str(o['id']): o for o in orders if isinstance(o, dict) and o.get('id') is not None}
+        vocabularies = {name: list(words) for name, words in self.vocabularies.items()}
+        fresh = _encode_orders(list(latest.values()), vocabularies)
+
+        keep = ~np.isin(self.arrays['id'], fresh['id'])
+        counts = np.diff(self.arrays['item_offsets'])
+        item_keep = np.repeat(keep, counts)
+
+        arrays = {
+            name: np.concatenate([self.arrays[name][keep], fresh[name]]).astype(dtype, copy=False)
+            for name, dtype in ORDER_ARRAYS.items()
+        }
+        items = {
+            name: np.concatenate([self.arrays[name][item_keep], fresh[name]]).astype(dtype, copy=False)
+            for name, dtype in ITEM_ARRAYS.items()
+        }
+        counts = np.concatenate([counts[keep], fresh['item_counts']])
+
+        # Keep orders sorted by time and move line items along with their order
+        order_perm = np.argsort(arrays['created_at'], kind='stable')
+        rank = np.empty_like(order_perm)
+        rank[order_perm] = np.arange(len(order_perm))
+        owner = np.repeat(np.arange(len(counts)), counts)
+        item_perm = np.argsort(rank[owner], kind='stable')
+
+        arrays = {name: column[order_perm] for name, column in arrays.items()}
+        arrays.update({name: column[item_perm] for name, column in items.items()})
+        arrays['item_offsets'] = np.concatenate([[0], np.cumsum(counts[order_perm])]).astype(np.int64)
+        return ColumnarSnapshot(arrays, vocabularies, version=self.version)
+
+    # --- Persistence ---
+
+    def write(self, directory: str, aggregates: Any = None) -> int:
+        """
+        Write a new version next to the current one and atomically repoint
+        CURRENT at it. Readers holding the previous version keep their mmaps.
+        `aggregates` (built from the same orders) is published with it.
+        Returns the new version number.
+        """
+        os.makedirs(directory, exist_ok=True)
+        version = max(self.version, current_version(directory) or 0) + 1
+        name = f"v{version:06d}"
+        staging = os.path.join(directory, f"{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        for column, values in self.arrays.items():
+            np.save(os.path.join(staging, f"{column}.npy"), np.ascontiguousarray(values))
+        for vocabulary, words in self.vocabularies.items():
+            with open(os.path.join(staging, f"{vocabulary}.json"), 'w') as f:
+                json.dump(words, f)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'version': version, 'orders': self.n_orders, 'items': self.n_items}, f)
+        if aggregates is not None:
+            with open(os.path.join(staging, AGGREGATES_FILE), 'wb') as f:
+                pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(staging, os.path.join(directory, name))
+        pointer = os.path.join(directory, f"{CURRENT_FILE}.tmp")
+        with open(pointer, 'w') as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+        self.version = version
+        _prune_versions(directory, keep=(name, f"v{version - 1:06d}"))
+        return version
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["ColumnarSnapshot"]:
+        """Open the current version read-only via mmap, or None if nothing was written yet."""
+        version = current_version(directory)
+        if version is None:
+            return None
+        path = os.path.join(directory, f"v{version:06d}")
+        columns = list(ORDER_ARRAYS) + list(ITEM_ARRAYS) + ['item_offsets']
+        arrays = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode='r') for column in columns}
+        vocabularies = {}
+        for vocabulary in VOCABULARIES.values():
+            with open(os.path.join(path, f"{vocabulary}.json")) as f:
+                vocabularies[vocabulary] = json.load(f)
+        return cls(arrays, vocabularies, version=version)
+
+    # --- Views ---
+
+    def orders_frame(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Orders as a DataFrame over the mapped arrays (numeric columns are not
+        copied), optionally limited to those created within [start, end].
+        """
+        if start is not None or end is not None:
+            return self.window(start, end).orders_frame()
+        # MISSING_TIME is numpy's NaT bit pattern, so the view maps it to NaT
+        created = np.asarray(self.arrays['created_at']).view('datetime64[s]')
+        return pd.DataFrame({
+            'id': self.arrays['id'],
+            'created_at': pd.to_datetime(created, utc=True),
+            'total_price': np.asarray(self.arrays['total_price_cents']) / 100,
+            'customer_id': self.arrays['customer_id'],
+            'email': pd.Categorical.from_codes(self._codes('email', ''), categories=self._categories('email', '')),
+            'city': pd.Categorical.from_codes(self._codes('city'), categories=self._categories('city', 'Unknown')),
+            'cancelled': self.arrays['cancelled'],
+            'total_price_cents': self.arrays['total_price_cents'],
+        }, copy=False)
+
+    def line_items_frame(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """One row per line item, tagged with its order id, optionally windowed like orders_frame."""
+        if start is not None or end is not None:
+            return self.window(start, end).line_items_frame()
+        counts = np.diff(self.arrays['item_offsets'])
+        return pd.DataFrame({
+            'order_id': np.repeat(self.arrays['id'], counts),
+            'title': pd.Categorical.from_codes(
+                self._codes('item_title', 'Unknown Product'),
+                categories=self._categories('item_title', 'Unknown Product')
+            ),
+            'quantity': self.arrays['item_quantity'],
+            'price_cents': self.arrays['item_price_cents'],
+            'revenue_cents': np.asarray(self.arrays['item_price_cents']) * np.asarray(self.arrays['item_quantity']),
+            'product_id': self.arrays['item_product_id'],
+            'variant_id': self.arrays['item_variant_id'],
+        }, copy=False)
+
+
+def current_version(directory: str) -> Optional[int]:
+    """Version CURRENT points at, read without opening any arrays."""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return int(f.read().strip().lstrip('v'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def load_aggregates(directory: str, version: int) -> Any:
+    """Aggregates published with a version, or None when it has none (older writers)."""
+    try:
+        with open(os.path.join(directory, f"v{version:06d}", AGGREGATES_FILE), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _prune_versions(directory: str, keep: tuple) -> None:
+    for entry in os.listdir(directory):
+        if entry.startswith('v') and entry not in keep:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+def _as_id(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+def _encode(values: List[Optional[str]], vocabulary: List[str]) -> np.ndarray:
+    lookup = {word: code for code, word in enumerate(vocabulary)}
+
+    def code(value):
+        if not value:
+            return MISSING
+        found = lookup.get(value)
+        if found is None:
+            found = lookup[value] = len(vocabulary)
+            vocabulary.append(value)
+        return found
+
+    return np.array([code(v) for v in values], dtype=np.int32)
+
+
+def _encode_orders(orders: List[Dict[str, Any]], vocabularies: Dict[str, List[str]]) -> Dict[str, np.ndarray]:
+    """Encode raw order dicts into column arrays, extending `vocabularies` in place."""
+    addresses = [o.get('billing_address') or o.get('shipping_address') or {} for o in orders]
+    customers = [o.get('customer') or {} for o in orders]
+    items = [[i for i in o.get('line_items') or [] if isinstance(i, dict)] for o in orders]
+    flat = [item for order_items in items for item in order_items]
+
+    return {
+        'id': np.array([_as_id(o['id']) for o in orders], dtype=np.int64),
+        'created_at': epoch_seconds([o.get('created_at') for o in orders]),
+        'updated_at': epoch_seconds([o.get('updated_at') for o in orders]),
+        'total_price_cents': to_cents([o.get('total_price') for o in orders]),
+        'customer_id': np.array([_as_id(c.get('id')) for c in customers], dtype=np.int64),
+        'city': _encode([a.get('city') for a in addresses], vocabularies['cities']),
+        'email': _encode([c.get('email') or o.get('email') for c, o in zip(customers, orders)], vocabularies['emails']),
+        'cancelled': np.array([bool(o.get('cancelled_at')) for o in orders], dtype=np.bool_),
+        'item_counts': np.array([len(i) for i in items], dtype=np.int64),
+        'item_title': _encode([i.get('title') for i in flat], vocabularies['titles']),
+        'item_quantity': np.array([int(i.get('quantity') or 0) for i in flat], dtype=np.int64),
+        'item_price_cents': to_cents([i.get('price') for i in flat]),
+        'item_product_id': np.array([_as_id(i.get('product_id')) for i in flat], dtype=np.int64),
+        'item_variant_id': np.array([_as_id(i.get('variant_id')) for i in flat], dtype=np.int64),
+    }
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.analytics.rollups import RollupCube
+from app.analytics.sketches import DailySketches
+from app.analytics.snapshot import MISSING_TIME, ColumnarSnapshot, current_version, load_aggregates
+from app.core.config import settings
+
+logger = logging.getLogger("local_store")
+
+
+class StoreState(NamedTuple):
+    """Everything read from one snapshot version, swapped in as a unit."""
+    snapshot: ColumnarSnapshot
+    rollups: RollupCube
+    sketches: DailySketches
+    updated_at_watermark: Optional[str]
+    synced_through: Optional[datetime]
+
+
+class LocalOrderStore:
+    """
+    In-process materialized view of the store's orders, kept current by
+    OrderSyncService. Holds the rollup cubes, the approximate sketches, the
+    sync watermark and, when
+    `snapshot_dir` is set, the memory-mapped columnar snapshot shared by
+    every worker process. The writer publishes its rollups and sketches
+    with each snapshot version so readers only load them.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        self.rollups = RollupCube()
+        self.sketches = DailySketches()
+        self.snapshot_dir = snapshot_dir
+        self.snapshot: Optional[ColumnarSnapshot] = None
+        # Highest `updated_at` seen; the next sync only asks for newer changes
+        self.updated_at_watermark: Optional[str] = None
+        self.last_synced_at: Optional[datetime] = None
+        # Every order change before this moment is in the store
+        self.synced_through: Optional[datetime] = None
+        self._loading: Optional[asyncio.Future] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.last_synced_at is not None or self.snapshot is not None
+
+    def coverage_gap(self, window: Optional[Tuple[date, date]]) -> Optional[str]:
+        """
+        Why the synced orders may not answer for `window` (all time when None)
+        exactly, or None when they do: the window must start on or after the
+        first synced day and end before `synced_through`.
+        """
+        if not self.is_ready or self.synced_through is None:
+            return "orders not synced"
+        if window is None:
+            return None
+        days = self.rollups.days
+        if not days or window[0] < days[0]:
+            return f"synced orders start on {days[0]}" if days else "no synced orders"
+        if datetime.combine(window[1] + timedelta(days=1), time.min, tzinfo=timezone.utc) > self.synced_through:
+            return f"orders synced through {self.synced_through:%Y-%m-%d %H:%M} UTC"
+        return None
+
+    def apply_orders(self, orders: List[Dict[str, Any]], synced_through: Optional[datetime] = None) -> int:
+        """
+        Fold a batch of new/updated orders into every local structure.
+        `synced_through` defaults to now, i.e. `orders` holds every change
+        since the previous batch; a sync cut short passes its watermark.
+        """
+        new_ids = dict.fromkeys(
+            o['id'] for o in orders
+            if isinstance(o, dict) and o.get('id') is not None and o['id'] not in self.rollups
+        )
+        applied = self.rollups.upsert_orders(orders)
+        # Sketches are insert-only: feed each order once, when first seen
+        for order_id in new_ids:
+            contribution = self.rollups.contribution(order_id)
+            if contribution is not None:
+                self.sketches.add(contribution)
+        stamps = [o['updated_at'] for o in orders if isinstance(o, dict) and o.get('updated_at')]
+        if stamps:
+            newest = max(stamps, key=_timestamp)
+            if self.updated_at_watermark is None or _timestamp(newest) > _timestamp(self.updated_at_watermark):
+                self.updated_at_watermark = newest
+
+        self.last_synced_at = datetime.now(timezone.utc)
+        self.synced_through = synced_through or self.last_synced_at
+
+        if self.snapshot_dir:
+            base = self.snapshot or ColumnarSnapshot.empty()
+            aggregates = {'rollups': self.rollups, 'sketches': self.sketches, 'synced_through': self.synced_through}
+            base.merge(orders).write(self.snapshot_dir, aggregates=aggregates)
+            # Re-open so this process also reads the shared pages instead of its private copy
+            self.snapshot = ColumnarSnapshot.open(self.snapshot_dir)
+        return applied
+
+    def refresh(self) -> bool:
+        """
+        Pick up a snapshot written by another process (e.g. the sync worker),
+        blocking until it is loaded. Only reads the CURRENT pointer unless
+        the version changed. Request handlers use refresh_soon() instead.
+        """
+        if not self._has_new_version():
+            return False
+        state = self._load(self.snapshot_dir)
+        return state is not None and self._swap(state)
+
+    def refresh_soon(self) -> None:
+        """
+        Load a newer snapshot in a worker thread and swap it in on the event
+        loop once it is ready. Never blocks: until then, callers keep
+        reading the version they have (or the API, before the first one).
+        """
+        if self._loading is not None or not self._has_new_version():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._loading = loop.run_in_executor(None, self._load, self.snapshot_dir)
+        self._loading.add_done_callback(self._loaded)
+
+    def _has_new_version(self) -> bool:
+        if not self.snapshot_dir:
+            return False
+        version = current_version(self.snapshot_dir)
+        return version is not None and (self.snapshot is None or self.snapshot.version != version)
+
+    def _loaded(self, loading: asyncio.Future) -> None:
+        self._loading = None
+        if loading.cancelled():
+            return
+        if loading.exception() is not None:
+            # e.g. the version was pruned mid-load; the next request tries again
+            logger.warning(f"Could not load the order snapshot: {loading.exception()}")
+            return
+        if loading.result() is not None:
+            self._swap(loading.result())
+
+    @staticmethod
+    def _load(snapshot_dir: str) -> Optional[StoreState]:
+        """Open the current version with its prebuilt aggregates (rebuilt if it has none)."""
+        snapshot = ColumnarSnapshot.open(snapshot_dir)
+        if snapshot is None:
+            return None
+        watermark = None
+        updated = snapshot.arrays['updated_at']
+        updated = updated[updated != MISSING_TIME]
+        if len(updated):
+            newest = datetime.fromtimestamp(int(updated.max()), timezone.utc)
+            watermark = newest.strftime('%Y-%m-%dT%H:%M:%SZ')
+        aggregates = load_aggregates(snapshot_dir, snapshot.version)
+        if aggregates is not None:
+            return StoreState(snapshot, aggregates['rollups'], aggregates['sketches'], watermark, aggregates['synced_through'])
+        rollups = RollupCube.from_snapshot(snapshot)
+        sketches = DailySketches()
+        for contribution in rollups.contributions():
+            sketches.add(contribution)
+        # Without the writer's record, only changes up to the newest one seen are known to be in
+        return StoreState(snapshot, rollups, sketches, watermark, _timestamp(watermark) if watermark else None)
+
+    def _swap(self, state: StoreState) -> bool:
+        """Install a loaded version unless a newer one is already in place."""
+        if self.snapshot is not None and self.snapshot.version >= state.snapshot.version:
+            return False
+        self.snapshot, self.rollups, self.sketches = state.snapshot, state.rollups, state.sketches
+        if state.updated_at_watermark is not None:
+            self.updated_at_watermark = state.updated_at_watermark
+        self.synced_through = state.synced_through
+        return True
+
+
+def _timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+_local_store = LocalOrderStore(snapshot_dir=settings.SNAPSHOT_DIR)
+
+
+def get_local_store() -> LocalOrderStore:
+    return _local_store
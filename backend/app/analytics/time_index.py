@@ -0,0 +1,75 @@
+from datetime import date, datetime, time, timezone
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Missing timestamp; numpy's NaT bit pattern, so it sorts before every real time
+MISSING_TIME = np.iinfo(np.int64).min
+
+TimeBound = Any  # datetime, date, ISO string, pd.Timestamp or None (open-ended)
+
+
+def epoch_seconds(values: List[Any]) -> np.ndarray:
+    """Parse ISO timestamps in bulk to UTC epoch seconds (MISSING_TIME when absent)."""
+    stamps = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format='ISO8601', errors='coerce')
+    return stamps.dt.tz_localize(None).to_numpy(dtype='datetime64[s]').view(np.int64)
+
+
+def to_epoch(value: TimeBound, end: bool = False) -> int:
+    """
+    UTC epoch seconds of a window bound. A bare date (or 'YYYY-MM-DD') covers the whole day:
+    midnight as a start, 23:59:59 as an end. Naive datetimes are taken as UTC.
+    """
+    if isinstance(value, str) and len(value) == 10:
+        value = date.fromisoformat(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time.max if end else time.min)
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize(timezone.utc)
+    return int(stamp.timestamp())
+
+
+class TimeIndex:
+    """
+    Sorted int64 epoch-seconds index over created_at.
+
+    `bounds()` turns a [start, end] window into a row range with two binary
+    searches. Rows with no timestamp sort first and fall outside every window.
+    When built over unsorted rows, `positions` maps sorted rank to the
+    original row; over the snapshot (already sorted) it is the identity.
+    """
+
+    def __init__(self, epochs: np.ndarray, positions: Optional[np.ndarray] = None):
+        self.epochs = epochs
+        self.positions = positions
+        # First row that has a timestamp
+        self._first = int(np.searchsorted(epochs, MISSING_TIME, side='right'))
+
+    @classmethod
+    def from_timestamps(cls, values: List[Any]) -> "TimeIndex":
+        """Index ISO timestamps in their original (unsorted) order."""
+        epochs = epoch_seconds(values)
+        positions = np.argsort(epochs, kind='stable')
+        return cls(epochs[positions], positions)
+
+    def __len__(self) -> int:
+        return len(self.epochs)
+
+    def bounds(self, start: TimeBound = None, end: TimeBound = None) -> Tuple[int, int]:
+        """Sorted row range [lo, hi) of timestamps within [start, end] (inclusive)."""
+        lo = self._first if start is None else max(self._first, int(np.searchsorted(self.epochs, to_epoch(start), side='left')))
+        hi = len(self.epochs) if end is None else int(np.searchsorted(self.epochs, to_epoch(end, end=True), side='right'))
+        return lo, max(lo, hi)
+
+    def rows(self, start: TimeBound = None, end: TimeBound = None) -> np.ndarray:
+        """Original row positions within the window, in time order."""
+        lo, hi = self.bounds(start, end)
+        if self.positions is None:
+            return np.arange(lo, hi)
+        return self.positions[lo:hi]
+
+    def count(self, start: TimeBound = None, end: TimeBound = None) -> int:
+        lo, hi = self.bounds(start, end)
+        return hi - lo
@@ -1,31 +1,67 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response, Header
 from fastapi.responses import JSONResponse
-from typing import List
+import asyncio
+import threading
+from typing import List, Optional
 
-from app.services.agent_service import AgentService
-from app.models.agent import AgentRequest, AgentResponse, SessionCreate, Message
+from app.services.job_service import JobRunner
+from app.models.agent import AgentRequest, AgentResponse, BatchRequest, BatchResponse, SessionCreate, Message, JobStatus
 from app.core.config import settings
+from app.utils.etag import etag_matches
 
 router = APIRouter()
 
+# Page sizes used when a client pages with a cursor but gives no limit
+SESSIONS_PAGE_SIZE = 50
+HISTORY_PAGE_SIZE = 100
+
 # Dependency to get AgentService instance
-# In a larger app, we might use a proper dependency injection provider.
-# For now, we'll use a singleton pattern attached to the app or global variable.
-# To keep it simple and testable, we'll instantiate it here or let main.py handle it.
-# Ideally, we should reuse the same instance to persist sessions in memory.
-_agent_service = AgentService()
+# One shared instance per process, created on first use: importing it loads
+# langchain and pandas, which the lifespan warms up in a thread after startup.
+# Route parameters are left unannotated so this module stays light to import.
+_agent_service = None
+_agent_service_lock = threading.Lock()
 
-def get_agent_service() -> AgentService:
+def get_agent_service():
+    global _agent_service
+    if _agent_service is None:
+        with _agent_service_lock:
+            if _agent_service is None:
+                from app.services.agent_service import AgentService
+                _agent_service = AgentService()
     return _agent_service
 
+async def _run_chat_job(session_id: str, message: str):
+    service = await asyncio.to_thread(get_agent_service)
+    return await service.chat(session_id, message)
+
+# Background chat jobs share the agent; started and stopped by the app lifespan
+_job_runner = JobRunner(
+    _run_chat_job,
+    concurrency=settings.JOB_CONCURRENCY,
+    max_queue=settings.JOB_QUEUE_SIZE
+)
+
+def get_job_runner() -> JobRunner:
+    return _job_runner
+
 @router.get("/health")
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@router.post("/sync", response_model=dict)
+async def sync_orders():
+    """Pull new/updated orders from Shopify into the local rollups."""
+    try:
+        from app.services.sync_service import OrderSyncService
+        return await OrderSyncService().sync()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Sync Error: {str(e)}")
+
 @router.post("/sessions", response_model=dict)
 async def create_session(
     request: SessionCreate, 
-    service: AgentService = Depends(get_agent_service)
+    service=Depends(get_agent_service)
 ):
     """Create a new chat session."""
     try:
@@ -36,54 +72,78 @@ async def create_session(
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-@router.post("/chat", response_model=AgentResponse)
+@router.post("/chat", response_model=AgentResponse, responses={202: {"model": JobStatus}})
 async def chat(
     request: AgentRequest,
-    service: AgentService = Depends(get_agent_service)
+    service=Depends(get_agent_service),
+    jobs: JobRunner = Depends(get_job_runner)
 ):
     """
     Send a message to the agent and get a response.
     Input matches requirements: {session_id, message} (via AgentRequest) -> user asked for {store_url, message, session_id}
     Note: store_url is extracted from the session, not the request body, to prevent spoofing.
+    With "background": true the run is queued and 202 returns the job to poll at /api/jobs/{job_id}.
     """
     try:
+        if request.background:
+            job = await jobs.submit(request.session_id, request.message)
+            return JSONResponse(status_code=202, content=job.model_dump(mode="json"))
         response = await service.chat(request.session_id, request.message)
         return response
     except ValueError as e:
         # Rate limit or Session Not Found
-        status = 429 if "Rate limit" in str(e) else 404 if "Session not found" in str(e) else 400
+        status = 429 if "Rate limit" in str(e) or "Too many" in str(e) else 404 if "Session not found" in str(e) else 400
+        raise HTTPException(status_code=status, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Agent Error: {str(e)}")
+
+@router.post("/chat/batch", response_model=BatchResponse)
+async def chat_batch(
+    request: BatchRequest,
+    service=Depends(get_agent_service)
+):
+    """
+    Answer several questions at once (dashboards, scheduled reports). The data
+    they need is fetched once and the questions are analysed concurrently.
+    """
+    try:
+        answers, data_plan = await service.chat_batch(request.session_id, request.questions)
+    except ValueError as e:
+        status = 404 if "Session not found" in str(e) else 400
         raise HTTPException(status_code=status, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent Error: {str(e)}")
+    return BatchResponse(session_id=request.session_id, answers=answers, data_plan=data_plan)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, jobs: JobRunner = Depends(get_job_runner)):
+    """Status of a background chat job; `result` is set once it succeeded."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/sessions", response_model=List[dict])
-async def list_sessions():
-    """List all sessions ordered by last active"""
-    # Logic moved to route handler for direct DB access
-    from app.db.database import SessionLocal
-    from app.models.database_models import Session, Message as DBMessage
-    
-    db = SessionLocal()
+async def list_sessions(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = None,
+    service=Depends(get_agent_service)
+):
+    """
+    List sessions ordered by last active. Without `limit` or `cursor` every
+    session is returned; otherwise one page at a time, with the cursor of
+    the next page in the X-Next-Cursor header.
+    """
+    if cursor and limit is None:
+        limit = SESSIONS_PAGE_SIZE
     try:
-        sessions = db.query(Session).order_by(Session.last_active.desc()).all()
-        result = []
-        for s in sessions:
-            # Fetch first user message for preview
-            first_msg = db.query(DBMessage).filter(DBMessage.session_id == s.id, DBMessage.role == "user").order_by(DBMessage.timestamp).first()
-            preview_text = first_msg.content if first_msg else "New Analysis"
-            if len(preview_text) > 40:
-                preview_text = preview_text[:37] + "..."
-                
-            result.append({
-                "id": s.id,
-                "store_url": s.store_url,
-                "created_at": s.created_at,
-                "last_active": s.last_active,
-                "preview": preview_text
-            })
-        return result
-    finally:
-        db.close()
+        sessions, next_cursor = await service.list_sessions(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return sessions
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
@@ -106,13 +166,37 @@ async def delete_session(session_id: str):
 @router.get("/sessions/{session_id}/history", response_model=List[Message])
 async def get_history(
     session_id: str,
-    service: AgentService = Depends(get_agent_service)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    service=Depends(get_agent_service)
 ):
-    """Retrieve chat history for a session."""
+    """
+    Retrieve chat history for a session: all of it without `limit`, `before`
+    or `after`, otherwise one page at a time (the newest page by default).
+    X-Prev-Cursor pages back as `before`; X-Next-Cursor fetches newer messages as `after`.
+    The ETag changes with each new message, so reloads can revalidate with If-None-Match.
+    """
+    if (before or after) and limit is None:
+        limit = HISTORY_PAGE_SIZE
     try:
-        history = await service.get_history(session_id)
-        return history
+        etag = await service.history_etag(session_id)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        history, prev_cursor, next_cursor = await service.get_history_page(
+            session_id, limit=limit, before=before, after=after
+        )
     except ValueError as e:
-        raise HTTPException(status_code=404, detail="Session not found")
+        if "Session not found" in str(e):
+            raise HTTPException(status_code=404, detail="Session not found")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
+    response.headers["ETag"] = etag
+    if prev_cursor:
+        response.headers["X-Prev-Cursor"] = prev_cursor
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return history
@@ -1,13 +1,106 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
 import os
+import threading
+from typing import Optional
 
-DATABASE_URL = "sqlite:///./chat_history.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.core.config import settings
+
+# Applied to every new SQLite connection. WAL lets readers run during a write
+# and, with synchronous=NORMAL, fsyncs at checkpoints instead of every commit
+# (a power loss can drop the last commits but never corrupts the file).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64 * 1024,          # KiB when negative: 64 MiB page cache
+    "mmap_size": 256 * 1024 * 1024,    # Read pages through the OS page cache
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,              # ms to wait for the writer lock instead of failing
+}
+
+def apply_sqlite_pragmas(engine: Engine) -> Engine:
+    """Set SQLITE_PRAGMAS on each connection the engine opens (no-op for other databases)."""
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+def normalize_database_url(url: str) -> str:
+    """Route postgres:// and postgresql:// URLs to the psycopg 3 driver."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    parsed = make_url(url)
+    if parsed.drivername == "postgresql":
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    return parsed.render_as_string(hide_password=False)
+
+def build_engine(url: str) -> Engine:
+    """
+    Engine for the chat history database. SQLite gets the pragmas above;
+    Postgres gets a bounded pool with liveness checks and psycopg's
+    server-side prepared statements for the repeated history and listing queries.
+    """
+    url = normalize_database_url(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        return apply_sqlite_pragmas(create_engine(url, connect_args={"check_same_thread": False}))
+    return create_engine(
+        url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args={
+            "prepare_threshold": settings.DATABASE_PREPARE_THRESHOLD,
+            "application_name": "shopify-analyst-agent",
+        },
+    )
+
+DATABASE_URL = settings.DATABASE_URL
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """The process's engine, created on first use (after a pre-fork server has forked)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = build_engine(DATABASE_URL)
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+def _discard_inherited_pool() -> None:
+    # A child must not reuse the parent's connections; close=False leaves them to the parent
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_discard_inherited_pool)
+
+def __getattr__(name: str):
+    # `from app.db.database import engine` keeps working, without connecting at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that creates the engine on the first session."""
+    def __call__(self, **local_kw) -> Session:
+        if "bind" not in self.kw and "bind" not in local_kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
@@ -1,10 +1,45 @@
-from sqlalchemy import create_engine
-from app.db.database import DATABASE_URL, engine
-from app.models.database_models import Base
+import os
+from typing import Optional
+from sqlalchemy import inspect, make_url, text
+from sqlalchemy.engine import Engine
+from app.db.database import DATABASE_URL, get_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "alembic.ini")
+# Newest revision in alembic/versions (a test keeps them in sync); lets startup skip alembic
+HEAD_REVISION = "0004"
+# Replicas starting together against one Postgres take turns migrating
+MIGRATION_LOCK_ID = 0x5350_4141  # arbitrary, fixed pg_advisory_xact_lock key
+
+def schema_is_current(bind: Engine) -> bool:
+    """Whether the database is already at HEAD_REVISION (one query, no alembic import)."""
+    with bind.connect() as connection:
+        if not inspect(connection).has_table("alembic_version"):
+            return False
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == HEAD_REVISION
+
+def create_schema(bind: Optional[Engine] = None):
+    """
+    Bring the database to the latest migration (alembic upgrade head).
+    Migrations are idempotent for databases created before they existed.
+    """
+    bind = bind or get_engine()
+    if schema_is_current(bind):
+        return
+    # alembic is only imported when there is something to migrate
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
 def init_database():
-    print(f"Initializing database at {DATABASE_URL}...")
-    Base.metadata.create_all(bind=engine)
+    print(f"Initializing database at {make_url(DATABASE_URL).render_as_string(hide_password=True)}...")
+    create_schema()
     print("✅ Database tables created successfully.")
 
 if __name__ == "__main__":
@@ -1,19 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import router as api_router
-from app.db.database import engine, Base
-# Import models to ensure they are registered with Base
-from app.models import database_models 
+from app.api.routes import router as api_router, get_agent_service, get_job_runner
+from app.db.init_db import create_schema
+from app.services.message_writer import get_message_writer
+from app.services.store_registry import get_store_registry
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+async def warm_up():
+    await asyncio.to_thread(get_agent_service)
+    # Then start loading the synced orders before the first question needs them
+    from app.analytics.store import get_local_store
+    get_local_store().refresh_soon()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing connects or loads the agent at import, so pre-fork servers can
+    # import the app once and each worker initializes its own state here.
+    # Create database tables (and columns added since they were created)
+    await asyncio.to_thread(create_schema)
+    # Chat messages are committed in batches; flush the queue before exiting
+    writer = get_message_writer()
+    jobs = get_job_runner()
+    await writer.start()
+    await jobs.start()
+    # Load langchain/pandas and the LLM client while the app already answers
+    warmup = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        # Jobs write messages, so they stop first
+        await jobs.stop()
+        await writer.stop()
+        await asyncio.wait([warmup])
+        # Pooled connections of every store client
+        await get_store_registry().close()
 
 app = FastAPI(
     title="Shopify Analyst Agent API",
     description="Backend for Shopify AI Agent",
     version="0.1.0",
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -24,6 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "ETag"],
 )
 
 app.include_router(api_router, prefix="/api")
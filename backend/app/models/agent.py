@@ -1,10 +1,16 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from datetime import datetime
 
 class AgentRequest(BaseModel):
     session_id: str
     message: str = Field(..., min_length=1, max_length=500)
+    # Run as a background job: returns a job id at once, poll GET /api/jobs/{id}
+    background: bool = False
+
+class BatchRequest(BaseModel):
+    session_id: str
+    questions: List[Annotated[str, Field(min_length=1, max_length=500)]] = Field(..., min_length=1, max_length=10)
 
 class Message(BaseModel):
     role: str  # "user" or "assistant"
@@ -18,5 +24,20 @@ class AgentResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     thought_process: Optional[str] = None  # For debugging
 
+class BatchResponse(BaseModel):
+    session_id: str
+    answers: List[AgentResponse]  # In question order
+    data_plan: str  # Datasets fetched once for the batch
+
 class SessionCreate(BaseModel):
     store_url: str = Field(..., pattern=r'^https?://[\w\-]+(\.[\w\-]+)+[/#?]?.*$')
+
+class JobStatus(BaseModel):
+    job_id: str
+    session_id: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[AgentResponse] = None
+    error: Optional[str] = None
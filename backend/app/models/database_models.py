@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 import uuid
 from datetime import datetime
@@ -6,17 +6,40 @@ from app.db.database import Base
 
 class Session(Base):
     __tablename__ = "sessions"
+    # Keyset pagination of the session list: newest activity first, id breaks ties
+    __table_args__ = (Index("ix_sessions_last_active_id", "last_active", "id"),)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     store_url = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_active = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Rolling summary of the messages older than the prompt's history window
+    history_summary = Column(Text, nullable=True)
+    summarized_through = Column(DateTime, nullable=True)
+    # First user message, truncated for the sidebar; set once so listing needs no join
+    preview = Column(String(40), nullable=True)
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
+    jobs = relationship("Job", back_populates="session", cascade="all, delete-orphan")
 
 class Message(Base):
     __tablename__ = "messages"
+    # History window (last N by timestamp) and first question of a session
+    __table_args__ = (Index("ix_messages_session_id_timestamp", "session_id", "timestamp"),)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
     role = Column(String, nullable=False)  # "user" or "assistant"
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     session = relationship("Session", back_populates="messages")
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    result = Column(Text, nullable=True)  # AgentResponse JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    session = relationship("Session", back_populates="jobs")
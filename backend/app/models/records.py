@@ -0,0 +1,211 @@
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Any, ClassVar, Dict, FrozenSet, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.models.shopify import Customer, Order, Product
+from app.utils.money import MONEY_FIELDS, to_cents
+
+
+def _schema(model: Type[BaseModel], *extra: str) -> Tuple[str, ...]:
+    """Record fields: the pydantic model's fields plus the extra raw keys analytics read."""
+    return tuple(model.model_fields) + tuple(name for name in extra if name not in model.model_fields)
+
+
+class Record(MutableMapping):
+    """
+    Slotted, dict-compatible record for one Shopify object.
+
+    Only the schema's keys are kept, repeated strings (city, title,
+    currency...) are interned, and nested objects are records too. Reads
+    work like the raw dict (`order['line_items']`, `order.get('customer')`,
+    `pd.DataFrame(records)`); keys assigned outside the schema are kept in
+    a per-record overflow dict.
+    """
+    __slots__ = ('_extra',)
+
+    _fields: ClassVar[Tuple[str, ...]] = ()
+    _field_set: ClassVar[FrozenSet[str]] = frozenset()
+    _interned: ClassVar[FrozenSet[str]] = frozenset()
+    _money: ClassVar[Tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    def __init__(self, **values: Any):
+        self._extra: Optional[Dict[str, Any]] = None
+        for name in self._fields:
+            value = values.get(name)
+            if name in self._interned and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_raw(cls, raw: Mapping) -> "Record":
+        return cls(**{name: raw.get(name) for name in cls._fields})
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._field_set:
+            setattr(self, key, None)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_set or (self._extra is not None and key in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._fields
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self._fields) + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain nested dicts/lists, e.g. for json.dumps."""
+        def plain(value):
+            if isinstance(value, Record):
+                return value.to_dict()
+            if isinstance(value, list):
+                return [plain(v) for v in value]
+            return value
+        return {key: plain(value) for key, value in self.items()}
+
+
+class AddressRecord(Record):
+    _fields = ('city', 'province', 'country', 'zip')
+    __slots__ = _fields
+    _interned = frozenset(('city', 'province', 'country'))
+
+
+class CustomerRecord(Record):
+    _fields = _schema(Customer, 'updated_at', 'state', 'default_address', 'total_spent_cents')
+    __slots__ = _fields
+    _interned = frozenset(('state',))
+    _money = ('total_spent',)
+
+    @classmethod
+    def from_raw(cls, raw: Mapping) -> "CustomerRecord":
+        record = super().from_raw(raw)
+        address = raw.get('default_address')
+        record.default_address = AddressRecord.from_raw(address) if isinstance(address, Mapping) else None
+        return record
+
+
+class LineItemRecord(Record):
+    _fields = ('id', 'title', 'quantity', 'price', 'price_cents', 'product_id', 'variant_id', 'sku', 'vendor')
+    __slots__ = _fields
+    _interned = frozenset(('title', 'vendor', 'sku'))
+    _money = ('price',)
+
+
+class VariantRecord(Record):
+    _fields = ('id', 'title', 'price', 'price_cents', 'sku', 'inventory_quantity')
+    __slots__ = _fields
+    _interned = frozenset(('title', 'sku'))
+    _money = ('price',)
+
+
+class OrderRecord(Record):
+    _fields = _schema(
+        Order,
+        'name', 'email', 'updated_at', 'cancelled_at', 'financial_status', 'fulfillment_status',
+        'subtotal_price', 'total_tax', 'billing_address', 'shipping_address',
+        'total_price_cents', 'subtotal_price_cents', 'total_tax_cents'
+    )
+    __slots__ = _fields
+    _interned = frozenset(('currency', 'financial_status', 'fulfillment_status'))
+    _money = tuple(MONEY_FIELDS)
+
+    @classmethod
+    def from_raw(cls, raw: Mapping) -> "OrderRecord":
+        record = super().from_raw(raw)
+        # Same defaults the REPL relied on before: safe city and customer name extraction
+        customer = raw.get('customer')
+        record.customer = (
+            CustomerRecord.from_raw(customer) if isinstance(customer, Mapping)
+            else CustomerRecord(first_name='Unknown', last_name='', id='Unknown')
+        )
+        billing = raw.get('billing_address')
+        record.billing_address = (
+            AddressRecord.from_raw(billing) if isinstance(billing, Mapping)
+            else AddressRecord(city='Unknown', country='Unknown')
+        )
+        shipping = raw.get('shipping_address')
+        record.shipping_address = AddressRecord.from_raw(shipping) if isinstance(shipping, Mapping) else None
+        record.line_items = [LineItemRecord.from_raw(i) for i in raw.get('line_items') or [] if isinstance(i, Mapping)]
+        return record
+
+
+class ProductRecord(Record):
+    _fields = _schema(Product, 'updated_at', 'handle', 'tags')
+    __slots__ = _fields
+    _interned = frozenset(('vendor', 'product_type', 'status'))
+
+    @classmethod
+    def from_raw(cls, raw: Mapping) -> "ProductRecord":
+        record = super().from_raw(raw)
+        record.variants = [VariantRecord.from_raw(v) for v in raw.get('variants') or [] if isinstance(v, Mapping)]
+        return record
+
+
+RECORD_TYPES: Dict[str, Type[Record]] = {
+    'orders': OrderRecord,
+    'products': ProductRecord,
+    'customers': CustomerRecord,
+}
+
+
+def _convert_money(records: List[Record]) -> None:
+    """Parse money strings to exact cents in bulk; keep a float copy under the original key."""
+    if not records:
+        return
+    for field in records[0]._money:
+        present = [record for record in records if record[field] is not None]
+        if not present:
+            continue
+        cents = to_cents([record[field] for record in present])
+        for record, value in zip(present, cents.tolist()):
+            record[f"{field}_cents"] = value
+            record[field] = value / 100
+
+
+def compact_records(resource: str, records: List[Any]) -> List[Any]:
+    """
+    Ingest raw API records into compact records of the resource's type.
+    Unknown resources are returned unchanged.
+    """
+    record_type = RECORD_TYPES.get(resource)
+    if record_type is None:
+        return records
+
+    compact = [record_type.from_raw(raw) for raw in records if isinstance(raw, Mapping)]
+    _convert_money(compact)
+    if record_type is OrderRecord:
+        _convert_money([item for order in compact for item in order.line_items])
+        _convert_money([order.customer for order in compact])
+    elif record_type is ProductRecord:
+        _convert_money([variant for product in compact for variant in product.variants])
+    return compact
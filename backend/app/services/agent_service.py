@@ -1,26 +1,51 @@
+import asyncio
 import logging
 import uuid
 import re
+from collections.abc import Mapping
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from langchain_groq import ChatGroq
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_core.tools import BaseTool
-from langchain_experimental.tools import PythonAstREPLTool
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session as DBSession
 
-from app.tools.shopify_tool import GetShopifyDataTool
-from app.core.prompts import SHOPIFY_AGENT_SYSTEM_PROMPT
+from app.tools.shopify_tool import GetShopifyDataTool, ResourceRequest
+from app.tools.rollup_tool import QueryStoreMetricsTool, EstimateStoreMetricsTool
+from app.tools.metric_tool import GetStoreMetricTool
+from app.tools.repl_tool import CachedPythonREPLTool
+from app.analytics.store import LocalOrderStore, get_local_store
+from app.analytics.join_index import JoinIndex
+from app.services.tool_memo import ToolCallMemo, fetch_failed, repl_state_changed
+from app.services.repl_cache import dataset_version
+from app.services.conversation_memory import load_conversation_context
+from app.services.message_writer import get_message_writer, merge_pending
+from app.services.batch_planner import plan_batch
+from app.services.fetch_cache import SharedFetchCache
+from app.services.store_registry import StoreClient, get_store_registry
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.etag import make_etag
+from app.core.prompts import SHOPIFY_AGENT_SYSTEM_PROMPT, REFERENCE_DATE, build_date_context
 from app.core.config import settings
 from app.models.agent import AgentResponse, Message as ApiMessage
 from app.db.database import SessionLocal
 from app.models.database_models import Session, Message
+from app.utils.date_resolver import ResolvedDateRange, resolve_date_ranges
+from app.models.records import compact_records
+from app.services.query_planner import PlannedResult
 
 # Setup logging
 logger = logging.getLogger("agent_service")
 logging.basicConfig(level=logging.INFO)
 
+def session_preview(text: Optional[str]) -> str:
+    """Sidebar label of a session: its first question, cut to 40 characters."""
+    if not text:
+        return "New Analysis"
+    return text if len(text) <= 40 else text[:37] + "..."
+
 class AgentService:
     def __init__(self):
         self.llm = self._initialize_llm()
@@ -35,17 +60,160 @@ class AgentService:
             max_retries=1, # Fail fast on rate limits
         )
     
-    def _create_tools_for_request(self, repl_locals: Dict[str, Any]) -> List[BaseTool]:
+    def _create_tools_for_request(
+        self,
+        repl_locals: Dict[str, Any],
+        date_ranges: Optional[List[ResolvedDateRange]] = None,
+        fetch_cache: Optional[SharedFetchCache] = None,
+        store_client: Optional[StoreClient] = None
+    ) -> List[BaseTool]:
         """Create FRESH instances of tools for every single request"""
-        return [
-            GetShopifyDataTool(),
-            PythonAstREPLTool(locals=repl_locals) # Connected memory scope
+        # A single unambiguous date range becomes the default order window
+        default_filters = date_ranges[0].as_filters() if date_ranges and len(date_ranges) == 1 else {}
+        namespace = store_client.namespace if store_client else ""
+        repl_tool = CachedPythonREPLTool(locals=repl_locals, namespace=namespace) # Connected memory scope
+        tools = [
+            GetShopifyDataTool(default_filters=default_filters, fetch_cache=fetch_cache, store_client=store_client),
+            repl_tool
         ]
+        if store_client is not None and not store_client.is_default:
+            # Synced rollups and the snapshot hold the default store's orders only
+            tools.append(GetStoreMetricTool(store=LocalOrderStore(), store_client=store_client))
+            return tools
+        # Rollup lookups are only offered once orders have been synced locally.
+        # A newer snapshot loads in the background; this request uses the current one
+        store = get_local_store()
+        store.refresh_soon()
+        tools.append(GetStoreMetricTool(store=store, store_client=store_client))
+        if store.is_ready:
+            tools.append(QueryStoreMetricsTool(store=store))
+            if len(store.rollups) >= settings.APPROXIMATE_MIN_ORDERS:
+                tools.append(EstimateStoreMetricsTool(store=store))
+        if store.snapshot is not None:
+            # Views over the shared mmapped snapshot; nothing is copied per request
+            repl_locals['store_orders'] = store.snapshot.orders_frame()
+            repl_locals['store_line_items'] = store.snapshot.line_items_frame()
+            # Windowed views found by binary search on the sorted created_at index
+            repl_locals['orders_between'] = store.snapshot.orders_frame
+            repl_locals['line_items_between'] = store.snapshot.line_items_frame
+            for name in ('store_orders', 'store_line_items', 'orders_between', 'line_items_between'):
+                repl_tool.versions[name] = f"snapshot:{store.snapshot.version}"
+        return tools
     
+    def _inject_dataset(
+        self,
+        names: List[str],
+        data: Any,
+        label: str,
+        repl_locals: Dict[str, Any],
+        tool_map: Dict[str, BaseTool]
+    ) -> str:
+        """
+        Store one fetch result in the REPL scope under `names` and return the
+        short description the LLM sees instead of the records (Ghost Data Pattern).
+        """
+        if isinstance(data, int):
+            # Count mode: nothing to inject, the number is the answer
+            return f"Count: {data} matching {label}."
+        if not isinstance(data, (list, dict)):
+            # Error messages are passed through as-is
+            return str(data)
+
+        # 1. Ingest into compact dict-compatible records (exact cents, safe defaults)
+        #    and inject into shared locals for this request
+        if isinstance(data, list):
+            plan = getattr(data, "plan", None)
+            data = compact_records(label, data)
+            if plan is not None:
+                data = PlannedResult(data, plan)
+        injected = {name: data for name in names}
+        repl_locals.update(injected)
+        
+        # 2. Force update the specific tool instance to be safe
+        if "python_repl_ast" in tool_map:
+            # LangChain's PythonAstREPLTool stores locals in self.locals
+            tool_map["python_repl_ast"].locals.update(injected)
+            # Content version, so cached REPL results over identical data are reused
+            version = dataset_version(data)
+            tool_map["python_repl_ast"].versions.update({name: version for name in names})
+        
+        # 3. GHOST DATA: Do NOT show full data to LLM to save tokens
+        # Create a schema summary instead
+        item_count = len(data) if isinstance(data, list) else 1
+        
+        keys_preview = "unknown_keys"
+        if isinstance(data, list):
+            if data and isinstance(data[0], Mapping):
+                keys_preview = ", ".join(list(data[0].keys())[:5])
+            else:
+                keys_preview = "empty_list" if not data else "no_dict_items"
+        else:
+            keys_preview = ", ".join(list(data.keys())[:5])
+        
+        logger.info(f"Ghost Data: Injected {item_count} {label} records as {names}. Hiding from LLM prompt.")
+        variables = " and ".join(f"'{name}'" for name in names)
+        summary = (
+            f"Successfully fetched {item_count} {label} records. \n"
+            f"Data is stored in python variable {variables}. \n"
+            f"Row keys preview: [{keys_preview}, ...]"
+        )
+        plan = getattr(data, "plan", None)
+        if plan is not None:
+            summary += f"\n{plan.describe()}"
+        return summary
+
+    def _handle_shopify_observation(
+        self,
+        observation: Any,
+        tool_input: Any,
+        repl_locals: Dict[str, Any],
+        tool_map: Dict[str, BaseTool]
+    ) -> str:
+        """Route get_shopify_data results into the REPL and build the observation text."""
+        if isinstance(tool_input, dict) and tool_input.get("requests") and isinstance(observation, dict):
+            # Multi-resource fetch: every result keeps its own variable so nothing is overwritten
+            labels = {}
+            for request in tool_input["requests"]:
+                if isinstance(request, dict):
+                    resource_request = ResourceRequest.model_validate(request)
+                    labels[GetShopifyDataTool.variable_name(resource_request)] = resource_request.resource
+            datasets = [([name], data, labels.get(name, name)) for name, data in observation.items()]
+        else:
+            resource = tool_input.get("resource") if isinstance(tool_input, dict) else None
+            names = ["shopify_data"] + ([f"{resource}_data"] if resource else [])
+            datasets = [(names, observation, resource or "records")]
+
+        summary = "\n".join(
+            self._inject_dataset(names, data, label, repl_locals, tool_map)
+            for names, data, label in datasets
+        )
+        
+        # JOIN INDEX: rebuilt once per new products/customers dataset, then O(1) lookups in the REPL
+        joined = {
+            label: repl_locals.get(names[-1]) for names, data, label in datasets
+            if label in ("products", "customers") and isinstance(data, list)
+        }
+        if joined:
+            def rows(value):
+                return value if isinstance(value, list) else ()
+            products = rows(joined.get("products", repl_locals.get("products_data")))
+            customers = rows(joined.get("customers", repl_locals.get("customers_data")))
+            join_index = JoinIndex(products=products, customers=customers)
+            repl_locals["join_index"] = join_index
+            if "python_repl_ast" in tool_map:
+                tool_map["python_repl_ast"].locals["join_index"] = join_index
+                tool_map["python_repl_ast"].versions["join_index"] = f"join:{dataset_version(products)}:{dataset_version(customers)}"
+            summary += "\n'join_index' is ready: join_index.product_for(item), join_index.customer_for(order), join_index.line_items_frame(orders)."
+        if any(isinstance(data, (list, dict)) for _, data, _ in datasets):
+            summary += "\nDo NOT output the full data. Use python to analyze it."
+        return summary
+
     async def create_session(self, store_url: str) -> str:
         """Create new session in DB"""
         if not re.match(r'^https?://[\w\-]+(\.[\w\-]+)+[/#?]?.*$', store_url):
              raise ValueError("Invalid store URL format.")
+        # Refuse stores this deployment has no credentials for
+        get_store_registry().credentials(store_url)
 
         db: DBSession = SessionLocal()
         try:
@@ -65,6 +233,8 @@ class AgentService:
     
     async def get_history(self, session_id: str) -> List[ApiMessage]:
         """Get conversation history from DB"""
+        # Read-your-writes: messages still queued for writing come last
+        pending = get_message_writer().pending_messages(session_id)
         db: DBSession = SessionLocal()
         try:
             session = db.query(Session).filter(Session.id == session_id).first()
@@ -73,6 +243,7 @@ class AgentService:
                 
             # SQLite stores datetime, but we ensure sorting
             messages = db.query(Message).filter(Message.session_id == session_id).order_by(Message.timestamp).all()
+            messages = merge_pending(messages, pending)
             
             return [
                 ApiMessage(
@@ -84,36 +255,242 @@ class AgentService:
         finally:
             db.close()
 
+    async def history_etag(self, session_id: str) -> str:
+        """ETag of a session's history: the id of its newest message (one indexed lookup)."""
+        pending = get_message_writer().pending_messages(session_id)
+        db: DBSession = SessionLocal()
+        try:
+            if not db.query(Session.id).filter(Session.id == session_id).first():
+                raise ValueError("Session not found")
+            if pending:
+                return make_etag(pending[-1].id)
+            last_id = (
+                db.query(Message.id)
+                .filter(Message.session_id == session_id)
+                .order_by(Message.timestamp.desc(), Message.id.desc())
+                .limit(1)
+                .scalar()
+            )
+            return make_etag(last_id)
+        finally:
+            db.close()
+
+    async def get_history_page(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> Tuple[List[ApiMessage], Optional[str], Optional[str]]:
+        """
+        One page of a session's history in chronological order, by keyset:
+        the newest `limit` messages, those older than `before`, or the first
+        `limit` newer than `after` (no limit when it is None). Returns (messages, prev_cursor,
+        next_cursor): prev_cursor pages back as `before` and is None when
+        nothing older is left; next_cursor fetches newer messages as `after`.
+        """
+        if before and after:
+            raise ValueError("Use either before or after, not both.")
+        forward = after is not None
+        cursor = decode_cursor(after or before) if (after or before) else None
+
+        def beyond(timestamp: datetime, message_id: str) -> bool:
+            key = (timestamp, message_id)
+            return cursor is None or (key > cursor if forward else key < cursor)
+
+        pending = [m for m in get_message_writer().pending_messages(session_id) if beyond(m.timestamp, m.id)]
+        db: DBSession = SessionLocal()
+        try:
+            if not db.query(Session.id).filter(Session.id == session_id).first():
+                raise ValueError("Session not found")
+            query = db.query(Message).filter(Message.session_id == session_id)
+            if cursor:
+                timestamp, message_id = cursor
+                if forward:
+                    query = query.filter(or_(
+                        Message.timestamp > timestamp,
+                        and_(Message.timestamp == timestamp, Message.id > message_id)
+                    ))
+                else:
+                    query = query.filter(or_(
+                        Message.timestamp < timestamp,
+                        and_(Message.timestamp == timestamp, Message.id < message_id)
+                    ))
+            if forward:
+                query = query.order_by(Message.timestamp, Message.id)
+            else:
+                query = query.order_by(Message.timestamp.desc(), Message.id.desc())
+            # Queued messages are the newest, so they compete with the committed page for its slots
+            if limit is not None:
+                query = query.limit(limit + 1)
+            rows = sorted(merge_pending(query.all(), pending), key=lambda m: (m.timestamp, m.id), reverse=not forward)
+        finally:
+            db.close()
+
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        prev_cursor = encode_cursor(rows[0].timestamp, rows[0].id) if rows and (has_more or forward) else None
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id) if rows else after
+        messages = [ApiMessage(role=m.role, content=m.content, timestamp=m.timestamp) for m in rows]
+        return messages, prev_cursor, next_cursor
+
+    async def list_sessions(
+        self, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of sessions, most recently active first, in a single query
+        (every session when `limit` is None). Returns the page and the cursor
+        of the next one (None on the last page).
+        """
+        db: DBSession = SessionLocal()
+        try:
+            # Sessions created before previews were stored fall back to their first user message
+            query = db.query(
+                Session.id, Session.store_url, Session.created_at, Session.last_active, Session.preview
+            ).order_by(Session.last_active.desc(), Session.id.desc())
+            if cursor:
+                last_active, session_id = decode_cursor(cursor)
+                query = query.filter(or_(
+                    Session.last_active < last_active,
+                    and_(Session.last_active == last_active, Session.id < session_id)
+                ))
+            # Limit first, so the preview fallback only runs for the rows of this page
+            if limit is not None:
+                query = query.limit(limit + 1)
+            page_rows = query.subquery()
+            # Sessions created before previews were stored fall back to their first user message
+            first_question = (
+                select(Message.content)
+                .where(Message.session_id == page_rows.c.id, Message.role == "user")
+                .order_by(Message.timestamp)
+                .limit(1)
+                .correlate(page_rows)
+                .scalar_subquery()
+            )
+            rows = db.query(
+                page_rows.c.id, page_rows.c.store_url, page_rows.c.created_at, page_rows.c.last_active,
+                func.coalesce(page_rows.c.preview, first_question).label("preview")
+            ).order_by(page_rows.c.last_active.desc(), page_rows.c.id.desc()).all()
+
+            page = [
+                {
+                    "id": row.id,
+                    "store_url": row.store_url,
+                    "created_at": row.created_at,
+                    "last_active": row.last_active,
+                    "preview": session_preview(row.preview)
+                } for row in rows[:limit]
+            ]
+            has_more = limit is not None and len(rows) > limit
+            next_cursor = encode_cursor(rows[limit - 1].last_active, rows[limit - 1].id) if has_more else None
+            return page, next_cursor
+        finally:
+            db.close()
+
     def _check_rate_limit(self, session_id: str, db: DBSession):
         # Generic rate limit check (simplified for DB version)
         pass
 
-    async def chat(self, session_id: str, message: str) -> AgentResponse:
-        """Execute agent with user message using manual ReAct loop"""
+    async def chat_batch(self, session_id: str, questions: List[str]) -> Tuple[List[AgentResponse], str]:
+        """
+        Answer several questions together: the datasets they need are fetched
+        once, then every question runs its own agent loop concurrently over
+        copies of them. Returns the answers in order and the data plan.
+        The questions are independent of the conversation: they neither see
+        the session's history nor add to it.
+        """
+        db: DBSession = SessionLocal()
+        try:
+            session = db.query(Session.store_url).filter(Session.id == session_id).first()
+            if not session:
+                raise ValueError("Session not found")
+        finally:
+            db.close()
+
+        plan = plan_batch(questions, REFERENCE_DATE)
+        # Later fetches the loops make on their own are shared too
+        fetch_cache = SharedFetchCache()
+        registry = get_store_registry()
+        store_client = await registry.acquire(session.store_url)
+        try:
+            datasets = await GetShopifyDataTool(fetch_cache=fetch_cache, store_client=store_client).arun(
+                {"requests": [request.model_dump(exclude_none=True) for request in plan.requests]}
+            )
+        finally:
+            registry.release(store_client)
+        answers = await asyncio.gather(*[
+            self.chat(
+                session_id, question,
+                preloaded={f"{resource}_data": datasets[f"{resource}_data"] for resource in resources},
+                fetch_cache=fetch_cache,
+                record_history=False
+            )
+            for question, resources in zip(questions, plan.resources)
+        ])
+        return list(answers), plan.describe()
+
+    async def chat(
+        self,
+        session_id: str,
+        message: str,
+        preloaded: Optional[Dict[str, Any]] = None,
+        fetch_cache: Optional[SharedFetchCache] = None,
+        record_history: bool = True
+    ) -> AgentResponse:
+        """
+        Execute agent with user message using manual ReAct loop.
+        `preloaded` datasets (variable name -> records) are injected before the
+        loop starts; batches pass them with their shared `fetch_cache`.
+        Without `record_history` the question is answered on its own: the
+        session's history is neither read nor written.
+        """
         db: DBSession = SessionLocal()
+        registry = get_store_registry()
+        store_client: Optional[StoreClient] = None
         try:
             session = db.query(Session).filter(Session.id == session_id).first()
             if not session:
                 raise ValueError("Session not found")
+            # The session's store: its credentials, pooled client and rate-limit bucket
+            store_client = await registry.acquire(session.store_url)
             
-            # Update last activity
-            session.last_active = datetime.utcnow()
-            
-            # Save User Message
-            user_msg = Message(session_id=session_id, role="user", content=message, timestamp=datetime.utcnow())
-            db.add(user_msg)
-            db.commit() 
+            # Save User Message (write-behind; also updates last activity and the preview)
+            writer = get_message_writer()
+            if record_history:
+                await writer.add_message(
+                    session_id, "user", message,
+                    preview=session_preview(message) if session.preview is None else None
+                )
             
             if "ignore previous instructions" in message.lower():
                  return AgentResponse(session_id=session_id, message="I cannot process that request.")
             
             # --- CRITICAL FIX: Initialize tools FRESH for this request ---
             repl_locals = {} # Shared state for this request only
-            tools = self._create_tools_for_request(repl_locals)
+            # Resolve "last 7 days", "this month", "Q3"... server-side to skip a REPL round-trip
+            date_ranges = resolve_date_ranges(message, REFERENCE_DATE)
+            tools = self._create_tools_for_request(repl_locals, date_ranges, fetch_cache, store_client)
             tool_map = {tool.name: tool for tool in tools}
+            preloaded_text = ""
+            if preloaded:
+                requests = [{"resource": name.removesuffix("_data")} for name in preloaded]
+                summary = self._handle_shopify_observation(preloaded, {"requests": requests}, repl_locals, tool_map)
+                preloaded_text = (
+                    "**PRELOADED DATA:**\n"
+                    "This question is part of a batch; its data was already fetched:\n"
+                    f"{summary}\n"
+                    "Use these variables directly and only call `get_shopify_data` for anything not listed here. "
+                    "Filter `orders_data` to this question's own dates if they are narrower.\n\n"
+                )
             
-            # Load Context (Last 5 messages to save tokens)
-            recent_msgs = db.query(Message).filter(Message.session_id == session_id).order_by(Message.timestamp).all()[-5:]
+            # Load Context: last few messages verbatim, older turns as a rolling summary
+            history_summary, recent_msgs = None, []
+            if record_history:
+                history_summary, recent_msgs = load_conversation_context(db, session, writer.pending_messages(session_id))
+                if db.is_modified(session):
+                    db.commit()
             
             # Construct Prompt
             tools_desc = "\n".join([f"{t.name}: {t.description}" for t in tools])
@@ -124,6 +501,7 @@ class AgentService:
             for msg in recent_msgs: 
                 role = "Human" if msg.role == "user" else "AI"
                 history_text += f"{role}: {msg.content}\n"
+            summary_text = f"Summary of earlier conversation:\n{history_summary}\n\n" if history_summary else ""
                 
             full_prompt = f"""{SHOPIFY_AGENT_SYSTEM_PROMPT}
 
@@ -152,13 +530,17 @@ Final Answer: [your response here]
 **CRITICAL: You must ALWAYS start your final response with "Final Answer:" or it will be lost.**
 
 **DATA PROCESSING:**
-When you fetch data using `get_shopify_data`, it is **automatically saved** to a python variable named `shopify_data`.
-You do NOT need to copy-paste the JSON. Just use `shopify_data` in your `python_repl_ast` code.
+When you fetch data using `get_shopify_data`, it is **automatically saved** to a python variable named `shopify_data`,
+and also to `<resource>_data` (`orders_data`, `products_data` or `customers_data`).
+When you fetch several resources in one call with `requests`, each one is saved ONLY to its own `<resource>_data` variable,
+or to its `name`. Requests for the same resource (e.g. orders for two periods) need distinct names.
+You do NOT need to copy-paste the JSON. Just use these variables in your `python_repl_ast` code.
 Example: `df = pd.DataFrame(shopify_data)`
 
-Begin!
+{build_date_context(date_ranges)}
+{preloaded_text}Begin!
 
-Previous conversation history:
+{summary_text}Previous conversation history:
 {history_text}
 
 New input: {message}
@@ -166,6 +548,8 @@ New input: {message}
             
             current_scratchpad = ""
             final_answer = ""
+            memo = ToolCallMemo() # Tool results for this request only
+            force_final = False
             
             try:
                 for i in range(15): # Max iterations
@@ -180,6 +564,11 @@ New input: {message}
                         output = " ".join([str(item) for item in output])
                     current_scratchpad += f"\n{output}"
                     
+                    # Scratchpad already ends with "Final Answer:", so the output IS the answer
+                    if force_final:
+                        final_answer = output.split("Final Answer:")[-1].strip()
+                        break
+                    
                     # Check for Final Answer
                     if "Final Answer:" in output:
                         final_answer = output.split("Final Answer:")[-1].strip()
@@ -210,6 +599,7 @@ New input: {message}
                         
                         if action in tool_map:
                             tool = tool_map[action]
+                            memo_key = None
                             try:
                                 # Attempt to parse JSON input (for multi-arg tools)
                                 try:
@@ -217,10 +607,11 @@ New input: {message}
                                     # Try naive parse
                                     tool_input = json.loads(action_input)
                                 except json.JSONDecodeError:
-                                    # Fallback: Try to find the last '}' if trailing text exists of Llama 3 hallucinations
-                                    if "}" in action_input:
+                                    # Fallback: Try to find the last '}' (or ']' for a list) if trailing text exists of Llama 3 hallucinations
+                                    closing = "]" if action_input.lstrip().startswith("[") else "}"
+                                    if closing in action_input:
                                         try:
-                                            clean_input = action_input[:action_input.rindex("}")+1]
+                                            clean_input = action_input[:action_input.rindex(closing)+1]
                                             tool_input = json.loads(clean_input)
                                         except Exception:
                                             # If still fails, use raw string (e.g. for python_repl)
@@ -228,73 +619,46 @@ New input: {message}
                                     else:
                                         tool_input = action_input
                                         
-                                observation = await tool.arun(tool_input)
+                                # A bare JSON list is a multi-resource fetch
+                                if action == "get_shopify_data" and isinstance(tool_input, list):
+                                    tool_input = {"requests": tool_input}
+
+                                # MEMO: Identical actions within this request reuse the earlier observation
+                                memo_key = memo.key(action, tool_input)
+                                memo.record_call(memo_key)
+                                cached_obs = memo.get(memo_key)
                                 
-                                # --- SPECIAL HANDLING: Shopify Data (Ghost Data Pattern) ---
-                                if action == "get_shopify_data" and isinstance(observation, (list, dict)):
-                                    # 1. Inject into shared locals for this request
-                                    # Pre-process: Cast numeric fields to float to avoid string concatenation in Pandas
-                                    if isinstance(observation, list):
-                                        for item in observation:
-                                            if isinstance(item, dict):
-                                                for field in ['total_price', 'subtotal_price', 'total_tax']:
-                                                    if field in item and item[field] is not None:
-                                                        try:
-                                                            item[field] = float(item[field])
-                                                        except (ValueError, TypeError):
-                                                            pass 
-                                                
-                                                # Pre-clean billing_address to ensure safe city extraction
-                                                if 'billing_address' not in item or item['billing_address'] is None:
-                                                    item['billing_address'] = {'city': 'Unknown', 'country': 'Unknown'}
-                                                
-                                                # Pre-clean customer to ensure safe name extraction
-                                                if 'customer' not in item or item['customer'] is None:
-                                                    item['customer'] = {'first_name': 'Unknown', 'last_name': '', 'id': 'Unknown'}
-                                                            
-                                    repl_locals["shopify_data"] = observation
-                                    repl_locals["orders_data"] = observation # Backwards compatibility
-                                    
-                                    # 2. Force update the specific tool instance to be safe
-                                    if "python_repl_ast" in tool_map:
-                                        # LangChain's PythonAstREPLTool stores locals in self.locals
-                                        tool_map["python_repl_ast"].locals.update({
-                                            "shopify_data": observation,
-                                            "orders_data": observation
-                                        })
-                                    
-                                    # 3. GHOST DATA: Do NOT show full data to LLM to save tokens
-                                    # Create a schema summary instead
-                                    item_count = len(observation) if isinstance(observation, list) else 1
-                                    
-                                    keys_preview = "unknown_keys"
-                                    if isinstance(observation, list):
-                                        if observation and isinstance(observation[0], dict):
-                                            keys = list(observation[0].keys())
-                                            keys_preview = ", ".join(keys[:5])
-                                        else:
-                                            keys_preview = "empty_list" if not observation else "no_dict_items"
-                                    elif isinstance(observation, dict):
-                                        keys = list(observation.keys())
-                                        keys_preview = ", ".join(keys[:5])
-                                    
-                                    short_observation = (
-                                        f"Successfully fetched {item_count} records. \n"
-                                        f"Data is stored in python variable 'shopify_data'. \n"
-                                        f"Row keys preview: [{keys_preview}, ...]\n"
-                                        f"Do NOT output the full data. Use python to analyze it."
-                                    )
-                                    
-                                    logger.info(f"Ghost Data: Injected {item_count} records into REPL. Hiding from LLM prompt.")
-                                    
-                                    # Use the summary for the prompt
-                                    obs_str = short_observation
+                                if cached_obs is not None:
+                                    logger.info(f"Tool Memo: Reusing observation for repeated {action} call.")
+                                    if action == "get_shopify_data":
+                                        # Later fetches may have rebound shopify_data: bind this result again
+                                        cached_obs = self._handle_shopify_observation(memo.result(memo_key), tool_input, repl_locals, tool_map)
+                                        memo.invalidate("python_repl_ast")
+                                    obs_str = f"{cached_obs}\n(This exact action already ran in this request; the result above is reused.)"
                                 else:
-                                    # Regular tools: formatting
-                                    obs_str = str(observation)
-                                    # TRUNCATION: Fallback for other large outputs
-                                    if len(obs_str) > 5000:
-                                        obs_str = obs_str[:5000] + "\n... [Output Truncated]"
+                                    repl_before = dict(tool.locals) if action == "python_repl_ast" else None
+                                    observation = await tool.arun(tool_input)
+                                    memoize = True
+                                    
+                                    # --- SPECIAL HANDLING: Shopify Data (Ghost Data Pattern) ---
+                                    if action == "get_shopify_data":
+                                        obs_str = self._handle_shopify_observation(observation, tool_input, repl_locals, tool_map)
+                                        # New data in the REPL makes earlier REPL outputs stale
+                                        memo.invalidate("python_repl_ast")
+                                        memoize = not fetch_failed(observation)
+                                    else:
+                                        # Regular tools: formatting
+                                        obs_str = str(observation)
+                                        # TRUNCATION: Fallback for other large outputs
+                                        if len(obs_str) > 5000:
+                                            obs_str = obs_str[:5000] + "\n... [Output Truncated]"
+                                        # The REPL keeps state: after a run that (re)binds or modifies a
+                                        # variable, the same code can print something else
+                                        if repl_before is not None and repl_state_changed(tool_input, repl_before, tool.locals):
+                                            memo.invalidate("python_repl_ast")
+                                            memoize = False
+                                    if memoize:
+                                        memo.store(memo_key, obs_str, observation if action == "get_shopify_data" else None)
 
                                 logger.info(f"Tool Observation: {obs_str[:200]}...")
                                 current_scratchpad += f"\nObservation: {obs_str}\n"
@@ -303,6 +667,15 @@ New input: {message}
                                 observation = f"Error executing tool: {e}"
                                 logger.info(f"Tool Observation: {observation}")
                                 current_scratchpad += f"\nObservation: {observation}\n"
+                            
+                            # LOOP DETECTION: The same action over and over means the agent is stuck
+                            if memo_key is not None and memo.is_looping(memo_key):
+                                logger.warning(f"Agent loop: {action} repeated {memo.max_repeats} times. Forcing final answer.")
+                                current_scratchpad += (
+                                    "\nThought: I keep repeating the same action, so I already have all the information I can get. "
+                                    "I will answer now.\nFinal Answer:"
+                                )
+                                force_final = True
                     else:
                         # Fallback for direct answers (missing Final Answer prefix)
                         logger.warning(f"Agent loop: No Action or Final Answer found. Treating output as Final Answer.")
@@ -324,9 +697,8 @@ New input: {message}
                 final_answer = re.sub(r'```python.*?```', '', final_answer, flags=re.DOTALL).strip()
                 
                 # Save AI Response
-                ai_msg = Message(session_id=session_id, role="assistant", content=final_answer, timestamp=datetime.utcnow())
-                db.add(ai_msg)
-                db.commit()
+                if record_history:
+                    await writer.add_message(session_id, "assistant", final_answer)
                 
                 return AgentResponse(
                     session_id=session_id,
@@ -352,4 +724,6 @@ New input: {message}
                     thought_process=None
                 )
         finally:
+            if store_client is not None:
+                registry.release(store_client)
             db.close()
@@ -0,0 +1,62 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+from app.tools.shopify_tool import ResourceRequest
+from app.utils.date_resolver import ISO_FORMAT, resolve_date_ranges
+
+# Words that make a question need a resource; questions matching none read orders
+RESOURCE_KEYWORDS: Dict[str, re.Pattern] = {
+    'orders': re.compile(
+        r"\b(orders?|revenue|sales|sold|sell(ing)?|aov|average order|spen[dt]|purchases?|bought|"
+        r"cit(y|ies)|countr(y|ies)|top|best|trend|refunds?|discounts?)\b", re.IGNORECASE
+    ),
+    'products': re.compile(r"\b(products?|inventory|stock|variants?|catalog|sku|items?)\b", re.IGNORECASE),
+    'customers': re.compile(r"\b(customers?|buyers?|shoppers?|clients?|repeat|emails?)\b", re.IGNORECASE),
+}
+
+
+@dataclass
+class BatchPlan:
+    """Datasets fetched once for a batch of questions, and which question reads which."""
+    requests: List[ResourceRequest] = field(default_factory=list)
+    resources: List[List[str]] = field(default_factory=list)  # per question
+
+    def describe(self) -> str:
+        parts = []
+        for request in self.requests:
+            window = request.filters or {}
+            if window:
+                parts.append(f"{request.resource} ({window['created_at_min'][:10]} to {window['created_at_max'][:10]})")
+            else:
+                parts.append(request.resource)
+        return f"Fetched once for {len(self.resources)} questions: {', '.join(parts)}"
+
+
+def plan_batch(questions: List[str], reference: date) -> BatchPlan:
+    """
+    Resources each question needs, by keyword, and one request per resource
+    for the whole batch. Orders cover the union of the questions' resolved
+    date ranges, or all time when any question has none (or several).
+    """
+    plan = BatchPlan()
+    windows = []
+    for question in questions:
+        needed = [resource for resource, pattern in RESOURCE_KEYWORDS.items() if pattern.search(question)]
+        plan.resources.append(needed or ['orders'])
+        if 'orders' in plan.resources[-1]:
+            ranges = resolve_date_ranges(question, reference)
+            windows.append(ranges[0] if len(ranges) == 1 else None)
+
+    for resource in RESOURCE_KEYWORDS:
+        if not any(resource in needed for needed in plan.resources):
+            continue
+        filters: Optional[Dict[str, str]] = None
+        if resource == 'orders' and windows and all(window is not None for window in windows):
+            filters = {
+                'created_at_min': min(window.start for window in windows).strftime(ISO_FORMAT),
+                'created_at_max': max(window.end for window in windows).strftime(ISO_FORMAT),
+            }
+        plan.requests.append(ResourceRequest(resource=resource, filters=filters))
+    return plan
@@ -0,0 +1,69 @@
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session as DBSession
+
+from app.models.database_models import Message, Session
+from app.services.message_writer import merge_pending
+
+# Most recent messages sent verbatim with every prompt
+HISTORY_WINDOW = 5
+# Older messages are folded into the session's summary, which is capped at this size
+SUMMARY_MAX_CHARS = 2000
+SUMMARY_LINE_CHARS = 160
+# Upper bound on messages folded in one turn (only sessions older than the summary hit it)
+FOLD_BATCH = 50
+
+
+def _summary_line(message: Message) -> str:
+    role = "User" if message.role == "user" else "AI"
+    text = " ".join(message.content.split())
+    if message.role != "user":
+        # The first sentence of an answer carries the headline figure
+        text = text.split(". ")[0]
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"- {role}: {text}"
+
+
+def fold_into_summary(summary: Optional[str], messages: List[Message]) -> str:
+    """Append one line per message and drop the oldest lines beyond SUMMARY_MAX_CHARS."""
+    lines = (summary.splitlines() if summary else []) + [_summary_line(m) for m in messages]
+    while lines and sum(len(line) + 1 for line in lines) > SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def load_conversation_context(
+    db: DBSession, session: Session, pending: Sequence[Message] = ()
+) -> Tuple[Optional[str], List[Message]]:
+    """
+    Return (summary of older turns, last HISTORY_WINDOW messages in order).
+    `pending` are the session's messages still queued for writing.
+
+    Both queries are bounded with ORDER BY ... LIMIT, so the cost does not
+    grow with the session. Messages that slid out of the window since the
+    last turn are folded into `session.history_summary` (caller commits).
+    """
+    recent = (
+        db.query(Message)
+        .filter(Message.session_id == session.id)
+        .order_by(Message.timestamp.desc())
+        .limit(HISTORY_WINDOW)
+        .all()
+    )
+    recent.reverse()
+    # Queued messages are newer than every committed one
+    recent = merge_pending(recent, pending)[-HISTORY_WINDOW:]
+    if len(recent) < HISTORY_WINDOW:
+        return session.history_summary, recent
+
+    window_start = recent[0].timestamp
+    query = db.query(Message).filter(Message.session_id == session.id, Message.timestamp < window_start)
+    if session.summarized_through is not None:
+        query = query.filter(Message.timestamp > session.summarized_through)
+    evicted = query.order_by(Message.timestamp.desc()).limit(FOLD_BATCH).all()
+    if evicted:
+        evicted.reverse()
+        session.history_summary = fold_into_summary(session.history_summary, evicted)
+        session.summarized_through = evicted[-1].timestamp
+    return session.history_summary, recent
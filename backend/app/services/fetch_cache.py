@@ -0,0 +1,36 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+FetchKey = Tuple[str, str, str]
+
+
+class SharedFetchCache:
+    """
+    Single-flight cache of raw Shopify reads shared by the concurrent
+    requests of one batch: the first caller fetches, identical reads wait
+    for its result instead of issuing their own. Failed reads are dropped
+    so a later call retries them.
+    """
+
+    def __init__(self):
+        self._reads: Dict[FetchKey, asyncio.Future] = {}
+        self.fetches = 0
+
+    @staticmethod
+    def key(kind: str, resource: str, params: Dict[str, Any]) -> FetchKey:
+        return kind, resource, json.dumps(params, sort_keys=True, default=str)
+
+    async def get(self, key: FetchKey, load: Callable[[], Awaitable[Any]]) -> Any:
+        read = self._reads.get(key)
+        if read is None:
+            self.fetches += 1
+            read = asyncio.ensure_future(load())
+            read.add_done_callback(lambda done: self._forget_failed(key, done))
+            self._reads[key] = read
+        # One waiter being cancelled must not cancel the read for the others
+        return await asyncio.shield(read)
+
+    def _forget_failed(self, key: FetchKey, read: asyncio.Future) -> None:
+        if read.cancelled() or read.exception() is not None:
+            self._reads.pop(key, None)
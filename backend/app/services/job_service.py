@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session as DBSession
+
+from app.db.database import SessionLocal
+from app.models.agent import AgentResponse, JobStatus
+from app.models.database_models import Job, Session
+
+logger = logging.getLogger("job_service")
+
+ChatHandler = Callable[[str, str], Awaitable[AgentResponse]]
+
+INTERRUPTED = "Interrupted by a server shutdown. Please ask again."
+
+
+class JobRunner:
+    """
+    In-process pool running chat requests as background jobs.
+
+    Jobs are persisted when submitted and their result (or error) when
+    they finish, so GET /api/jobs/{id} works from any replica sharing the
+    database. At most `concurrency` jobs run at once; beyond `max_queue`
+    waiting jobs, submit() refuses new ones.
+    """
+
+    def __init__(
+        self,
+        chat: ChatHandler,
+        session_factory: Callable[[], DBSession] = SessionLocal,
+        concurrency: int = 4,
+        max_queue: int = 100
+    ):
+        self.chat = chat
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        """Cancel running jobs and fail the waiting ones; their callers may retry."""
+        if not self.is_running:
+            return
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._finish(self._queue.get_nowait(), error=INTERRUPTED)
+        self._queue = None
+
+    async def submit(self, session_id: str, message: str) -> JobStatus:
+        if not self.is_running:
+            raise RuntimeError("Background jobs are not running.")
+        if self._queue.full():
+            raise ValueError("Too many background jobs queued. Please try again shortly.")
+        db = self.session_factory()
+        try:
+            if not db.query(Session.id).filter(Session.id == session_id).first():
+                raise ValueError("Session not found")
+            job = Job(session_id=session_id, message=message, status="queued", created_at=datetime.utcnow())
+            db.add(job)
+            db.commit()
+            status = self._status(job)
+        finally:
+            db.close()
+        self._queue.put_nowait(status.job_id)
+        return status
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            return self._status(job) if job else None
+        finally:
+            db.close()
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            request = self._start(job_id)
+            if request is None:
+                continue  # Deleted with its session while waiting
+            try:
+                response = await self.chat(*request)
+            except asyncio.CancelledError:
+                self._finish(job_id, error=INTERRUPTED)
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+                self._finish(job_id, error=str(e))
+            else:
+                self._finish(job_id, result=response)
+
+    def _start(self, job_id: str) -> Optional[Tuple[str, str]]:
+        """Mark a job running; returns its (session_id, message)."""
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return None
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            db.commit()
+            return job.session_id, job.message
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, result: Optional[AgentResponse] = None, error: Optional[str] = None) -> None:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+            job.status = "failed" if error is not None else "succeeded"
+            job.result = result.model_dump_json() if result is not None else None
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _status(job: Job) -> JobStatus:
+        return JobStatus(
+            job_id=job.id,
+            session_id=job.session_id,
+            status=job.status,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            result=AgentResponse.model_validate_json(job.result) if job.result else None,
+            error=job.error
+        )
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session as DBSession
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.database_models import Message, Session
+
+logger = logging.getLogger("message_writer")
+
+# session_id, message row, preview to set when the session has none, completion future
+WriteEntry = Tuple[str, Dict[str, Any], Optional[str], Optional[asyncio.Future]]
+
+
+def merge_pending(committed: Sequence[Message], pending: Sequence[Message]) -> List[Message]:
+    """
+    Committed messages followed by the pending ones not among them. A batch
+    stays pending until its commit has returned, so a read in between sees
+    its messages both ways; read `pending` before querying, never after.
+    """
+    seen = {message.id for message in committed}
+    return list(committed) + [message for message in pending if message.id not in seen]
+
+
+class MessageWriter:
+    """
+    Write-behind persistence of chat messages.
+
+    Requests enqueue a message and return; a background task commits the
+    queued messages of all sessions, with their sessions' last_active and
+    preview, in one transaction per batch. The queue is bounded, so a slow
+    database makes producers wait instead of growing memory. Messages not
+    committed yet are served from `pending_messages`, which gives a session
+    read-your-writes. `stop()` flushes everything queued.
+
+    A failed commit is retried `max_attempts` times with exponential backoff
+    from `retry_delay`; if it still fails, its messages stay pending and go
+    first into the next batch. Only `stop()` gives up on them.
+
+    Until `start()` is called (scripts, tests) every message is written
+    through in its own transaction.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], DBSession] = SessionLocal,
+        max_queue: int = 1000,
+        max_batch: int = 200,
+        max_delay: float = 0.02,
+        max_attempts: int = 3,
+        retry_delay: float = 0.2
+    ):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._last_write: Dict[str, asyncio.Future] = {}
+        self._failed: List[WriteEntry] = []
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit everything queued, then stop the background task."""
+        if not self.is_running:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        await task
+        self._queue = None
+
+    async def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        timestamp: Optional[datetime] = None,
+        preview: Optional[str] = None
+    ) -> None:
+        """Queue a message; its session's last_active becomes the message timestamp."""
+        row = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "timestamp": timestamp or datetime.utcnow(),
+        }
+        if not self.is_running:
+            self._write([(session_id, row, preview, None)])
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._pending[session_id].append(row)
+        self._last_write[session_id] = future
+        await self._queue.put((session_id, row, preview, future))
+
+    def pending_messages(self, session_id: str) -> List[Message]:
+        """Queued, not yet committed messages of a session, oldest first (detached copies)."""
+        return [Message(**row) for row in self._pending.get(session_id, ())]
+
+    async def flush(self, session_id: Optional[str] = None) -> None:
+        """Wait until the messages queued so far (for one session, or all) are committed."""
+        futures = [self._last_write.get(session_id)] if session_id else list(self._last_write.values())
+        for future in futures:
+            if future is not None:
+                # A failed batch was already logged; waiting callers only need it settled
+                await asyncio.wait([future])
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            # Messages of a failed commit go first; retry them even if nothing new arrives
+            batch, self._failed = self._failed, []
+            try:
+                entry = await asyncio.wait_for(self._queue.get(), self.retry_delay if batch else None)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                if entry is None:
+                    stopping = True
+                else:
+                    batch.append(entry)
+                    # Let concurrent requests join this batch
+                    if self.max_delay:
+                        await asyncio.sleep(self.max_delay)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                entry = self._queue.get_nowait()
+                if entry is None:
+                    stopping = True
+                    continue
+                batch.append(entry)
+            if batch:
+                await self._commit(batch, give_up=stopping)
+
+    async def _commit(self, batch: List[WriteEntry], give_up: bool = False) -> None:
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            try:
+                await asyncio.to_thread(self._write, batch)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.max_attempts:
+                    logger.warning(f"Commit of {len(batch)} queued messages failed, retrying: {e}")
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        if error is not None and not give_up:
+            # Still pending, so still readable; the next batch tries them again
+            logger.error(f"Could not commit {len(batch)} queued messages, keeping them queued: {error}")
+            self._failed.extend(batch)
+            return
+        if error is not None:
+            logger.error(f"Dropped {len(batch)} queued messages: {error}", exc_info=error)
+        for session_id, row, _, future in batch:
+            pending = self._pending.get(session_id)
+            if pending is not None:
+                pending.remove(row)
+                if not pending:
+                    del self._pending[session_id]
+            if self._last_write.get(session_id) is future:
+                del self._last_write[session_id]
+            if error is not None:
+                future.set_exception(error)
+                future.exception()  # Mark retrieved; flush() does not re-raise it
+            else:
+                future.set_result(None)
+
+    def _write(self, batch: List[WriteEntry]) -> None:
+        """Insert the batch's messages and update its sessions in one transaction."""
+        activity: Dict[str, Tuple[datetime, Optional[str]]] = {}
+        for session_id, row, preview, _ in batch:
+            last_active, first_preview = activity.get(session_id, (row["timestamp"], None))
+            activity[session_id] = (max(last_active, row["timestamp"]), first_preview or preview)
+
+        db = self.session_factory()
+        try:
+            db.execute(insert(Message), [row for _, row, _, _ in batch])
+            for session_id, (last_active, preview) in activity.items():
+                values: Dict[str, Any] = {"last_active": last_active}
+                if preview is not None:
+                    values["preview"] = func.coalesce(Session.preview, preview)
+                db.execute(
+                    update(Session).where(Session.id == session_id).values(**values),
+                    execution_options={"synchronize_session": False}
+                )
+            db.commit()
+            self.batches += 1
+        finally:
+            db.close()
+
+
+_message_writer = MessageWriter(
+    max_queue=settings.MESSAGE_QUEUE_SIZE,
+    max_batch=settings.MESSAGE_BATCH_SIZE,
+    max_delay=settings.MESSAGE_FLUSH_DELAY_MS / 1000
+)
+
+
+def get_message_writer() -> MessageWriter:
+    return _message_writer
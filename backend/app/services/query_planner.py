@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Query parameters each Shopify REST list endpoint actually honours.
+# Anything else is silently ignored by Shopify, so it must not be sent as a param.
+API_FILTERS: Dict[str, set] = {
+    'orders': {
+        'ids', 'since_id', 'name', 'status', 'financial_status', 'fulfillment_status',
+        'created_at_min', 'created_at_max', 'updated_at_min', 'updated_at_max',
+        'processed_at_min', 'processed_at_max', 'attribution_app_id', 'fields',
+    },
+    'products': {
+        'ids', 'since_id', 'title', 'vendor', 'handle', 'product_type', 'status',
+        'collection_id', 'published_status', 'created_at_min', 'created_at_max',
+        'updated_at_min', 'updated_at_max', 'published_at_min', 'published_at_max', 'fields',
+    },
+    'customers': {
+        'ids', 'since_id', 'created_at_min', 'created_at_max',
+        'updated_at_min', 'updated_at_max', 'fields',
+    },
+}
+
+
+def _text(value: Any) -> str:
+    return str(value or '').strip().lower()
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _order_city(order: Dict[str, Any]) -> str:
+    address = order.get('billing_address') or order.get('shipping_address') or {}
+    return _text(address.get('city'))
+
+
+def _order_country(order: Dict[str, Any]) -> str:
+    address = order.get('billing_address') or order.get('shipping_address') or {}
+    return _text(address.get('country'))
+
+
+def _order_email(order: Dict[str, Any]) -> str:
+    return _text(order.get('email') or (order.get('customer') or {}).get('email'))
+
+
+def _order_has_product(order: Dict[str, Any], title: Any) -> bool:
+    needle = _text(title)
+    return any(needle in _text(item.get('title')) for item in order.get('line_items') or [])
+
+
+def _variant_prices(product: Dict[str, Any]) -> List[float]:
+    return [_number(v.get('price')) for v in product.get('variants') or []] or [0.0]
+
+
+# Predicates evaluated in Python after the fetch: name -> (record, value) -> keep?
+LocalPredicate = Callable[[Dict[str, Any], Any], bool]
+
+LOCAL_FILTERS: Dict[str, Dict[str, LocalPredicate]] = {
+    'orders': {
+        'city': lambda o, v: _order_city(o) == _text(v),
+        'country': lambda o, v: _order_country(o) == _text(v),
+        'product_title': _order_has_product,
+        'customer_email': lambda o, v: _order_email(o) == _text(v),
+        'customer_id': lambda o, v: str((o.get('customer') or {}).get('id')) == str(v),
+        'min_total_price': lambda o, v: _number(o.get('total_price')) >= _number(v),
+        'max_total_price': lambda o, v: _number(o.get('total_price')) <= _number(v),
+    },
+    'products': {
+        'title_contains': lambda p, v: _text(v) in _text(p.get('title')),
+        'min_price': lambda p, v: max(_variant_prices(p)) >= _number(v),
+        'max_price': lambda p, v: min(_variant_prices(p)) <= _number(v),
+    },
+    'customers': {
+        'email': lambda c, v: _text(c.get('email')) == _text(v),
+        'city': lambda c, v: _text((c.get('default_address') or {}).get('city')) == _text(v),
+        'min_orders_count': lambda c, v: _number(c.get('orders_count')) >= _number(v),
+        'min_total_spent': lambda c, v: _number(c.get('total_spent')) >= _number(v),
+    },
+}
+
+
+@dataclass
+class QueryPlan:
+    """
+    Split of a filter dict into predicates Shopify evaluates (pushed down as
+    query params) and predicates evaluated locally on the fetched records.
+    """
+    resource: str
+    api_params: Dict[str, Any] = field(default_factory=dict)
+    local_filters: Dict[str, Any] = field(default_factory=dict)
+    ignored: List[str] = field(default_factory=list)
+
+    def apply(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate the local predicates against fetched (or cached) records."""
+        if not self.local_filters:
+            return records
+        predicates = LOCAL_FILTERS[self.resource]
+        return [
+            record for record in records
+            if isinstance(record, dict)
+            and all(predicates[name](record, value) for name, value in self.local_filters.items())
+        ]
+
+    def describe(self) -> str:
+        """One-line summary of the plan for the agent observation."""
+        pushed = ", ".join(f"{k}={v}" for k, v in self.api_params.items() if k != 'limit') or "none"
+        parts = [f"Query plan: API filters [{pushed}]"]
+        if self.local_filters:
+            local = ", ".join(f"{k}={v}" for k, v in self.local_filters.items())
+            parts.append(f"local filters [{local}]")
+        if self.ignored:
+            parts.append(f"ignored unsupported filters [{', '.join(self.ignored)}]")
+        return "; ".join(parts)
+
+
+class PlannedResult(list):
+    """List of fetched records that remembers the plan which produced it."""
+
+    def __init__(self, records: List[Dict[str, Any]], plan: Optional[QueryPlan] = None):
+        super().__init__(records)
+        self.plan = plan
+
+
+def plan_query(resource: str, filters: Optional[Dict[str, Any]]) -> QueryPlan:
+    """
+    Decide, per filter, whether Shopify can evaluate it or it must run locally.
+    Filters neither side understands are dropped and reported as ignored.
+    """
+    plan = QueryPlan(resource=resource)
+    api_supported = API_FILTERS.get(resource, set()) | {'limit'}
+    local_supported = LOCAL_FILTERS.get(resource, {})
+
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name in api_supported:
+            plan.api_params[name] = value
+        elif name in local_supported:
+            plan.local_filters[name] = value
+        else:
+            plan.ignored.append(name)
+
+    # A field projection could strip the attributes the local predicates read
+    if plan.local_filters:
+        plan.api_params.pop('fields', None)
+
+    return plan
@@ -0,0 +1,210 @@
+import ast
+import copy
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+# Names whose result changes between runs over the same data
+NONDETERMINISTIC = {
+    'now', 'today', 'utcnow', 'time', 'perf_counter',
+    'random', 'randint', 'choice', 'sample', 'shuffle', 'uuid4',
+}
+# Methods that modify their receiver in place
+MUTATORS = {
+    'append', 'extend', 'insert', 'pop', 'popitem', 'remove', 'clear',
+    'sort', 'reverse', 'update', 'setdefault', 'add', 'discard',
+}
+
+CacheEntry = Tuple[Any, Dict[str, Any], int]  # output, bindings, estimated bytes
+
+
+def dataset_version(records: Any) -> str:
+    """
+    Content fingerprint of a fetched dataset from each record's id and
+    updated_at (Shopify bumps updated_at on every change).
+    """
+    rows = [records] if isinstance(records, Mapping) else records
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(rows)).encode())
+    for row in rows:
+        if isinstance(row, Mapping):
+            digest.update(repr((row.get('id'), row.get('updated_at'))).encode())
+        else:
+            digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _root(node: ast.AST) -> Optional[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _mutation_roots(tree: ast.AST) -> List[Optional[str]]:
+    """Root name of every in-place write and mutating call (None when it is not a plain name)."""
+    roots: List[Optional[str]] = []
+    for node in ast.walk(tree):
+        targets = []
+        if isinstance(node, (ast.Assign, ast.Delete)):
+            targets = node.targets
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+            targets = [node.target]
+        for target in targets:
+            if isinstance(target, (ast.Attribute, ast.Subscript)) or isinstance(node, ast.AugAssign):
+                roots.append(_root(target))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            inplace = any(
+                k.arg == 'inplace' and not (isinstance(k.value, ast.Constant) and k.value.value is False)
+                for k in node.keywords
+            )
+            if node.func.attr in MUTATORS or inplace:
+                roots.append(_root(node.func.value))
+    return roots
+
+
+def mutated_names(tree: ast.AST) -> Set[str]:
+    """Names whose existing object the code may modify in place (df['x'] = ..., items.append(...))."""
+    return {name for name in _mutation_roots(tree) if name is not None}
+
+
+def writes_in_place(tree: ast.AST) -> bool:
+    """
+    Whether the code writes to any subscript or attribute or calls a mutating
+    method, whatever it is called on: `for o in orders_data: o['x'] = 0`
+    edits orders_data through a loop variable.
+    """
+    return bool(_mutation_roots(tree))
+
+
+def detach(value: Any) -> Any:
+    """
+    Deep copy handed to (or taken from) a request, so its in-place edits
+    cannot reach the cached object: copy-on-write is off by default in
+    pandas 2, and lists of records share their dicts.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=True)
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, (list, dict, set, tuple)):
+        return copy.deepcopy(value)
+    return value
+
+
+def _estimated_bytes(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """Memory held by a value, including the records and strings it contains."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(_estimated_bytes(k, seen) + _estimated_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimated_bytes(item, seen) for item in value)
+    return size
+
+
+class ReplResultCache:
+    """
+    Process-wide LRU cache of python_repl_ast results.
+
+    The key is a hash of the code's AST (formatting and comments ignored)
+    plus the version of every variable it reads: fetched datasets carry a
+    content fingerprint, snapshot views the snapshot version, and variables
+    created by a cached snippet the key of that snippet. A hit returns the
+    recorded output and restores the variables the snippet assigned.
+    Bounded by entry count and estimated bytes.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(tree: ast.AST, scope: Dict[str, Any], versions: Dict[str, str]) -> Optional[str]:
+        """Cache key of parsed code, or None when its result may not be reproducible."""
+        reads = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                if node.id in NONDETERMINISTIC:
+                    return None
+                if isinstance(node.ctx, ast.Load):
+                    reads.add(node.id)
+            elif isinstance(node, ast.Attribute) and node.attr in NONDETERMINISTIC:
+                return None
+
+        inputs = []
+        for name in sorted(reads):
+            if name not in scope:
+                continue  # builtins, or names the code defines itself
+            value = scope[name]
+            if isinstance(value, ModuleType):
+                inputs.append(f"{name}=module:{value.__name__}")
+            elif name in versions:
+                inputs.append(f"{name}={versions[name]}")
+            else:
+                return None  # reads a variable of unknown provenance
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(ast.dump(tree).encode())
+        digest.update("|".join(inputs).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: str, output: Any, bindings: Dict[str, Any]) -> None:
+        size = _estimated_bytes(output) + sum(_estimated_bytes(value) for value in bindings.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+            self._entries[key] = (output, bindings, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+_repl_cache = ReplResultCache(settings.REPL_CACHE_MAX_ENTRIES, settings.REPL_CACHE_MAX_BYTES)
+
+
+def get_repl_cache() -> ReplResultCache:
+    return _repl_cache
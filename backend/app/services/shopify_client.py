@@ -1,11 +1,15 @@
 import logging
 import httpx
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log, RetryError
 
 from app.core.config import settings
 from app.utils.exceptions import ShopifyError, ShopifyRateLimitError, ShopifyAuthError, ShopifyNetworkError
+from app.utils.rate_limiter import AsyncRateLimiter
+
+if TYPE_CHECKING:
+    from app.services.store_registry import StoreClient
 
 # Configure structured logging
 logger = logging.getLogger("shopify_client")
@@ -17,7 +21,21 @@ class ShopifyClient:
     Handles authentication, rate limiting, and pagination.
     """
 
-    def __init__(self):
+    # Shopify REST leaky bucket: 40 request burst, drained at 2 requests/second
+    BUCKET_SIZE = 40
+    LEAK_RATE = 2.0
+
+    def __init__(self, rate_limiter: Optional[AsyncRateLimiter] = None, store_client: Optional["StoreClient"] = None):
+        # Optional token bucket shared by concurrent callers of this client
+        self.rate_limiter = rate_limiter
+        self.store_client = store_client
+        if store_client is not None:
+            # The store's pooled connections and bucket, owned by the StoreRegistry
+            self.base_url = store_client.base_url
+            self.headers = store_client.headers
+            self.client = store_client.http
+            self.rate_limiter = rate_limiter or store_client.rate_limiter
+            return
         self.base_url = f"https://{settings.SHOPIFY_STORE_URL}/admin/api/{settings.SHOPIFY_API_VERSION}"
         self.headers = {
             "X-Shopify-Access-Token": settings.SHOPIFY_ACCESS_TOKEN,
@@ -26,7 +44,8 @@ class ShopifyClient:
         self.client = httpx.AsyncClient(headers=self.headers, timeout=10.0)
 
     async def close(self):
-        await self.client.aclose()
+        if self.store_client is None:
+            await self.client.aclose()
 
     @retry(
         stop=stop_after_attempt(5),
@@ -40,6 +59,8 @@ class ShopifyClient:
         Internal method to make requests with retries.
         """
         try:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
             response = await self.client.get(url, params=params)
             
             if response.status_code == 401 or response.status_code == 403:
@@ -63,6 +84,33 @@ class ShopifyClient:
             logger.error(f"Network error occurred: {e}")
             raise ShopifyNetworkError(f"Network Error: {e}")
 
+    async def get_count(self, resource: str, params: Optional[Dict] = None) -> int:
+        """
+        Count records for a resource via its `/{resource}/count.json` endpoint.
+        
+        Args:
+            resource: 'orders', 'products', or 'customers'
+            params: Same filters accepted by get_resource (pagination keys are ignored)
+        
+        Returns:
+            int: Number of matching records, fetched in a single request.
+        """
+        url = f"{self.base_url}/{resource}/count.json"
+        count_params = {
+            key: value for key, value in (params or {}).items()
+            if key not in ('limit', 'page_info', 'fields')
+        }
+        
+        # Match get_resource: count Open, Closed and Cancelled orders
+        if resource == 'orders' and 'status' not in count_params:
+            count_params['status'] = 'any'
+        
+        response = await self._make_request(url, params=count_params)
+        data = response.json()
+        if 'count' not in data:
+            raise ShopifyError(f"Unexpected count response structure for {resource}")
+        return int(data['count'])
+
     async def get_resource(self, resource: str, params: Optional[Dict] = None, max_pages: int = 10) -> List[Dict[str, Any]]:
         """
         Fetch all records for a resource with pagination.
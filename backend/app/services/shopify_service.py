@@ -1,6 +1,11 @@
 import pandas as pd
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.analytics.columnar import build_orders_frame, build_line_items_frame, render_markdown_table
+from app.analytics.rollups import RollupCube
+from app.analytics.sketches import SketchBucket
+from app.utils.money import format_cents, format_cents_series
 
 class ShopifyService:
     """
@@ -11,28 +16,9 @@ class ShopifyService:
     def parse_orders_data(orders: List[Dict[str, Any]]) -> pd.DataFrame:
         """
         Convert a list of order dictionaries to a Cleaned DataFrame.
-        Extracts: id, created_at, total_price, customer_id, city, line_items.
+        Extracts: id, created_at (UTC), total_price, customer_id, email, city, line_items.
         """
-        if not orders:
-            return pd.DataFrame()
-
-        data = []
-        for order in orders:
-            # Safely extract nested fields
-            customer = order.get('customer', {}) or {}
-            address = order.get('billing_address', {}) or {}
-            
-            data.append({
-                'id': order.get('id'),
-                'created_at': pd.to_datetime(order.get('created_at')),
-                'total_price': float(order.get('total_price', 0.0)),
-                'customer_id': customer.get('id'),
-                'email': customer.get('email'),
-                'city': address.get('city', 'Unknown'),
-                'line_items': order.get('line_items', [])
-            })
-        
-        return pd.DataFrame(data)
+        return build_orders_frame(orders)
 
     @staticmethod
     def calculate_aov(orders_df: pd.DataFrame, days: Optional[int] = None) -> str:
@@ -43,29 +29,25 @@ class ShopifyService:
         if orders_df.empty:
             return "No order data available to calculate AOV."
         
-        df = orders_df.copy()
+        df = orders_df
         
         if days:
-            cutoff = datetime.utcnow() - timedelta(days=days)
-            # Ensure created_at is timezone-naive or aware matching the mock. 
-            # Shopify returns UTC ISO strings which pd.to_datetime handles.
-            # We'll normalize to UTC for safety if needed, but simple comparison usually works if both are tz-aware or both naive.
-            # For simplicity in this logic, assuming the dataframe has proper datetime objects.
-            if df['created_at'].dt.tz is not None:
-                # Make current time aware if the DF is aware
-                import pytz
-                cutoff = cutoff.replace(tzinfo=pytz.UTC)
+            # parse_orders_data normalizes created_at to UTC; also accept naive frames
+            cutoff = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)
+            if df['created_at'].dt.tz is None:
+                cutoff = cutoff.tz_localize(None)
             
             df = df[df['created_at'] >= cutoff]
             
         if df.empty:
             return f"No orders found in the last {days} days."
             
-        total_revenue = df['total_price'].sum()
+        # Exact cents arithmetic; only the final average is rounded
+        total_revenue_cents = int(df['total_price_cents'].sum())
         order_count = len(df)
-        aov = total_revenue / order_count if order_count > 0 else 0
+        aov_cents = round(total_revenue_cents / order_count) if order_count > 0 else 0
         
-        return f"The Average Order Value (AOV) {'for the last ' + str(days) + ' days ' if days else ''}is **${aov:.2f}** (based on {order_count} orders)."
+        return f"The Average Order Value (AOV) {'for the last ' + str(days) + ' days ' if days else ''}is **{format_cents(aov_cents)}** (based on {order_count} orders)."
 
     @staticmethod
     def get_top_products(orders_df: pd.DataFrame, limit: int = 5) -> str:
@@ -75,24 +57,12 @@ class ShopifyService:
         if orders_df.empty or 'line_items' not in orders_df.columns:
             return "No data available to determine top products."
             
-        # Explode line items
-        # We need to parse the line_items col which is a list of dicts
-        all_items = []
-        for _, row in orders_df.iterrows():
-            for item in row['line_items']:
-                all_items.append({
-                    'product_title': item.get('title', 'Unknown Product'),
-                    'quantity': item.get('quantity', 0),
-                    'price': float(item.get('price', 0.0))
-                })
-                
-        if not all_items:
+        items_df = build_line_items_frame(orders_df)
+        if items_df.empty:
              return "No product items found in the orders."
-             
-        items_df = pd.DataFrame(all_items)
         
         # Group by title
-        top_products = items_df.groupby('product_title')['quantity'].sum().sort_values(ascending=False).head(limit)
+        top_products = items_df.groupby('title')['quantity'].sum().sort_values(ascending=False).head(limit)
         
         return ShopifyService.create_summary_table(
             top_products.reset_index(), 
@@ -107,11 +77,11 @@ class ShopifyService:
         if orders_df.empty or 'city' not in orders_df.columns:
              return "No data to analyze revenue by city."
              
-        city_revenue = orders_df.groupby('city')['total_price'].sum().sort_values(ascending=False)
+        city_revenue = orders_df.groupby('city')['total_price_cents'].sum().sort_values(ascending=False)
         
-        # Format as table
+        # Format as table (cents are only turned into dollars here, at render time)
         df_reset = city_revenue.reset_index()
-        df_reset['total_price'] = df_reset['total_price'].apply(lambda x: f"${x:,.2f}")
+        df_reset['total_price_cents'] = format_cents_series(df_reset['total_price_cents'])
         
         return ShopifyService.create_summary_table(
             df_reset,
@@ -138,19 +108,124 @@ class ShopifyService:
         
         return f"Found **{count}** repeat customers ({rate:.1f}% of total identified customers)."
 
+    @staticmethod
+    def rollup_table(
+        cube: RollupCube,
+        measure: str,
+        group_by: Optional[str],
+        start: date,
+        end: date,
+        limit: int = 10
+    ) -> str:
+        """
+        Answer a measure-by-dimension question from the pre-aggregated cubes.
+        Money measures are rendered from cents; day groups are listed in date order.
+        """
+        if group_by in (None, 'day'):
+            totals = sorted(cube.aggregate(measure, start, end, group_by=group_by).items())
+        else:
+            totals = cube.top(measure, group_by, start, end, limit=limit)
+        if not totals:
+            return f"No synced orders between {start.isoformat()} and {end.isoformat()}."
+
+        df = pd.DataFrame(totals, columns=['group', measure])
+        if measure.endswith('_cents'):
+            df[measure] = format_cents_series(df[measure])
+        label = measure.replace('_cents', '').replace('_', ' ').title()
+        return ShopifyService.create_summary_table(df, headers=[(group_by or 'Period').title(), label])
+
+    @staticmethod
+    def revenue_by_city_from_rollups(cube: RollupCube, start: date, end: date, limit: int = 10) -> str:
+        """Revenue by city for a date range without scanning orders."""
+        return ShopifyService.rollup_table(cube, 'revenue_cents', 'city', start, end, limit)
+
+    @staticmethod
+    def top_products_from_rollups(cube: RollupCube, start: date, end: date, limit: int = 5) -> str:
+        """Top products by units sold for a date range without scanning orders."""
+        return ShopifyService.rollup_table(cube, 'units', 'product', start, end, limit)
+
+    @staticmethod
+    def approximate_metric(bucket: SketchBucket, metric: str, limit: int = 5) -> str:
+        """
+        Answer from merged sketches. Every result is labelled as an estimate
+        with its 95% error bound unless the sketch happened to be exact.
+        """
+        if bucket.orders == 0:
+            return "No synced orders in this date range."
+        basis = f"(estimate from sketches over {bucket.orders:,} orders, 95% confidence)"
+
+        if metric == 'distinct_customers':
+            estimate = bucket.customers.estimate()
+            return f"Distinct customers: **~{estimate.value:,.0f}** (±{estimate.error:,.0f}) {basis}"
+        if metric == 'repeat_customer_rate':
+            estimate = bucket.customer_sample.repeat_rate()
+            if estimate.exact:
+                return f"Repeat customer rate: **{estimate.value:.1f}%** (exact, every customer was sampled)"
+            return f"Repeat customer rate: **~{estimate.value:.1f}%** (±{estimate.error:.1f} points) {basis}"
+        if metric == 'average_order_value':
+            estimate = bucket.order_values.mean()
+            if estimate.exact:
+                return f"Average order value: **{format_cents(round(estimate.value))}** (exact)"
+            return f"Average order value: **~{format_cents(round(estimate.value))}** (±{format_cents(round(estimate.error))}) {basis}"
+        if metric == 'median_order_value':
+            value, rank_error = bucket.order_values.quantile(0.5)
+            if rank_error == 0:
+                return f"Median order value: **{format_cents(round(value))}** (exact)"
+            return f"Median order value: **~{format_cents(round(value))}** (±{rank_error * 100:.1f} percentile points) {basis}"
+        if metric in ('top_products', 'top_cities'):
+            sketch = bucket.products if metric == 'top_products' else bucket.cities
+            rows = sketch.top(limit)
+            df = pd.DataFrame(rows, columns=['item', 'count', 'error'])
+            if metric == 'top_cities':
+                df['count'] = format_cents_series(df['count'])
+                df['error'] = format_cents_series(df['error'])
+                headers = ["City", "Revenue (est.)", "Max Overestimate"]
+            else:
+                headers = ["Product", "Units Sold (est.)", "Max Overestimate"]
+            return f"{ShopifyService.create_summary_table(df, headers=headers)}\n{basis}"
+        raise ValueError(
+            f"Unknown metric '{metric}'. Use one of: distinct_customers, repeat_customer_rate, "
+            "top_products, top_cities, average_order_value, median_order_value"
+        )
+
+    @staticmethod
+    def source_metric(
+        metric: str,
+        customers: Dict[str, Tuple[int, int]],
+        orders: Optional[int] = None,
+        revenue_cents: Optional[int] = None,
+        limit: int = 5
+    ) -> str:
+        """
+        Render a metric from per-customer (orders, spent_cents) totals, whichever
+        source produced them. Order-level totals are passed when the source has them.
+        """
+        if metric == 'order_count':
+            return f"Orders: **{orders:,}**"
+        if metric == 'revenue':
+            return f"Revenue: **{format_cents(revenue_cents)}** (from {orders:,} orders)"
+        if metric == 'average_order_value':
+            if not orders:
+                return "No orders found to calculate AOV."
+            return f"The Average Order Value (AOV) is **{format_cents(round(revenue_cents / orders))}** (based on {orders:,} orders)."
+
+        identified = {key: totals for key, totals in customers.items() if key != 'Guest' and totals[0] > 0}
+        if metric == 'repeat_customers':
+            count = sum(1 for order_count, _ in identified.values() if order_count > 1)
+            rate = (count / len(identified) * 100) if identified else 0
+            return f"Found **{count}** repeat customers ({rate:.1f}% of total identified customers)."
+        if metric == 'top_customers':
+            if not identified:
+                return "No identified customers found."
+            ranked = sorted(identified.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+            df = pd.DataFrame([(key, order_count, spent) for key, (order_count, spent) in ranked], columns=['customer', 'orders', 'spent'])
+            df['spent'] = format_cents_series(df['spent'])
+            return ShopifyService.create_summary_table(df, headers=["Customer ID", "Orders", "Total Spent"])
+        raise ValueError(f"Unknown metric '{metric}'.")
+
     @staticmethod
     def create_summary_table(df: pd.DataFrame, headers: List[str]) -> str:
         """
         Convert a DataFrame to a Markdown table string.
         """
-        if df.empty:
-            return "No data to display."
-            
-        markdown_table = f"| {' | '.join(headers)} |\n"
-        markdown_table += f"| {' | '.join(['---'] * len(headers))} |\n"
-        
-        for _, row in df.iterrows():
-            row_str = " | ".join(str(val) for val in row)
-            markdown_table += f"| {row_str} |\n"
-            
-        return markdown_table
+        return render_markdown_table(df, headers)
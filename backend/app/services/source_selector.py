@@ -0,0 +1,122 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# Records per page of a Shopify REST list endpoint
+PAGE_SIZE = 250
+
+ROLLUPS = 'rollups'
+COUNT_ENDPOINT = 'count_endpoint'
+CUSTOMER_AGGREGATES = 'customer_aggregates'
+ORDERS_SCAN = 'orders_scan'
+
+SOURCE_LABELS: Dict[str, str] = {
+    ROLLUPS: 'local rollups',
+    COUNT_ENDPOINT: 'orders count endpoint',
+    CUSTOMER_AGGREGATES: 'customer aggregates (orders_count, total_spent)',
+    ORDERS_SCAN: 'orders scan',
+}
+
+# Sources able to answer each metric; on equal cost the earlier one wins
+METRIC_SOURCES: Dict[str, Tuple[str, ...]] = {
+    'order_count': (ROLLUPS, COUNT_ENDPOINT, ORDERS_SCAN),
+    'revenue': (ROLLUPS, ORDERS_SCAN),
+    'average_order_value': (ROLLUPS, ORDERS_SCAN),
+    'repeat_customers': (ROLLUPS, CUSTOMER_AGGREGATES, ORDERS_SCAN),
+    'top_customers': (ROLLUPS, CUSTOMER_AGGREGATES, ORDERS_SCAN),
+}
+
+# The count endpoint has no "not cancelled" filter: all orders minus cancelled ones
+COUNT_ENDPOINT_REQUESTS = 2
+
+
+def pages(rows: int) -> int:
+    """List requests needed to read `rows` records (an empty result still costs one)."""
+    return max(1, math.ceil(rows / PAGE_SIZE))
+
+
+@dataclass
+class SourceCost:
+    """Estimated Shopify API requests for one source (None when it cannot be used or was not estimated)."""
+    source: str
+    requests: Optional[int]
+    note: str = ""
+
+
+@dataclass
+class SourcePlan:
+    """Cost of every candidate source for a metric and the cheapest usable one."""
+    metric: str
+    costs: List[SourceCost] = field(default_factory=list)
+
+    @property
+    def chosen(self) -> SourceCost:
+        usable = [cost for cost in self.costs if cost.requests is not None]
+        # min() keeps the first of equal costs, i.e. METRIC_SOURCES order
+        return min(usable, key=lambda cost: cost.requests)
+
+    def describe(self) -> str:
+        """One-line summary of the choice for the agent observation."""
+        chosen = self.chosen
+        note = f", {chosen.note}" if chosen.note else ""
+        parts = [f"Source: {SOURCE_LABELS[chosen.source]} (~{chosen.requests} API requests{note})"]
+        others = [
+            f"{SOURCE_LABELS[cost.source]} {f'~{cost.requests} requests' if cost.requests is not None else cost.note}"
+            for cost in self.costs if cost is not chosen
+        ]
+        if others:
+            parts.append(f"alternatives: {', '.join(others)}")
+        return "; ".join(parts)
+
+
+def counts_needed(metric: str, all_time: bool, rollups_ready: bool) -> Set[str]:
+    """
+    Resources whose size must be counted (one request each) to rank the
+    candidates and size the scan. Nothing is counted when the local rollups
+    answer for free, or for order counts (the count endpoint is the answer).
+    """
+    if rollups_ready or metric == 'order_count':
+        return set()
+    if metric in ('repeat_customers', 'top_customers') and all_time:
+        return {'orders', 'customers'}
+    return {'orders'}
+
+
+def plan_source(
+    metric: str,
+    all_time: bool,
+    rollups_ready: bool,
+    order_count: Optional[int] = None,
+    customer_count: Optional[int] = None,
+    rollups_note: str = ""
+) -> SourcePlan:
+    """
+    Estimate the request cost of each source able to answer `metric` and
+    pick the cheapest. Customer aggregates are lifetime totals, so they only
+    apply when the question has no date window. `rollups_ready` means the
+    synced orders cover the question; `rollups_note` says how far they go,
+    or why they do not.
+    """
+    if metric not in METRIC_SOURCES:
+        raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRIC_SOURCES)}")
+
+    plan = SourcePlan(metric=metric)
+    for source in METRIC_SOURCES[metric]:
+        if source == ROLLUPS:
+            if rollups_ready:
+                cost = SourceCost(source, 0, rollups_note)
+            else:
+                cost = SourceCost(source, None, f"unavailable ({rollups_note or 'orders not synced'})")
+        elif source == COUNT_ENDPOINT:
+            cost = SourceCost(source, COUNT_ENDPOINT_REQUESTS)
+        elif source == CUSTOMER_AGGREGATES:
+            if not all_time:
+                cost = SourceCost(source, None, "unavailable (lifetime totals, question has a date window)")
+            elif customer_count is None:
+                cost = SourceCost(source, None, "not estimated")
+            else:
+                cost = SourceCost(source, pages(customer_count))
+        else:
+            cost = SourceCost(source, pages(order_count)) if order_count is not None else SourceCost(source, None, "not estimated")
+        plan.costs.append(cost)
+    return plan
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app.core.config import settings
+from app.services.shopify_client import ShopifyClient
+from app.utils.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger("store_registry")
+
+
+def store_domain(store_url: str) -> str:
+    """'https://Shop.myshopify.com/admin' or 'shop.myshopify.com' -> 'shop.myshopify.com'."""
+    parsed = urlparse(store_url if "://" in store_url else f"https://{store_url}")
+    return (parsed.hostname or "").lower()
+
+
+@dataclass(frozen=True)
+class StoreCredentials:
+    domain: str
+    access_token: str
+    api_version: str
+
+    @property
+    def base_url(self) -> str:
+        return f"https://{self.domain}/admin/api/{self.api_version}"
+
+
+class StoreClient:
+    """
+    What every request for one store shares: a pooled HTTP client, the
+    token bucket (Shopify's limit is per store, not per request) and the
+    namespace of that store's entries in process-wide caches.
+    """
+
+    def __init__(self, credentials: StoreCredentials, is_default: bool = False, max_connections: int = 10):
+        self.credentials = credentials
+        self.is_default = is_default
+        self.namespace = credentials.domain
+        self.base_url = credentials.base_url
+        self.headers = {
+            "X-Shopify-Access-Token": credentials.access_token,
+            "Content-Type": "application/json"
+        }
+        self.http = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.rate_limiter = AsyncRateLimiter(max_tokens=ShopifyClient.BUCKET_SIZE, refill_rate=ShopifyClient.LEAK_RATE)
+        self.loop = asyncio.get_running_loop()
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+class StoreRegistry:
+    """
+    Resolves a session's store to its credentials and keeps one StoreClient
+    per recently used store.
+
+    `stores` maps store domains to access tokens. Without it the deployment
+    serves a single store: every session reads `default_store`, as before.
+    With it, sessions of unlisted stores are refused. Clients are leased for
+    the length of a request; unleased ones are closed once idle for
+    `idle_seconds`, or least recently used first beyond `max_clients`.
+    """
+
+    def __init__(
+        self,
+        stores: Optional[Dict[str, str]] = None,
+        default_store: Optional[str] = None,
+        default_token: Optional[str] = None,
+        api_version: Optional[str] = None,
+        max_clients: int = 256,
+        idle_seconds: float = 600,
+        max_connections: int = 10
+    ):
+        self.api_version = api_version or settings.SHOPIFY_API_VERSION
+        self.default_domain = store_domain(default_store or settings.SHOPIFY_STORE_URL)
+        self._tokens = {store_domain(url): token for url, token in (stores or {}).items()}
+        self.multi_tenant = bool(self._tokens)
+        self._tokens.setdefault(self.default_domain, default_token or settings.SHOPIFY_ACCESS_TOKEN)
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self.max_connections = max_connections
+        self._clients: "OrderedDict[str, StoreClient]" = OrderedDict()
+
+    def credentials(self, store_url: str) -> StoreCredentials:
+        """Raises ValueError for a store this deployment has no token for."""
+        domain = store_domain(store_url) if self.multi_tenant else self.default_domain
+        token = self._tokens.get(domain)
+        if token is None:
+            raise ValueError(f"Store '{domain}' is not configured on this server.")
+        return StoreCredentials(domain=domain, access_token=token, api_version=self.api_version)
+
+    async def acquire(self, store_url: str) -> StoreClient:
+        """Lease the store's client; release() it when the request is done."""
+        credentials = self.credentials(store_url)
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(credentials.domain)
+        if client is not None and client.loop is not loop:
+            # Made by an event loop that has since gone (tests, a restarted server)
+            del self._clients[credentials.domain]
+            client = None
+        if client is None:
+            client = StoreClient(credentials, credentials.domain == self.default_domain, self.max_connections)
+            self._clients[credentials.domain] = client
+        self._clients.move_to_end(credentials.domain)
+        client.leases += 1
+        client.last_used = time.monotonic()
+        await self._evict()
+        return client
+
+    def release(self, client: StoreClient) -> None:
+        client.leases -= 1
+        client.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        clients, self._clients = list(self._clients.values()), OrderedDict()
+        await asyncio.gather(*[client.aclose() for client in clients], return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, store_url: str) -> bool:
+        return store_domain(store_url) in self._clients
+
+    async def _evict(self) -> None:
+        now = time.monotonic()
+        evicted: List[StoreClient] = []
+        excess = len(self._clients) - self.max_clients
+        # Oldest first; leased clients are kept even past the limit
+        for domain, client in list(self._clients.items()):
+            if client.leases:
+                continue
+            if excess > 0 or now - client.last_used >= self.idle_seconds:
+                evicted.append(self._clients.pop(domain))
+                excess -= 1
+        for client in evicted:
+            logger.info(f"Closing idle client of store {client.namespace}")
+            await client.aclose()
+
+
+_store_registry: Optional[StoreRegistry] = None
+
+
+def get_store_registry() -> StoreRegistry:
+    global _store_registry
+    if _store_registry is None:
+        _store_registry = StoreRegistry(
+            stores=settings.SHOPIFY_STORES,
+            max_clients=settings.STORE_CLIENT_MAX,
+            idle_seconds=settings.STORE_CLIENT_IDLE_SECONDS,
+            max_connections=settings.STORE_CLIENT_MAX_CONNECTIONS
+        )
+    return _store_registry
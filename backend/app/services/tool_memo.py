@@ -0,0 +1,94 @@
+import ast
+import json
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from langchain_experimental.tools.python.tool import sanitize_input
+
+from app.services.repl_cache import writes_in_place
+
+MemoKey = Tuple[str, str]
+
+
+class ToolCallMemo:
+    """
+    Per-request memo of tool observations keyed by (tool name, canonical input).
+
+    Also counts how often each action was issued so the agent loop can detect
+    when the LLM keeps repeating itself and force a final answer.
+    """
+
+    def __init__(self, max_repeats: int = 3):
+        self.max_repeats = max_repeats
+        self._observations: Dict[MemoKey, str] = {}
+        self._results: Dict[MemoKey, Any] = {}
+        self._calls: Dict[MemoKey, int] = {}
+
+    @staticmethod
+    def canonical_input(tool_input: Any) -> str:
+        """
+        Normalize tool input so trivially different spellings share a key:
+        JSON inputs are key-sorted, Python code is compared by its AST
+        (ignoring formatting and comments).
+        """
+        if isinstance(tool_input, (dict, list)):
+            return json.dumps(tool_input, sort_keys=True, default=str)
+
+        text = str(tool_input).strip()
+        try:
+            return ast.dump(ast.parse(text))
+        except SyntaxError:
+            return " ".join(text.split())
+
+    def key(self, tool_name: str, tool_input: Any) -> MemoKey:
+        return tool_name, self.canonical_input(tool_input)
+
+    def record_call(self, key: MemoKey) -> int:
+        """Count an issued action and return how many times it has been issued."""
+        self._calls[key] = self._calls.get(key, 0) + 1
+        return self._calls[key]
+
+    def is_looping(self, key: MemoKey) -> bool:
+        return self._calls.get(key, 0) >= self.max_repeats
+
+    def get(self, key: MemoKey) -> Optional[str]:
+        return self._observations.get(key)
+
+    def result(self, key: MemoKey) -> Any:
+        """Raw tool result stored with an observation (None when none was kept)."""
+        return self._results.get(key)
+
+    def store(self, key: MemoKey, observation: str, result: Any = None) -> None:
+        self._observations[key] = observation
+        if result is not None:
+            self._results[key] = result
+
+    def invalidate(self, tool_name: str) -> None:
+        """Forget cached observations of a tool, e.g. REPL output after new data was injected."""
+        self._observations = {
+            key: value for key, value in self._observations.items() if key[0] != tool_name
+        }
+        self._results = {key: value for key, value in self._results.items() if key[0] != tool_name}
+
+
+def fetch_failed(result: Any) -> bool:
+    """
+    Whether a get_shopify_data result is (or, for several requests, contains)
+    an error message rather than data. Errors such as a 429 may clear up, so
+    they are never memoized: a retry must fetch again.
+    """
+    values = result.values() if isinstance(result, Mapping) else [result]
+    return any(not isinstance(value, (list, dict, int)) for value in values)
+
+
+def repl_state_changed(code: Any, before: Mapping[str, Any], after: Mapping[str, Any]) -> bool:
+    """
+    Whether a python_repl_ast run (re)bound or may have modified a variable,
+    so the same code could now print something else. Unparseable code counts
+    as a change.
+    """
+    if set(after) != set(before) or any(after[name] is not value for name, value in before.items()):
+        return True
+    try:
+        return writes_in_place(ast.parse(sanitize_input(str(code))))
+    except SyntaxError:
+        return True
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Type
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from app.analytics.rollups import RollupCube
+from app.analytics.store import LocalOrderStore, get_local_store
+from app.services.shopify_client import ShopifyClient
+from app.services.shopify_service import ShopifyService
+from app.services.store_registry import StoreClient
+from app.services.source_selector import (
+    COUNT_ENDPOINT, CUSTOMER_AGGREGATES, METRIC_SOURCES, ROLLUPS, counts_needed, plan_source
+)
+from app.tools.rollup_tool import _parse_range
+from app.utils.exceptions import ShopifyError
+from app.utils.money import to_cents
+
+# Per-customer (orders, spent_cents), order count, revenue_cents; None where a source lacks the figure
+Totals = Tuple[Dict[str, Tuple[int, int]], Optional[int], Optional[int]]
+
+
+def _cube_totals(cube: RollupCube, window: Optional[Tuple[date, date]]) -> Totals:
+    """Per-customer and overall totals of a cube over the window (all days when None)."""
+    if window is None:
+        days = cube.days
+        if not days:
+            return {}, 0, 0
+        window = days[0], days[-1]
+    orders = cube.aggregate('orders', *window, group_by='customer')
+    revenue = cube.aggregate('revenue_cents', *window, group_by='customer')
+    customers = {key: (count, revenue.get(key, 0)) for key, count in orders.items()}
+    return customers, sum(orders.values()), sum(revenue.values())
+
+
+class GetStoreMetricInput(BaseModel):
+    """Input model for get_store_metric."""
+    metric: str = Field(
+        ...,
+        description="One of: 'order_count', 'revenue', 'average_order_value', 'repeat_customers', 'top_customers' (by total spent)."
+    )
+    start_date: Optional[str] = Field(None, description="First day, YYYY-MM-DD (inclusive). Omit with end_date for all time.")
+    end_date: Optional[str] = Field(None, description="Last day, YYYY-MM-DD (inclusive). Omit with start_date for all time.")
+    limit: int = Field(5, ge=1, le=50, description="Number of rows for top_customers.")
+
+
+class GetStoreMetricTool(BaseTool):
+    """
+    Tool answering common metrics from the cheapest data source: local
+    rollups, the count endpoint, the customers' lifetime aggregates or a
+    scan of orders, ranked by the number of Shopify requests each needs.
+    """
+    name: str = "get_store_metric"
+    description: str = (
+        "Answers order_count, revenue, average_order_value, repeat_customers or top_customers "
+        "from the cheapest data source and reports which one it used. "
+        "Inputs: metric, start_date and end_date (YYYY-MM-DD, omit both for all time), limit. "
+        "Prefer this over get_shopify_data for these metrics, especially customer questions."
+    )
+    args_schema: Type[BaseModel] = GetStoreMetricInput
+
+    store: LocalOrderStore = Field(default_factory=get_local_store)
+    # The session's store (None: the configured SHOPIFY_STORE_URL)
+    store_client: Optional[StoreClient] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _run(self, *args, **kwargs) -> str:
+        """Synchronous run not implemented (async only)."""
+        raise NotImplementedError("Use run_async instead.")
+
+    async def _arun(
+        self,
+        metric: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 5
+    ) -> str:
+        if metric not in METRIC_SOURCES:
+            return f"Error: Unknown metric '{metric}'. Use one of: {', '.join(METRIC_SOURCES)}"
+        window = None
+        if start_date or end_date:
+            if not (start_date and end_date):
+                return "Error: Provide both start_date and end_date, or neither for all time."
+            window = _parse_range(start_date, end_date)
+            if isinstance(window, str):
+                return window
+
+        params: Dict[str, Any] = {}
+        if window is not None:
+            params = {
+                'created_at_min': f"{window[0].isoformat()}T00:00:00Z",
+                'created_at_max': f"{window[1].isoformat()}T23:59:59Z",
+            }
+
+        client = ShopifyClient(store_client=self.store_client)
+        try:
+            # 1. Size the candidate sources (skipped when the rollups answer for free)
+            gap = self.store.coverage_gap(window)
+            needed = sorted(counts_needed(metric, window is None, gap is None))
+            sizes = dict(zip(needed, await asyncio.gather(*[
+                client.get_count(resource, params=params if resource == 'orders' else None)
+                for resource in needed
+            ])))
+            plan = plan_source(
+                metric,
+                all_time=window is None,
+                rollups_ready=gap is None,
+                order_count=sizes.get('orders'),
+                customer_count=sizes.get('customers'),
+                # All-time answers from the rollups are as of the last sync
+                rollups_note=gap or (f"orders synced through {self.store.synced_through:%Y-%m-%d %H:%M} UTC" if window is None else "")
+            )
+
+            # 2. Answer from the cheapest one
+            chosen = plan.chosen
+            customers, orders, revenue_cents = await self._totals(client, chosen.source, chosen.requests, window, params)
+        except ShopifyError as e:
+            return f"Shopify Error: {str(e)}"
+        finally:
+            await client.close()
+
+        result = ShopifyService.source_metric(metric, customers, orders, revenue_cents, limit)
+        return f"{result}\n{plan.describe()}"
+
+    async def _totals(
+        self,
+        client: ShopifyClient,
+        source: str,
+        max_pages: int,
+        window: Optional[Tuple[date, date]],
+        params: Dict[str, Any]
+    ) -> Totals:
+        if source == ROLLUPS:
+            return _cube_totals(self.store.rollups, window)
+
+        if source == COUNT_ENDPOINT:
+            total, cancelled = await asyncio.gather(
+                client.get_count('orders', params=params),
+                client.get_count('orders', params={**params, 'status': 'cancelled'})
+            )
+            return {}, total - cancelled, None
+
+        if source == CUSTOMER_AGGREGATES:
+            records: List[Dict[str, Any]] = [
+                c for c in await client.get_resource('customers', params={'fields': 'id,orders_count,total_spent'}, max_pages=max_pages)
+                if isinstance(c, dict) and c.get('id') is not None
+            ]
+            spent = to_cents([c.get('total_spent') for c in records]).tolist() if records else []
+            customers = {str(c['id']): (int(c.get('orders_count') or 0), cents) for c, cents in zip(records, spent)}
+            return customers, None, None
+
+        # Orders scan, folded through a throwaway cube so cancelled orders and cents match the rollups
+        cube = RollupCube()
+        cube.upsert_orders(await client.get_resource('orders', params=dict(params), max_pages=max_pages))
+        return _cube_totals(cube, None)
@@ -0,0 +1,65 @@
+import ast
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_experimental.tools import PythonAstREPLTool
+from langchain_experimental.tools.python.tool import sanitize_input
+from pydantic import Field
+
+from app.services.repl_cache import ReplResultCache, detach, get_repl_cache, writes_in_place
+
+
+class CachedPythonREPLTool(PythonAstREPLTool):
+    """
+    python_repl_ast backed by the process-wide ReplResultCache.
+
+    `versions` maps REPL variables to the version of their content. The
+    agent sets it when it injects datasets; variables assigned by a snippet
+    get a version derived from that snippet's cache key, so chains of
+    snippets over the same data stay cacheable. Snippets that write in
+    place run normally, are not cached and drop every version, since they
+    may have changed any dataset. Keys are
+    prefixed with `namespace` (the store) so tenants never share entries.
+    """
+    cache: ReplResultCache = Field(default_factory=get_repl_cache)
+    versions: Dict[str, str] = Field(default_factory=dict)
+    namespace: str = ""
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> Any:
+        code = sanitize_input(query) if self.sanitize_input else query
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return super()._run(query, run_manager)
+
+        writes = writes_in_place(tree)
+        key = None if writes else self.cache.key(tree, self.locals, self.versions)
+        if key is not None and self.namespace:
+            key = f"{self.namespace}:{key}"
+        if key is not None:
+            hit = self.cache.get(key)
+            if hit is not None:
+                output, bindings = hit
+                for name, value in bindings.items():
+                    self.locals[name] = detach(value)
+                    self.versions[name] = f"{key}:{name}"
+                return output
+
+        before = dict(self.locals)
+        output = super()._run(query, run_manager)
+        assigned = {name: value for name, value in self.locals.items() if before.get(name) is not value}
+
+        for name in assigned:
+            self.versions.pop(name, None)
+        if writes:
+            # The write may reach any dataset through an alias or a loop variable
+            # (`for o in orders_data: o['x'] = 0`, and shopify_data is orders_data)
+            self.versions.clear()
+        if key is not None:
+            self.cache.put(key, detach(output), {name: detach(value) for name, value in assigned.items()})
+            for name in assigned:
+                self.versions[name] = f"{key}:{name}"
+        return output
+
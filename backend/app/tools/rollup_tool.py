@@ -0,0 +1,133 @@
+from datetime import date
+from typing import Optional, Tuple, Type, Union
+from langchain.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from app.analytics.store import LocalOrderStore, get_local_store
+from app.services.shopify_service import ShopifyService
+
+def _parse_range(start_date: str, end_date: str) -> Union[Tuple[date, date], str]:
+    """Parse the inclusive YYYY-MM-DD range shared by the store metric tools, or return an error."""
+    try:
+        start = date.fromisoformat(start_date[:10])
+        end = date.fromisoformat(end_date[:10])
+    except ValueError:
+        return "Error: start_date and end_date must be YYYY-MM-DD."
+    if end < start:
+        return "Error: end_date is before start_date."
+    return start, end
+
+def _coverage_error(store: LocalOrderStore, window: Tuple[date, date]) -> Optional[str]:
+    """Error for a range the synced orders do not fully cover, so it is not under-reported."""
+    gap = store.coverage_gap(window)
+    if gap is None:
+        return None
+    return (
+        f"Error: The synced orders do not cover {window[0]} to {window[1]} ({gap}). "
+        "Use get_store_metric or get_shopify_data for this range."
+    )
+
+class QueryStoreMetricsInput(BaseModel):
+    """Input model for query_store_metrics."""
+    measure: str = Field(
+        ...,
+        description="One of: 'orders', 'revenue_cents' (order totals), 'units', 'item_revenue_cents' (line item sales)."
+    )
+    group_by: Optional[str] = Field(
+        None,
+        description="'day', 'city', 'customer' (orders/revenue_cents) or 'day', 'city', 'product' (units/item_revenue_cents). Omit for a total."
+    )
+    start_date: str = Field(..., description="First day of the range, YYYY-MM-DD (inclusive).")
+    end_date: str = Field(..., description="Last day of the range, YYYY-MM-DD (inclusive).")
+    limit: int = Field(10, ge=1, le=100, description="Maximum number of groups to return.")
+
+class QueryStoreMetricsTool(BaseTool):
+    """
+    Tool answering aggregate questions from the pre-aggregated daily rollups
+    of synced orders, without fetching raw orders from Shopify.
+    """
+    name: str = "query_store_metrics"
+    description: str = (
+        "Fast pre-aggregated metrics for synced orders (cancelled orders excluded). "
+        "Inputs: measure (orders/revenue_cents/units/item_revenue_cents), group_by (day/city/customer/product or omit), "
+        "start_date, end_date (YYYY-MM-DD), limit. Returns a Markdown table, or an error for ranges the sync does not cover yet. "
+        "Prefer this over get_shopify_data for revenue, order or units totals and breakdowns."
+    )
+    args_schema: Type[BaseModel] = QueryStoreMetricsInput
+
+    store: LocalOrderStore = Field(default_factory=get_local_store)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _run(self, *args, **kwargs) -> str:
+        """Synchronous run not implemented (async only)."""
+        raise NotImplementedError("Use run_async instead.")
+
+    async def _arun(
+        self,
+        measure: str,
+        start_date: str,
+        end_date: str,
+        group_by: Optional[str] = None,
+        limit: int = 10
+    ) -> str:
+        window = _parse_range(start_date, end_date)
+        if isinstance(window, str):
+            return window
+        start, end = window
+        error = _coverage_error(self.store, window)
+        if error:
+            return error
+
+        try:
+            return ShopifyService.rollup_table(self.store.rollups, measure, group_by, start, end, limit)
+        except ValueError as e:
+            return f"Error: {str(e)}"
+
+class EstimateStoreMetricsInput(BaseModel):
+    """Input model for estimate_store_metrics."""
+    metric: str = Field(
+        ...,
+        description=(
+            "One of: 'distinct_customers', 'repeat_customer_rate', 'top_products' (by units), "
+            "'top_cities' (by revenue), 'average_order_value', 'median_order_value'."
+        )
+    )
+    start_date: str = Field(..., description="First day of the range, YYYY-MM-DD (inclusive).")
+    end_date: str = Field(..., description="Last day of the range, YYYY-MM-DD (inclusive).")
+    limit: int = Field(5, ge=1, le=50, description="Number of rows for top_products / top_cities.")
+
+class EstimateStoreMetricsTool(BaseTool):
+    """
+    Tool answering customer and top-N questions approximately from daily
+    sketches, for stores too large to scan interactively.
+    """
+    name: str = "estimate_store_metrics"
+    description: str = (
+        "Approximate metrics for very large stores, answered instantly from sketches of synced orders. "
+        "Inputs: metric (distinct_customers/repeat_customer_rate/top_products/top_cities/average_order_value/median_order_value), "
+        "start_date, end_date (YYYY-MM-DD), limit. Results carry an error bound and MUST be presented as estimates. "
+        "Ranges the sync does not cover yet return an error."
+    )
+    args_schema: Type[BaseModel] = EstimateStoreMetricsInput
+
+    store: LocalOrderStore = Field(default_factory=get_local_store)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _run(self, *args, **kwargs) -> str:
+        """Synchronous run not implemented (async only)."""
+        raise NotImplementedError("Use run_async instead.")
+
+    async def _arun(self, metric: str, start_date: str, end_date: str, limit: int = 5) -> str:
+        window = _parse_range(start_date, end_date)
+        if isinstance(window, str):
+            return window
+        error = _coverage_error(self.store, window)
+        if error:
+            return error
+
+        try:
+            return ShopifyService.approximate_metric(self.store.sketches.window(*window), metric, limit)
+        except ValueError as e:
+            return f"Error: {str(e)}"
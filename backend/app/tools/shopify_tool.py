@@ -1,14 +1,34 @@
+import asyncio
+import keyword
 from typing import Optional, Type, List, Dict, Any, ClassVar
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from app.services.shopify_client import ShopifyClient
+from app.services.query_planner import PlannedResult, plan_query
+from app.services.fetch_cache import SharedFetchCache
 from app.utils.exceptions import ShopifyError
+from app.services.store_registry import StoreClient
+from app.utils.rate_limiter import AsyncRateLimiter
+
+class ResourceRequest(BaseModel):
+    """One resource fetch inside a multi-resource get_shopify_data call."""
+    resource: str = Field(
+        ...,
+        description="The resource to fetch. Must be one of: 'orders', 'products', 'customers'."
+    )
+    limit: int = Field(250, ge=1, le=250, description="Number of results per page. Max 250.")
+    filters: Optional[Dict[str, Any]] = Field(None, description="Dictionary of filter parameters.")
+    count_only: bool = Field(False, description="Return only the number of matching records.")
+    name: Optional[str] = Field(
+        None,
+        description="Python variable to store the result in. Defaults to '<resource>_data' (e.g. 'orders_data')."
+    )
 
 class GetShopifyDataInput(BaseModel):
     """Input model for get_shopify_data."""
-    resource: str = Field(
-        ..., 
+    resource: Optional[str] = Field(
+        None, 
         description="The resource to fetch. Must be one of: 'orders', 'products', 'customers'."
     )
     limit: int = Field(
@@ -19,7 +39,18 @@ class GetShopifyDataInput(BaseModel):
     )
     filters: Optional[Dict[str, Any]] = Field(
         None, 
-        description="Dictionary of filter parameters (e.g., {'status': 'open'})."
+        description=(
+            "Dictionary of filter parameters (e.g., {'status': 'open'}). Shopify-supported filters are sent to the API; "
+            "extra filters such as city, product_title, min_total_price are applied to the fetched records."
+        )
+    )
+    count_only: bool = Field(
+        False,
+        description="Return only the number of matching records (one request via the count endpoint) instead of the records."
+    )
+    requests: Optional[List[ResourceRequest]] = Field(
+        None,
+        description="Fetch several resources concurrently in one call, e.g. [{'resource': 'orders'}, {'resource': 'products'}]."
     )
 
 class GetShopifyDataTool(BaseTool):
@@ -31,42 +62,156 @@ class GetShopifyDataTool(BaseTool):
     name: str = "get_shopify_data"
     description: str = (
         "Useful for retrieving data from a Shopify store. "
-        "Inputs: resource (orders/products/customers), limit (max 250), filters (dict). "
-        "Returns a list of records."
+        "Inputs: resource (orders/products/customers), limit (max 250), filters (dict), "
+        "count_only (bool, set true for 'how many' questions). "
+        "Returns a list of records, or an integer count when count_only is true. "
+        "To fetch several resources at once, pass requests (list of {resource, filters, limit, count_only}) instead."
     )
     args_schema: Type[BaseModel] = GetShopifyDataInput
     
     # Allowed resources whitelist
     ALLOWED_RESOURCES: ClassVar[set] = {'orders', 'products', 'customers'}
 
-    def _run(self, resource: str, limit: int = 50, filters: Optional[Dict[str, Any]] = None) -> Any:
+    # REPL variables the agent sets itself; a fetch result must not replace them
+    RESERVED_NAMES: ClassVar[set] = {
+        'pd', 'np', 'shopify_data', 'join_index',
+        'store_orders', 'store_line_items', 'orders_between', 'line_items_between',
+    }
+
+    # Order filters applied when the agent gives no created_at bound (e.g. the question's resolved
+    # date range); a fetch that sets either bound is taken as is, so it can pick another period
+    default_filters: Dict[str, Any] = Field(default_factory=dict)
+
+    # Reads shared with the other questions of a batch (None: every call fetches)
+    fetch_cache: Optional[SharedFetchCache] = None
+
+    # The session's store (None: the configured SHOPIFY_STORE_URL)
+    store_client: Optional[StoreClient] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @staticmethod
+    def variable_name(request: ResourceRequest) -> str:
+        """Name of the REPL variable a multi-resource result is stored under."""
+        return request.name or f"{request.resource}_data"
+
+    @classmethod
+    def invalid_names(cls, requests: List[ResourceRequest]) -> Optional[str]:
+        """Error observation when requests would share or overwrite a REPL variable."""
+        seen = set()
+        for request in requests:
+            name = cls.variable_name(request)
+            if not name.isidentifier() or keyword.iskeyword(name) or name in cls.RESERVED_NAMES:
+                return f"Error: '{name}' cannot be used as a variable name. Pick another 'name'."
+            if name in seen:
+                return (
+                    f"Error: Two requests would both be stored in '{name}'. "
+                    "Give each request for the same resource its own 'name' (e.g. 'orders_q1', 'orders_q2')."
+                )
+            seen.add(name)
+        return None
+
+    def _run(
+        self,
+        resource: Optional[str] = None,
+        limit: int = 50,
+        filters: Optional[Dict[str, Any]] = None,
+        count_only: bool = False,
+        requests: Optional[List[Any]] = None
+    ) -> Any:
         """Synchronous run not implemented (async only)."""
         raise NotImplementedError("Use run_async instead.")
 
     async def _arun(
         self, 
-        resource: str, 
+        resource: Optional[str] = None, 
         limit: int = 50, 
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        count_only: bool = False,
+        requests: Optional[List[Any]] = None
     ) -> Any:
         """
         Execute the Shopify API request asynchronously.
+        Multi-resource requests return a dict of variable name -> result.
         """
+        if requests:
+            requests = [ResourceRequest.model_validate(r) for r in requests]
+            error = self.invalid_names(requests)
+            if error:
+                return error
+            return await self._fetch_many(requests)
+
+        if resource is None:
+            return "Error: Provide either 'resource' or 'requests'."
+
+        client = ShopifyClient(store_client=self.store_client)
+        try:
+            return await self._fetch(client, resource, limit, filters, count_only)
+        finally:
+            await client.close()
+
+    async def _fetch_many(self, requests: List[ResourceRequest]) -> Dict[str, Any]:
+        """
+        Run several fetches concurrently on one client. All of them draw from a
+        shared token bucket so the burst stays inside the store's API limit:
+        the store's own bucket when there is a store client, else a fresh one.
+        """
+        if self.store_client is not None:
+            client = ShopifyClient(store_client=self.store_client)
+        else:
+            client = ShopifyClient(rate_limiter=AsyncRateLimiter(
+                max_tokens=ShopifyClient.BUCKET_SIZE,
+                refill_rate=ShopifyClient.LEAK_RATE
+            ))
+        try:
+            results = await asyncio.gather(*[
+                self._fetch(client, r.resource, r.limit, r.filters, r.count_only)
+                for r in requests
+            ])
+        finally:
+            await client.close()
+
+        return {self.variable_name(r): result for r, result in zip(requests, results)}
+
+    async def _fetch(
+        self,
+        client: ShopifyClient,
+        resource: str,
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+        count_only: bool
+    ) -> Any:
         # 1. Validate Resource
         if resource not in self.ALLOWED_RESOURCES:
             return f"Error: Resource '{resource}' is not supported. Allowed: {', '.join(self.ALLOWED_RESOURCES)}"
 
-        # 2. Sanitize Filters (Simple pass-through for now, but good hook for validation)
-        params = filters or {}
+        # 2. Plan Filters: push what Shopify supports down as params, evaluate the rest locally
+        requested = dict(filters or {})
+        if resource == 'orders' and not requested.keys() & {'created_at_min', 'created_at_max'}:
+            requested = {**self.default_filters, **requested}
+        plan = plan_query(resource, requested)
+        params = dict(plan.api_params)
         params['limit'] = limit
 
-        client = ShopifyClient()
         try:
-            results = await client.get_resource(resource, params=params)
-            return results
+            if count_only and not plan.local_filters:
+                return await self._read(client, 'count', resource, params)
+            results = plan.apply(await self._read(client, 'list', resource, params))
+            if count_only:
+                return len(results)
+            return PlannedResult(results, plan)
         except ShopifyError as e:
             return f"Shopify Error: {str(e)}"
         except Exception as e:
             return f"Unexpected Error: {str(e)}"
-        finally:
-            await client.close()
+
+    async def _read(self, client: ShopifyClient, kind: str, resource: str, params: Dict[str, Any]) -> Any:
+        """Count or list request, through the batch's shared cache when there is one."""
+        def load():
+            if kind == 'count':
+                return client.get_count(resource, params=params)
+            return client.get_resource(resource, params=params)
+
+        if self.fetch_cache is None:
+            return await load()
+        return await self.fetch_cache.get(SharedFetchCache.key(kind, resource, params), load)
@@ -0,0 +1,189 @@
+import re
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+
+_UNIT_PATTERN = r"(day|week|month|year)s?"
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fourteen": 14, "thirty": 30,
+    "sixty": 60, "ninety": 90,
+}
+
+
+@dataclass(frozen=True)
+class ResolvedDateRange:
+    """
+    A relative date phrase resolved to an absolute, inclusive UTC range.
+    """
+    phrase: str
+    start: datetime
+    end: datetime
+
+    @property
+    def start_iso(self) -> str:
+        return self.start.strftime(ISO_FORMAT)
+
+    @property
+    def end_iso(self) -> str:
+        return self.end.strftime(ISO_FORMAT)
+
+    def as_filters(self) -> Dict[str, str]:
+        """Shopify `created_at` filters covering this range."""
+        return {"created_at_min": self.start_iso, "created_at_max": self.end_iso}
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def _day_end(day: date) -> datetime:
+    return datetime.combine(day, time(23, 59, 59))
+
+
+def _shift_months(day: date, months: int) -> date:
+    """Move `day` by `months`, clamping to the last day of the target month."""
+    month_index = day.year * 12 + (day.month - 1) + months
+    year, month = divmod(month_index, 12)
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return date(year, month + 1, min(day.day, last_day))
+
+
+def _month_bounds(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _quarter_bounds(year: int, quarter: int) -> Tuple[date, date]:
+    first_month = 3 * (quarter - 1) + 1
+    start, _ = _month_bounds(year, first_month)
+    _, end = _month_bounds(year, first_month + 2)
+    return start, end
+
+
+def _parse_count(token: str) -> Optional[int]:
+    if token.isdigit():
+        return int(token)
+    return _NUMBER_WORDS.get(token)
+
+
+def _rolling_range(reference: date, count: int, unit: str) -> Tuple[date, date]:
+    """'last N <unit>' rolling windows ending on the reference date."""
+    if unit == "day":
+        return reference - timedelta(days=count), reference
+    if unit == "week":
+        return reference - timedelta(weeks=count), reference
+    if unit == "month":
+        return _shift_months(reference, -count), reference
+    return _shift_months(reference, -12 * count), reference
+
+
+def _fixed_phrase(phrase: str, reference: date) -> Optional[Tuple[date, date]]:
+    """Resolve phrases that do not carry a number."""
+    week_start = reference - timedelta(days=reference.weekday())
+    quarter = (reference.month - 1) // 3 + 1
+
+    if phrase == "today":
+        return reference, reference
+    if phrase == "yesterday":
+        day = reference - timedelta(days=1)
+        return day, day
+    if phrase == "this week":
+        return week_start, reference
+    if phrase in ("last calendar week", "previous calendar week"):
+        start = week_start - timedelta(weeks=1)
+        return start, start + timedelta(days=6)
+    if phrase in ("this month", "month to date", "mtd"):
+        return date(reference.year, reference.month, 1), reference
+    if phrase in ("last month", "previous month"):
+        previous = _shift_months(reference, -1)
+        return _month_bounds(previous.year, previous.month)
+    if phrase == "this quarter":
+        return _quarter_bounds(reference.year, quarter)[0], reference
+    if phrase in ("last quarter", "previous quarter"):
+        year, quarter = (reference.year, quarter - 1) if quarter > 1 else (reference.year - 1, 4)
+        return _quarter_bounds(year, quarter)
+    if phrase in ("this year", "year to date", "ytd"):
+        return date(reference.year, 1, 1), reference
+    if phrase in ("last year", "previous year"):
+        return date(reference.year - 1, 1, 1), date(reference.year - 1, 12, 31)
+    return None
+
+
+_FIXED_PHRASES = (
+    "today", "yesterday", "this week", "last calendar week", "previous calendar week",
+    "this month", "month to date", "mtd", "last month", "previous month",
+    "this quarter", "last quarter", "previous quarter",
+    "this year", "year to date", "ytd", "last year", "previous year",
+)
+
+_ROLLING_RE = re.compile(
+    r"\b(?:last|past|previous)\s+(\d+|" + "|".join(_NUMBER_WORDS) + r")\s+" + _UNIT_PATTERN + r"\b"
+)
+_FIXED_RE = re.compile(r"\b(" + "|".join(re.escape(p) for p in _FIXED_PHRASES) + r")\b")
+_QUARTER_RE = re.compile(r"\bq([1-4])(?:\s*(?:of\s+)?(\d{4}))?\b")
+# "may" is only treated as a month when a year follows it ("may 2025").
+_MONTH_RE = re.compile(
+    r"\b(" + "|".join(m for m in MONTHS if m != "may") + r")(?:\s+(\d{4}))?\b|\b(may)\s+(\d{4})\b"
+)
+
+
+def resolve_date_ranges(message: str, reference: date) -> List[ResolvedDateRange]:
+    """
+    Detect relative date expressions in a user message and resolve them against
+    the reference date. Returns ranges in the order the phrases appear.
+
+    Bare quarters and months ("Q3", "November") resolve to the most recent
+    occurrence that has already started relative to the reference date.
+    """
+    if not message:
+        return []
+
+    text = message.lower()
+    matches: List[Tuple[int, int, str, date, date]] = []
+
+    for match in _ROLLING_RE.finditer(text):
+        count = _parse_count(match.group(1))
+        if not count:
+            continue
+        start, end = _rolling_range(reference, count, match.group(2))
+        matches.append((match.start(), match.end(), match.group(0), start, end))
+
+    for match in _FIXED_RE.finditer(text):
+        bounds = _fixed_phrase(match.group(1), reference)
+        if bounds:
+            matches.append((match.start(), match.end(), match.group(0), *bounds))
+
+    for match in _QUARTER_RE.finditer(text):
+        quarter = int(match.group(1))
+        year = int(match.group(2)) if match.group(2) else reference.year
+        start, end = _quarter_bounds(year, quarter)
+        if not match.group(2) and start > reference:
+            start, end = _quarter_bounds(year - 1, quarter)
+        matches.append((match.start(), match.end(), match.group(0), start, end))
+
+    for match in _MONTH_RE.finditer(text):
+        name = match.group(1) or match.group(3)
+        year_token = match.group(2) or match.group(4)
+        month = MONTHS[name]
+        year = int(year_token) if year_token else reference.year
+        if not year_token and date(year, month, 1) > reference:
+            year -= 1
+        start, end = _month_bounds(year, month)
+        matches.append((match.start(), match.end(), match.group(0), start, end))
+
+    # Drop overlapping matches, keeping the longest phrase at each position.
+    matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+    resolved: List[ResolvedDateRange] = []
+    covered_until = -1
+    for start_pos, end_pos, phrase, start, end in matches:
+        if start_pos < covered_until:
+            continue
+        covered_until = end_pos
+        resolved.append(ResolvedDateRange(phrase=phrase, start=_day_start(start), end=_day_end(end)))
+
+    return resolved
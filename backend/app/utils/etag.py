@@ -0,0 +1,14 @@
+from typing import Optional
+
+def make_etag(version: Optional[str]) -> str:
+    """Strong entity tag for a resource version (None: the empty resource)."""
+    return f'"{version or "empty"}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
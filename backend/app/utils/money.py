@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Iterable
+
+# Order/line-item fields Shopify returns as decimal strings (e.g. "279.27")
+MONEY_FIELDS = ['total_price', 'subtotal_price', 'total_tax']
+
+
+def to_cents(values: Iterable[Any]) -> np.ndarray:
+    """
+    Convert money values to an int64 array of cents in bulk.
+
+    Strings are parsed column-wise by pd.to_numeric and scaled to the nearest
+    cent. For Shopify's two-decimal amounts this is exact: the float parse
+    error is far below half a cent, so "279.27" always becomes 27927. All
+    sums then happen on int64. Missing or unparseable values count as 0.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if series.empty:
+        return np.zeros(0, dtype=np.int64)
+
+    amounts = pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    return np.round(amounts * 100).astype(np.int64)
+
+
+def format_cents(cents: int) -> str:
+    """Render integer cents as a dollar string, e.g. 123456 -> '$1,234.56'."""
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(int(cents)), 100)
+    return f"{sign}${dollars:,}.{remainder:02d}"
+
+
+def format_cents_series(cents: pd.Series) -> pd.Series:
+    """Render a column of integer cents for display."""
+    return cents.map(format_cents)
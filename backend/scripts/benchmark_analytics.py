@@ -0,0 +1,124 @@
+"""
+Benchmark the columnar analytics engine against the previous row-by-row
+implementation, scaling the sample store export up to 1M orders.
+
+Usage (from backend/):
+    python scripts/benchmark_analytics.py [sizes...] [--legacy-max N]
+
+Example:
+    python scripts/benchmark_analytics.py 119 10000 100000 1000000 --legacy-max 100000
+"""
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.shopify_service import ShopifyService
+
+SAMPLE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "clean_orders.json"))
+DEFAULT_SIZES = [119, 10_000, 100_000, 1_000_000]
+
+
+# --- Previous implementation (per-order parsing, iterrows, string concatenation) ---
+
+def legacy_parse_orders(orders):
+    data = []
+    for order in orders:
+        customer = order.get('customer', {}) or {}
+        address = order.get('billing_address', {}) or {}
+        data.append({
+            'id': order.get('id'),
+            'created_at': pd.to_datetime(order.get('created_at')),
+            'total_price': float(order.get('total_price', 0.0)),
+            'customer_id': customer.get('id'),
+            'email': customer.get('email'),
+            'city': address.get('city', 'Unknown'),
+            'line_items': order.get('line_items', [])
+        })
+    return pd.DataFrame(data)
+
+
+def legacy_top_products(orders_df, limit=5):
+    all_items = []
+    for _, row in orders_df.iterrows():
+        for item in row['line_items']:
+            all_items.append({
+                'product_title': item.get('title', 'Unknown Product'),
+                'quantity': item.get('quantity', 0),
+                'price': float(item.get('price', 0.0))
+            })
+    items_df = pd.DataFrame(all_items)
+    top = items_df.groupby('product_title')['quantity'].sum().sort_values(ascending=False).head(limit)
+    return legacy_table(top.reset_index(), ["Product", "Units Sold"])
+
+
+def legacy_table(df, headers):
+    markdown_table = f"| {' | '.join(headers)} |\n"
+    markdown_table += f"| {' | '.join(['---'] * len(headers))} |\n"
+    for _, row in df.iterrows():
+        markdown_table += f"| {' | '.join(str(val) for val in row)} |\n"
+    return markdown_table
+
+
+# --- Data generation ---
+
+def load_sample():
+    with open(SAMPLE_PATH, 'r') as f:
+        orders = json.load(f)['orders']
+    # Keep only the attributes the analytics read so 1M copies fit in memory
+    keep = ('id', 'created_at', 'total_price', 'customer', 'billing_address', 'line_items')
+    return [{key: order.get(key) for key in keep} for order in orders]
+
+
+def scale(sample, size):
+    orders = []
+    for i in range(size):
+        order = dict(sample[i % len(sample)])
+        order['id'] = i + 1
+        orders.append(order)
+    return orders
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    args = sys.argv[1:]
+    legacy_max = 100_000
+    if "--legacy-max" in args:
+        index = args.index("--legacy-max")
+        legacy_max = int(args[index + 1])
+        del args[index:index + 2]
+    sizes = [int(a) for a in args] or DEFAULT_SIZES
+
+    sample = load_sample()
+    print(f"Sample: {len(sample)} orders from {SAMPLE_PATH}")
+    print(f"{'orders':>10} | {'parse':>9} | {'top products':>12} | {'city table':>10} | {'legacy parse':>12} | {'legacy top':>10}")
+    print("-" * 80)
+
+    for size in sizes:
+        orders = scale(sample, size)
+
+        df, parse_s = timed(ShopifyService.parse_orders_data, orders)
+        _, top_s = timed(ShopifyService.get_top_products, df)
+        _, city_s = timed(ShopifyService.analyze_revenue_by_city, df)
+
+        if size <= legacy_max:
+            legacy_df, legacy_parse_s = timed(legacy_parse_orders, orders)
+            _, legacy_top_s = timed(legacy_top_products, legacy_df)
+            legacy_cols = f"{legacy_parse_s:>11.3f}s | {legacy_top_s:>9.3f}s"
+        else:
+            legacy_cols = f"{'skipped':>12} | {'skipped':>10}"
+
+        print(f"{size:>10} | {parse_s:>8.3f}s | {top_s:>11.3f}s | {city_s:>9.3f}s | {legacy_cols}")
+
+
+if __name__ == "__main__":
+    main()
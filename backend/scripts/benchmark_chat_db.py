@@ -0,0 +1,122 @@
+"""
+Measure chat_history query latency at scale: the history window loaded on
+every turn, a full history page and the session list, first without
+secondary indexes and with default pragmas (the schema before migration
+0003), then after `alembic upgrade head` with the WAL/synchronous/cache
+pragmas.
+
+Usage (from backend/):
+    python scripts/benchmark_chat_db.py [messages] [messages_per_session]
+
+Example:
+    python scripts/benchmark_chat_db.py 1000000 50
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text
+
+from app.db.database import apply_sqlite_pragmas
+from app.db.init_db import create_schema
+
+REPEATS = 200
+TIME_BUDGET = 3.0  # seconds per query
+
+QUERIES = {
+    # conversation_memory.load_conversation_context
+    "history window (last 5)": (
+        "SELECT id, role, content, timestamp FROM messages WHERE session_id = :session_id "
+        "ORDER BY timestamp DESC LIMIT 5"
+    ),
+    # AgentService.get_history
+    "full session history": (
+        "SELECT id, role, content, timestamp FROM messages WHERE session_id = :session_id ORDER BY timestamp"
+    ),
+    # AgentService.list_sessions, first page (legacy rows fall back to their first question)
+    "session list page (50)": (
+        "SELECT p.id, p.last_active, coalesce(p.preview, (SELECT m.content FROM messages m "
+        "WHERE m.session_id = p.id AND m.role = 'user' ORDER BY m.timestamp LIMIT 1)) "
+        "FROM (SELECT id, last_active, preview FROM sessions ORDER BY last_active DESC, id DESC LIMIT 50) p "
+        "ORDER BY p.last_active DESC, p.id DESC"
+    ),
+}
+
+
+def populate(engine, total_messages, per_session):
+    """Unindexed schema filled with synthetic turns; previews are NULL, as for pre-existing sessions."""
+    sessions = max(1, total_messages // per_session)
+    base = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE sessions (id VARCHAR NOT NULL PRIMARY KEY, store_url VARCHAR NOT NULL, created_at DATETIME, last_active DATETIME, "
+                                "history_summary TEXT, summarized_through DATETIME, preview VARCHAR(40))"))
+        connection.execute(text("CREATE TABLE messages (id VARCHAR NOT NULL PRIMARY KEY, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL, timestamp DATETIME)"))
+        session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+        connection.execute(
+            text("INSERT INTO sessions (id, store_url, created_at, last_active) VALUES (:id, 'https://demo.myshopify.com', :created, :active)"),
+            [{"id": sid, "created": base, "active": base + timedelta(seconds=i)} for i, sid in enumerate(session_ids)]
+        )
+        # Sessions are interleaved in time, like concurrent users
+        batch = []
+        for n in range(total_messages):
+            sid = session_ids[n % sessions]
+            role = "user" if (n // sessions) % 2 == 0 else "assistant"
+            batch.append({
+                "id": str(uuid.uuid4()), "sid": sid, "role": role,
+                "content": f"Message {n} about revenue by city for the last 30 days",
+                "ts": base + timedelta(seconds=n),
+            })
+            if len(batch) == 50_000:
+                connection.execute(text("INSERT INTO messages VALUES (:id, :sid, :role, :content, :ts)"), batch)
+                batch = []
+        if batch:
+            connection.execute(text("INSERT INTO messages VALUES (:id, :sid, :role, :content, :ts)"), batch)
+    return session_ids
+
+
+def measure(engine, session_ids):
+    results = {}
+    with engine.connect() as connection:
+        for label, sql in QUERIES.items():
+            start = time.perf_counter()
+            runs = 0
+            # Unindexed queries are slow: stop after the time budget instead of REPEATS
+            while runs < REPEATS and (runs == 0 or time.perf_counter() - start < TIME_BUDGET):
+                connection.execute(text(sql), {"session_id": session_ids[(runs * 7919) % len(session_ids)]}).all()
+                runs += 1
+            results[label] = (time.perf_counter() - start) / runs * 1000
+    return results
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'chat_history.db')}"
+        unindexed = create_engine(url)
+        started = time.perf_counter()
+        session_ids = populate(unindexed, total, per_session)
+        print(f"Populated {total:,} messages in {len(session_ids):,} sessions ({time.perf_counter() - started:.1f}s)")
+        before = measure(unindexed, session_ids)
+        unindexed.dispose()
+
+        tuned = apply_sqlite_pragmas(create_engine(url))
+        started = time.perf_counter()
+        create_schema(tuned)
+        print(f"alembic upgrade head: {time.perf_counter() - started:.1f}s")
+        after = measure(tuned, session_ids)
+        tuned.dispose()
+
+    print(f"\n{'query':<26} {'unindexed ms':>12} {'migrated ms':>12} {'speedup':>9}")
+    for label in QUERIES:
+        print(f"{label:<26} {before[label]:>12.3f} {after[label]:>12.3f} {before[label] / after[label]:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
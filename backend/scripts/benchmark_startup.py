@@ -0,0 +1,77 @@
+"""
+Measure cold start of the API in fresh interpreters: time to import
+app.main, time until the lifespan has run and /health answers (the
+instance is ready), and time until the agent is usable. Also prints the
+slowest imports from `python -X importtime`.
+
+Usage (from backend/):
+    python scripts/benchmark_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    assert client.get("/health").status_code == 200
+    ready = time.perf_counter()
+    from app.api.routes import get_agent_service
+    get_agent_service()
+    agent = time.perf_counter()
+print(json.dumps({"import": imported - start, "ready": ready - start, "agent": agent - start}))
+"""
+
+
+def run(env, *args):
+    return subprocess.run([sys.executable, *args], cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(env, count=12):
+    """Direct imports of app.main by cumulative time (microseconds), from -X importtime."""
+    stderr = run(env, "-X", "importtime", "-c", "import app.main").stderr
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # One separator space, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "app.main":
+                return int(cumulative), sorted(children, reverse=True)[:count]
+            children = []  # Post-order: a top-level line closes its children
+        elif depth == 1:
+            children.append((int(cumulative), name.strip()))
+    return 0, []
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'chat_history.db')}"}
+        # First start creates the database; it is not measured
+        run(env, "-c", PROBE)
+        samples = [json.loads(run(env, "-c", PROBE).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+
+        print(f"Median of {runs} cold starts (seconds since interpreter start of the probe):")
+        for key, label in (("import", "import app.main"), ("ready", "lifespan done, /health 200"), ("agent", "agent usable")):
+            print(f"  {label:<28} {statistics.median(s[key] for s in samples):6.2f}s")
+
+        total, children = slowest_imports(env)
+        print(f"\nimport app.main: {total / 1000:.1f} ms cumulative; slowest direct imports:")
+        for cumulative, name in children:
+            print(f"  {cumulative / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Run one incremental order sync and publish a new columnar snapshot.
+Meant to be run by a single sync process (cron, sidecar) while the API
+workers pick up the new version from SNAPSHOT_DIR on their next request.
+
+Usage (from backend/):
+    python scripts/sync_orders.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.sync_service import OrderSyncService
+
+
+def main():
+    result = asyncio.run(OrderSyncService().sync())
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ from collections import defaultdict
 
 # Load the JSON files
 import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.analytics.time_index import TimeIndex
+from app.analytics.join_index import JoinIndex
 print(f"DEBUG: CWD is {os.getcwd()}")
 clean_path = os.path.abspath('clean_orders.json')
 print(f"DEBUG: Reading from {clean_path}")
@@ -37,9 +41,17 @@ customers = list(customers_dict.values())
 
 print(f"DEBUG: Loaded {len(orders_list)} raw orders -> {len(orders)} unique orders.")
 
+# Built once: O(1) product/customer lookups instead of scanning the lists per row
+join_index = JoinIndex(products=products, customers=customers)
+
 # Set today's date (as per assignment)
 TODAY = datetime(2025, 12, 21)
 
+# Parse created_at once; every date window below is a binary search on this index.
+# Windows are in the store's timezone, which the export carries on each timestamp.
+time_index = TimeIndex.from_timestamps([o.get('created_at') for o in orders])
+STORE_TZ = datetime.fromisoformat(orders[0]['created_at'].replace('Z', '+00:00')).tzinfo if orders else None
+
 print("=" * 60)
 print("SHOPIFY STORE DATA VERIFICATION - EXPECTED ANSWERS")
 print("=" * 60)
@@ -47,7 +59,7 @@ print("=" * 60)
 # TEST 1: Orders last 7 days
 print("\n1. How many orders did we get in the last 7 days?")
 seven_days_ago = TODAY - timedelta(days=7)
-recent_orders = [o for o in orders if datetime.fromisoformat(o['created_at'].replace('Z', '+00:00')).replace(tzinfo=None) >= seven_days_ago]
+recent_orders = [orders[i] for i in time_index.rows(start=seven_days_ago.replace(tzinfo=STORE_TZ))]
 total_revenue = sum(float(o['total_price']) for o in recent_orders)
 aov = total_revenue / len(recent_orders) if recent_orders else 0
 print(f"ANSWER: {len(recent_orders)} orders")
@@ -104,7 +116,7 @@ for order in orders:
 repeat_customers = [(cid, count) for cid, count in customer_orders.items() if count >= 2]
 print(f"ANSWER: {len(repeat_customers)} repeat customers")
 for cid, count in sorted(repeat_customers, key=lambda x: x[1], reverse=True)[:5]:
-    customer = next((c for c in customers if c['id'] == cid), None)
+    customer = join_index.customers_by_id.get(cid)
     name = f"{customer['first_name']} {customer['last_name']}" if customer else "Unknown"
     print(f"- {name}: {count} orders")
 
@@ -130,8 +142,10 @@ print(f"ANSWER: ${total_revenue_all:.2f}")
 
 # TEST 9: Orders this month
 print("\n9. How many orders this month (December)?")
-dec_orders = [o for o in orders if datetime.fromisoformat(o['created_at'].replace('Z', '+00:00')).month == 12 
-              and datetime.fromisoformat(o['created_at'].replace('Z', '+00:00')).year == 2025]
+dec_orders = [orders[i] for i in time_index.rows(
+    start=datetime(2025, 12, 1, tzinfo=STORE_TZ),
+    end=datetime(2025, 12, 31, 23, 59, 59, tzinfo=STORE_TZ)
+)]
 print(f"ANSWER: {len(dec_orders)} orders in December 2025")
 
 # TEST 10: Top revenue city
@@ -0,0 +1,41 @@
+import pandas as pd
+from app.analytics.columnar import build_orders_frame, build_line_items_frame, render_markdown_table
+
+def test_build_orders_frame_types(sample_orders_data):
+    orders = sample_orders_data + [{"id": 4, "created_at": "2025-12-01T10:00:00-05:00", "total_price": None}]
+    df = build_orders_frame(orders)
+
+    assert list(df.columns) == ['id', 'created_at', 'total_price', 'customer_id', 'email', 'city', 'line_items', 'total_price_cents']
+    assert str(df['created_at'].dt.tz) == "UTC"
+    # Offsets are normalized to UTC
+    assert df.iloc[3]['created_at'] == pd.Timestamp("2025-12-01T15:00:00Z")
+    assert df['total_price'].dtype == 'float64'
+    assert df['total_price_cents'].tolist() == [10000, 5000, 20000, 0]
+    assert df.iloc[3]['total_price'] == 0.0
+    assert df.iloc[3]['city'] == "Unknown"
+    assert df.iloc[3]['line_items'] == []
+
+def test_build_line_items_frame(sample_orders_data):
+    orders = sample_orders_data + [{"id": 4, "created_at": "2025-12-01T00:00:00Z", "line_items": []}]
+    items = build_line_items_frame(build_orders_frame(orders))
+
+    assert len(items) == 4
+    assert items['quantity'].dtype == 'int64'
+    assert items[items['order_id'] == 2]['revenue_cents'].iloc[0] == 5000
+    assert items[items['order_id'] == 3]['title'].tolist() == ["Product A", "Product C"]
+    assert items[items['order_id'] == 2]['city'].iloc[0] == "Chicago"
+    assert items.groupby('title')['quantity'].sum()["Product A"] == 2
+
+def test_build_frames_empty():
+    assert build_orders_frame([]).empty
+    assert build_line_items_frame(pd.DataFrame()).empty
+
+def test_render_markdown_table():
+    df = pd.DataFrame({"title": ["A", "B"], "units": [3, 1]})
+    assert render_markdown_table(df, ["Product", "Units"]) == (
+        "| Product | Units |\n"
+        "| --- | --- |\n"
+        "| A | 3 |\n"
+        "| B | 1 |\n"
+    )
+    assert render_markdown_table(pd.DataFrame(), ["X"]) == "No data to display."
@@ -0,0 +1,53 @@
+from app.analytics.join_index import JoinIndex
+from app.models.records import compact_records
+
+PRODUCTS = [
+    {"id": 10, "title": "Wool Hat", "product_type": "Hats", "vendor": "Acme", "variants": [{"id": 101}, {"id": 102}]},
+    {"id": 20, "title": "Silk Scarf", "product_type": "Scarves", "vendor": "Acme", "variants": []},
+    {"id": 30, "title": "wool  hat", "product_type": "Dupes", "vendor": "Other", "variants": []},
+]
+CUSTOMERS = [
+    {"id": 1, "email": "Ana@Example.com", "first_name": "Ana", "last_name": "Lopez"},
+    {"id": 2, "email": "bo@example.com", "first_name": "Bo", "last_name": None},
+]
+
+def test_product_lookup_falls_back_from_variant_to_title():
+    index = JoinIndex(products=PRODUCTS)
+
+    assert index.product_for({"variant_id": 102, "product_id": 20})["id"] == 10
+    assert index.product_for({"variant_id": 999, "product_id": 20})["id"] == 20
+    # First product wins on normalized duplicate titles
+    assert index.product_for({"title": "  WOOL hat "})["id"] == 10
+    assert index.product_for({"title": "Unknown"}) is None
+    assert index.product_for({}) is None
+
+def test_customer_lookup_by_id_then_email():
+    index = JoinIndex(customers=CUSTOMERS)
+
+    assert index.customer_for({"customer": {"id": 2}})["first_name"] == "Bo"
+    assert index.customer_for({"customer": {"id": 99, "email": "ana@example.com "}})["id"] == 1
+    assert index.customer_for({"email": "ANA@example.com"})["id"] == 1
+    assert index.customer_for({"customer": None}) is None
+
+def test_line_items_frame_enriches_compact_records():
+    orders = compact_records("orders", [
+        {"id": 5, "customer": {"id": 1}, "line_items": [
+            {"title": "Wool Hat", "quantity": 2, "price": "10.00", "variant_id": 101},
+            {"title": "silk scarf", "quantity": 1, "price": "5.50"},
+        ]},
+        {"id": 6, "email": "bo@example.com", "line_items": [{"title": "Mystery", "quantity": 1, "price": "1.00"}]},
+    ])
+    index = JoinIndex(compact_records("products", PRODUCTS), compact_records("customers", CUSTOMERS))
+
+    frame = index.line_items_frame(orders)
+
+    assert frame["order_id"].tolist() == [5, 5, 6]
+    assert frame["product_type"].tolist()[:2] == ["Hats", "Scarves"]
+    assert frame["product_id"].isna().tolist() == [False, False, True]
+    assert frame["customer_name"].tolist() == ["Ana Lopez", "Ana Lopez", "Bo"]
+    assert frame["quantity"].sum() == 4
+
+def test_empty_inputs():
+    frame = JoinIndex().line_items_frame([])
+    assert frame.empty
+    assert list(frame.columns)[:2] == ["order_id", "title"]
@@ -0,0 +1,99 @@
+from datetime import date
+from app.analytics.rollups import RollupCube, order_day
+from app.analytics.store import LocalOrderStore
+from app.services.shopify_service import ShopifyService
+
+ORDERS = [
+    {
+        "id": 1, "created_at": "2025-12-01T10:00:00Z", "total_price": "100.10",
+        "customer": {"id": 101}, "billing_address": {"city": "New York"},
+        "line_items": [{"title": "Product A", "quantity": 2, "price": "50.05"}]
+    },
+    {
+        "id": 2, "created_at": "2025-12-02T23:30:00-05:00", "total_price": "40.00",
+        "customer": None, "billing_address": {"city": "Chicago"},
+        "line_items": [{"title": "Product B", "quantity": 1, "price": "40.00"}]
+    },
+    {
+        "id": 3, "created_at": "2025-12-05T12:00:00Z", "total_price": "0.20",
+        "customer": {"id": 101}, "billing_address": {"city": "New York"},
+        "line_items": [{"title": "Product A", "quantity": 1, "price": "0.20"}]
+    },
+]
+
+def build_cube():
+    cube = RollupCube()
+    cube.upsert_orders([dict(o) for o in ORDERS])
+    return cube
+
+def test_order_day_is_utc():
+    assert order_day("2025-12-02T23:30:00-05:00") == date(2025, 12, 3)
+    assert order_day(None) is None
+
+def test_aggregate_totals_and_groups():
+    cube = build_cube()
+    start, end = date(2025, 12, 1), date(2025, 12, 31)
+
+    assert cube.aggregate('revenue_cents', start, end) == {'total': 14030}
+    assert cube.aggregate('orders', start, end, group_by='city') == {'New York': 2, 'Chicago': 1}
+    assert cube.aggregate('orders', start, end, group_by='customer') == {'101': 2, 'Guest': 1}
+    assert cube.aggregate('units', start, end, group_by='product') == {'Product A': 3, 'Product B': 1}
+    assert cube.aggregate('orders', start, end, group_by='day') == {
+        '2025-12-01': 1, '2025-12-03': 1, '2025-12-05': 1
+    }
+    # Range bounds are inclusive days
+    assert cube.aggregate('orders', date(2025, 12, 2), date(2025, 12, 3)) == {'total': 1}
+
+def test_update_replaces_previous_contribution():
+    cube = build_cube()
+    updated = dict(ORDERS[0], total_price="10.00", billing_address={"city": "Boston"},
+                   line_items=[{"title": "Product C", "quantity": 1, "price": "10.00"}])
+    cube.upsert_orders([updated])
+
+    start, end = date(2025, 12, 1), date(2025, 12, 31)
+    assert len(cube) == 3
+    assert cube.aggregate('revenue_cents', start, end, group_by='city') == {'Boston': 1000, 'Chicago': 4000, 'New York': 20}
+    assert cube.aggregate('units', start, end, group_by='product') == {'Product A': 1, 'Product B': 1, 'Product C': 1}
+
+def test_cancelled_order_is_removed():
+    cube = build_cube()
+    cube.upsert_orders([dict(ORDERS[1], cancelled_at="2025-12-04T00:00:00Z")])
+
+    assert len(cube) == 2
+    assert 'Chicago' not in cube.aggregate('orders', date(2025, 12, 1), date(2025, 12, 31), group_by='city')
+
+def test_invalid_grouping_raises():
+    cube = build_cube()
+    try:
+        cube.aggregate('units', date(2025, 12, 1), date(2025, 12, 31), group_by='customer')
+        assert False, "expected ValueError"
+    except ValueError as e:
+        assert "cannot be grouped" in str(e)
+
+def test_store_tracks_watermark():
+    store = LocalOrderStore()
+    assert not store.is_ready
+    store.apply_orders([
+        dict(ORDERS[0], updated_at="2025-12-03T00:00:00Z"),
+        dict(ORDERS[1], updated_at="2025-12-02T20:00:00-05:00"),
+    ])
+    assert store.is_ready
+    # Compared as instants, not strings
+    assert store.updated_at_watermark == "2025-12-02T20:00:00-05:00"
+
+def test_shopify_service_rollup_tables():
+    cube = build_cube()
+    start, end = date(2025, 12, 1), date(2025, 12, 31)
+
+    assert ShopifyService.revenue_by_city_from_rollups(cube, start, end) == (
+        "| City | Revenue |\n"
+        "| --- | --- |\n"
+        "| New York | $100.30 |\n"
+        "| Chicago | $40.00 |\n"
+    )
+    assert ShopifyService.top_products_from_rollups(cube, start, end, limit=1) == (
+        "| Product | Units |\n"
+        "| --- | --- |\n"
+        "| Product A | 3 |\n"
+    )
+    assert "No synced orders" in ShopifyService.top_products_from_rollups(cube, date(2024, 1, 1), date(2024, 1, 2))
@@ -0,0 +1,103 @@
+import random
+from datetime import date
+from app.analytics.rollups import OrderContribution
+from app.analytics.sketches import DailySketches, DistinctSample, HyperLogLog, ReservoirSample, SpaceSaving
+from app.analytics.store import LocalOrderStore
+from app.services.shopify_service import ShopifyService
+
+def test_hyperloglog_estimate_and_merge():
+    left, right = HyperLogLog(), HyperLogLog()
+    for i in range(30_000):
+        left.add(f"customer-{i}")
+    for i in range(20_000, 50_000):
+        right.add(f"customer-{i}")
+
+    estimate = left.merge(right).estimate()
+    assert abs(estimate.value - 50_000) <= estimate.error
+    # Re-adding known values changes nothing
+    before = left.registers.copy()
+    left.add("customer-1")
+    assert (left.registers == before).all()
+
+def test_hyperloglog_small_counts_are_close():
+    sketch = HyperLogLog()
+    for i in range(10):
+        sketch.add(i)
+    assert round(sketch.estimate().value) == 10
+
+def test_space_saving_bounds_hold():
+    rng = random.Random(7)
+    truth = {}
+    sketch = SpaceSaving(k=10)
+    for _ in range(5_000):
+        item = f"p{min(int(rng.expovariate(0.3)), 40)}"
+        truth[item] = truth.get(item, 0) + 1
+        sketch.add(item)
+
+    top = sketch.top(3)
+    assert [item for item, _, _ in top] == sorted(truth, key=truth.get, reverse=True)[:3]
+    for item, count, error in top:
+        assert count - error <= truth[item] <= count
+
+def test_space_saving_merge_is_exact_below_capacity():
+    a, b = SpaceSaving(k=5), SpaceSaving(k=5)
+    a.add("x", 3)
+    a.add("y", 1)
+    b.add("x", 2)
+    b.add("z", 4)
+    assert a.merge(b).top(3) == [("x", 5, 0), ("z", 4, 0), ("y", 1, 0)]
+
+def test_reservoir_mean_within_bound():
+    rng = random.Random(1)
+    left, right = ReservoirSample(k=500, seed=1), ReservoirSample(k=500, seed=2)
+    values = [rng.randint(1_000, 20_000) for _ in range(20_000)]
+    for value in values[:5_000]:
+        left.add(value)
+    for value in values[5_000:]:
+        right.add(value)
+
+    merged = left.merge(right)
+    estimate = merged.mean()
+    assert merged.n == 20_000 and len(merged.values) == 500
+    assert abs(estimate.value - sum(values) / len(values)) <= 2 * estimate.error
+
+def test_distinct_sample_repeat_rate():
+    exact = DistinctSample()
+    for key in ["a", "a", "b", "c", "c", "c", "d"]:
+        exact.add(key)
+    assert exact.repeat_rate().exact
+    assert exact.repeat_rate().value == 50.0
+
+    # 20% of 20k customers order twice; split across two buckets
+    day_one, day_two = DistinctSample(capacity=512), DistinctSample(capacity=512)
+    for i in range(20_000):
+        day_one.add(f"c{i}")
+        if i % 5 == 0:
+            day_two.add(f"c{i}")
+    estimate = day_one.merge(day_two).repeat_rate()
+    assert not estimate.exact
+    assert abs(estimate.value - 20.0) <= 2 * estimate.error
+
+def test_daily_sketches_window():
+    sketches = DailySketches()
+    for day, customer in [(1, "1"), (2, "1"), (3, "2")]:
+        sketches.add(OrderContribution(
+            day=date(2025, 12, day), order_key=("Boston", customer), revenue_cents=1000 * day,
+            items=[(("Boston", "Product A"), day, 0)]
+        ))
+
+    window = sketches.window(date(2025, 12, 1), date(2025, 12, 2))
+    assert window.orders == 2
+    assert window.products.top(1) == [("Product A", 3, 0)]
+    assert window.customer_sample.repeat_rate().value == 100.0
+
+def test_store_feeds_sketches_once(sample_orders_data):
+    store = LocalOrderStore()
+    store.apply_orders(sample_orders_data)
+    store.apply_orders(sample_orders_data)  # re-synced, unchanged
+
+    bucket = store.sketches.window(date(2000, 1, 1), date(2100, 1, 1))
+    assert bucket.orders == 3
+    assert "Repeat customer rate: **50.0%** (exact" in ShopifyService.approximate_metric(bucket, 'repeat_customer_rate')
+    assert "| Product A | 2 | 0 |" in ShopifyService.approximate_metric(bucket, 'top_products')
+    assert ShopifyService.approximate_metric(bucket, 'average_order_value') == "Average order value: **$116.67** (exact)"
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+import numpy as np
+from datetime import date
+from app.analytics.rollups import RollupCube
+from app.analytics.snapshot import ColumnarSnapshot, current_version
+from app.analytics.store import LocalOrderStore
+
+def test_write_and_open_is_memory_mapped(tmp_path, sample_orders_data):
+    snapshot = ColumnarSnapshot.from_orders(sample_orders_data)
+    assert snapshot.write(str(tmp_path)) == 1
+
+    opened = ColumnarSnapshot.open(str(tmp_path))
+    assert isinstance(opened.arrays['id'], np.memmap)
+    assert opened.version == 1
+    assert opened.n_orders == 3 and opened.n_items == 4
+    # Sorted by created_at: the oldest order (id 3) comes first
+    assert opened.arrays['id'].tolist() == [3, 2, 1]
+    assert opened.arrays['item_offsets'].tolist() == [0, 2, 3, 4]
+
+def test_open_without_snapshot(tmp_path):
+    assert ColumnarSnapshot.open(str(tmp_path)) is None
+    assert current_version(str(tmp_path)) is None
+
+def test_frames(sample_orders_data):
+    snapshot = ColumnarSnapshot.from_orders(sample_orders_data + [{"id": 4, "created_at": None, "total_price": "1.00"}])
+    orders = snapshot.orders_frame()
+    items = snapshot.line_items_frame()
+
+    assert str(orders['created_at'].dt.tz) == "UTC"
+    assert orders['created_at'].isna().sum() == 1
+    assert orders.set_index('id').loc[4, 'city'] == "Unknown"
+    assert orders['total_price_cents'].sum() == 35100
+    assert items.groupby('title', observed=True)['quantity'].sum().to_dict() == {"Product A": 2, "Product B": 2, "Product C": 1}
+    assert items[items['order_id'] == 2]['revenue_cents'].tolist() == [5000]
+
+def test_merge_upserts_by_id(sample_orders_data):
+    snapshot = ColumnarSnapshot.from_orders(sample_orders_data)
+    updated = dict(sample_orders_data[2], total_price="5.00", line_items=[{"title": "Product D", "quantity": 3, "price": "1.00"}])
+    merged = snapshot.merge([updated])
+
+    assert merged.n_orders == 3
+    assert merged.line_items_frame().set_index('order_id').loc[3, 'title'] == "Product D"
+    assert merged.orders_frame().set_index('id').loc[3, 'total_price_cents'] == 500
+    # The original snapshot is unchanged
+    assert snapshot.n_items == 4
+
+def test_rollups_from_snapshot_match_incremental(sample_orders_data):
+    incremental = RollupCube()
+    incremental.upsert_orders(sample_orders_data)
+    rebuilt = RollupCube.from_snapshot(ColumnarSnapshot.from_orders(sample_orders_data))
+
+    start, end = date(2000, 1, 1), date(2100, 1, 1)
+    for measure, group_by in [('revenue_cents', 'city'), ('orders', 'customer'), ('units', 'product'), ('item_revenue_cents', 'day')]:
+        assert rebuilt.aggregate(measure, start, end, group_by) == incremental.aggregate(measure, start, end, group_by)
+
+def test_store_refresh_picks_up_other_process(tmp_path, sample_orders_data):
+    writer = LocalOrderStore(snapshot_dir=str(tmp_path))
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+    writer.apply_orders([dict(o, updated_at="2025-12-01T00:00:00Z") for o in sample_orders_data])
+
+    assert reader.refresh()
+    assert reader.is_ready
+    assert len(reader.rollups) == 3
+    assert reader.updated_at_watermark == "2025-12-01T00:00:00Z"
+    # Unchanged version: nothing to reload
+    assert not reader.refresh()
+
+def test_readers_load_the_writers_aggregates(tmp_path, sample_orders_data, monkeypatch):
+    writer = LocalOrderStore(snapshot_dir=str(tmp_path))
+    writer.apply_orders(sample_orders_data)
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+    monkeypatch.setattr(RollupCube, "from_snapshot", lambda snapshot: pytest.fail("rebuilt"))
+
+    assert reader.refresh()
+
+    start, end = date(2000, 1, 1), date(2100, 1, 1)
+    assert reader.rollups.aggregate('revenue_cents', start, end, 'city') == writer.rollups.aggregate('revenue_cents', start, end, 'city')
+    assert reader.sketches.window(start, end).orders == 3
+    # A loaded cube still takes upserts
+    reader.rollups.upsert_orders([dict(sample_orders_data[0], id=99)])
+    assert len(reader.rollups) == 4
+
+def test_snapshot_without_aggregates_is_rebuilt(tmp_path, sample_orders_data):
+    ColumnarSnapshot.from_orders(sample_orders_data).write(str(tmp_path))
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+
+    assert reader.refresh()
+    assert len(reader.rollups) == 3
+    assert reader.sketches.window(date(2000, 1, 1), date(2100, 1, 1)).orders == 3
+
+@pytest.mark.asyncio
+async def test_refresh_soon_loads_off_the_event_loop(tmp_path, sample_orders_data):
+    writer = LocalOrderStore(snapshot_dir=str(tmp_path))
+    writer.apply_orders(sample_orders_data[:1])
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+    reader.refresh()
+    writer.apply_orders(sample_orders_data)
+
+    reader.refresh_soon()
+    loading = reader._loading
+    reader.refresh_soon()  # One load at a time
+
+    # Still serving the previous version until the load completes
+    assert loading is reader._loading
+    assert reader.snapshot.version == 1 and len(reader.rollups) == 1
+    await loading
+    await asyncio.sleep(0)
+    assert reader.snapshot.version == 2 and len(reader.rollups) == 3
+    assert reader._loading is None
+
+def test_refresh_soon_needs_an_event_loop(tmp_path, sample_orders_data):
+    LocalOrderStore(snapshot_dir=str(tmp_path)).apply_orders(sample_orders_data)
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+
+    reader.refresh_soon()
+
+    assert reader.snapshot is None and not reader.is_ready
+
+def test_readers_share_the_writers_synced_range(tmp_path, sample_orders_data):
+    from datetime import datetime, timezone
+    synced_through = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    LocalOrderStore(snapshot_dir=str(tmp_path)).apply_orders(sample_orders_data, synced_through=synced_through)
+    reader = LocalOrderStore(snapshot_dir=str(tmp_path))
+
+    reader.refresh()
+
+    assert reader.synced_through == synced_through
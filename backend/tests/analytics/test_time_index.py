@@ -0,0 +1,43 @@
+from datetime import date, datetime, timezone
+from app.analytics.snapshot import ColumnarSnapshot
+from app.analytics.time_index import TimeIndex, to_epoch
+
+STAMPS = [
+    "2025-12-05T10:00:00Z",
+    None,
+    "2025-12-01T00:00:00Z",
+    "2025-12-03T23:59:59Z",
+    "2025-12-04T00:00:00-05:00",  # 05:00 UTC
+]
+
+def test_to_epoch_bounds():
+    assert to_epoch(date(2025, 12, 1)) == to_epoch("2025-12-01T00:00:00Z")
+    assert to_epoch("2025-12-01", end=True) == to_epoch("2025-12-01T23:59:59Z")
+    # Naive datetimes are UTC
+    assert to_epoch(datetime(2025, 12, 1)) == to_epoch(datetime(2025, 12, 1, tzinfo=timezone.utc))
+
+def test_rows_from_unsorted_timestamps():
+    index = TimeIndex.from_timestamps(STAMPS)
+
+    assert len(index) == 5
+    assert index.rows().tolist() == [2, 3, 4, 0]
+    assert index.rows("2025-12-02", "2025-12-04").tolist() == [3, 4]
+    # End bound is inclusive to the second
+    assert index.rows(end="2025-12-03T23:59:59Z").tolist() == [2, 3]
+    assert index.count(start="2025-12-06") == 0
+    assert index.count(start="2025-12-05", end="2025-12-01") == 0
+
+def test_snapshot_window_slices_orders_and_items(sample_orders_data):
+    orders = [
+        dict(sample_orders_data[0], id=1, created_at="2025-12-01T10:00:00Z"),
+        dict(sample_orders_data[2], id=2, created_at="2025-12-10T10:00:00Z"),
+        dict(sample_orders_data[1], id=3, created_at="2025-12-20T10:00:00Z"),
+    ]
+    snapshot = ColumnarSnapshot.from_orders(orders)
+    window = snapshot.window("2025-12-05", "2025-12-20")
+
+    assert window.arrays['id'].tolist() == [2, 3]
+    assert window.arrays['item_offsets'].tolist() == [0, 2, 3]
+    assert snapshot.line_items_frame("2025-12-05", "2025-12-15")['title'].tolist() == ["Product A", "Product C"]
+    assert snapshot.orders_frame(end="2025-12-01")['id'].tolist() == [1]
+    assert snapshot.window("2026-01-01").n_orders == 0
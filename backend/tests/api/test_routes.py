@@ -7,7 +7,8 @@ from datetime import datetime
 
 client = TestClient(app)
 
-from app.api.routes import get_agent_service
+from app.api.routes import get_agent_service, get_job_runner
+from app.models.agent import JobStatus
 
 @pytest.fixture
 def mock_agent_service():
@@ -77,14 +78,112 @@ def test_chat_rate_limit(mock_agent_service):
     assert "Rate limit exceeded" in response.json()["detail"]
 
 def test_get_history(mock_agent_service):
-    mock_agent_service.get_history.return_value = [
+    mock_agent_service.history_etag.return_value = '"m2"'
+    mock_agent_service.get_history_page.return_value = ([
         {"role": "user", "content": "hi", "timestamp": "2025-12-01T00:00:00Z"},
         {"role": "assistant", "content": "hello", "timestamp": "2025-12-01T00:00:01Z"}
-    ]
+    ], "prev", "next")
     
-    response = client.get("/api/sessions/session-123/history")
+    response = client.get("/api/sessions/session-123/history?limit=2")
     
     assert response.status_code == 200
     history = response.json()
     assert len(history) == 2
     assert history[0]["role"] == "user"
+    assert response.headers["ETag"] == '"m2"'
+    assert response.headers["X-Prev-Cursor"] == "prev"
+    assert response.headers["X-Next-Cursor"] == "next"
+    mock_agent_service.get_history_page.assert_called_with("session-123", limit=2, before=None, after=None)
+
+def test_get_history_without_paging_returns_all_of_it(mock_agent_service):
+    mock_agent_service.history_etag.return_value = '"m2"'
+    mock_agent_service.get_history_page.return_value = ([], None, None)
+
+    client.get("/api/sessions/session-123/history")
+    mock_agent_service.get_history_page.assert_called_with("session-123", limit=None, before=None, after=None)
+    client.get("/api/sessions/session-123/history?before=abc")
+    mock_agent_service.get_history_page.assert_called_with("session-123", limit=100, before="abc", after=None)
+
+def test_get_history_not_modified(mock_agent_service):
+    mock_agent_service.history_etag.return_value = '"m2"'
+
+    response = client.get("/api/sessions/session-123/history", headers={"If-None-Match": '"m2"'})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"m2"'
+    mock_agent_service.get_history_page.assert_not_called()
+
+def test_get_history_unknown_session(mock_agent_service):
+    mock_agent_service.history_etag.side_effect = ValueError("Session not found")
+
+    response = client.get("/api/sessions/missing/history")
+
+    assert response.status_code == 404
+
+def test_list_sessions_returns_next_cursor_header(mock_agent_service):
+    mock_agent_service.list_sessions.return_value = ([{"id": "s1", "preview": "Hi"}], "abc")
+
+    response = client.get("/api/sessions?limit=1")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": "s1", "preview": "Hi"}]
+    assert response.headers["X-Next-Cursor"] == "abc"
+    mock_agent_service.list_sessions.assert_called_with(limit=1, cursor=None)
+
+def test_list_sessions_without_paging_returns_every_session(mock_agent_service):
+    mock_agent_service.list_sessions.return_value = ([{"id": "s1"}, {"id": "s2"}], None)
+
+    response = client.get("/api/sessions")
+
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+    mock_agent_service.list_sessions.assert_called_with(limit=None, cursor=None)
+    client.get("/api/sessions?cursor=abc")
+    mock_agent_service.list_sessions.assert_called_with(limit=50, cursor="abc")
+
+def test_list_sessions_rejects_bad_cursor(mock_agent_service):
+    mock_agent_service.list_sessions.side_effect = ValueError("Invalid cursor.")
+
+    assert client.get("/api/sessions?cursor=zzz").status_code == 400
+    assert client.get("/api/sessions?limit=0").status_code == 422
+
+def test_background_chat_returns_job(mock_agent_service):
+    runner = AsyncMock()
+    runner.submit.return_value = JobStatus(job_id="j1", session_id="session-123", status="queued", created_at=datetime(2025, 12, 1))
+    app.dependency_overrides[get_job_runner] = lambda: runner
+
+    response = client.post("/api/chat", json={"session_id": "session-123", "message": "Top customers?", "background": True})
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "j1"
+    assert response.json()["status"] == "queued"
+    runner.submit.assert_called_with("session-123", "Top customers?")
+    mock_agent_service.chat.assert_not_called()
+
+def test_get_job(mock_agent_service):
+    from unittest.mock import MagicMock
+    runner = MagicMock()
+    runner.get.side_effect = lambda job_id: JobStatus(
+        job_id=job_id, session_id="s1", status="succeeded", created_at=datetime(2025, 12, 1),
+        result=AgentResponse(session_id="s1", message="42 orders.")
+    ) if job_id == "j1" else None
+    app.dependency_overrides[get_job_runner] = lambda: runner
+
+    response = client.get("/api/jobs/j1")
+    assert response.status_code == 200
+    assert response.json()["result"]["message"] == "42 orders."
+    assert client.get("/api/jobs/nope").status_code == 404
+
+def test_chat_batch(mock_agent_service):
+    mock_agent_service.chat_batch.return_value = (
+        [AgentResponse(session_id="s1", message="AOV is $50."), AgentResponse(session_id="s1", message="Hat")],
+        "Fetched once for 2 questions: orders"
+    )
+
+    response = client.post("/api/chat/batch", json={"session_id": "s1", "questions": ["AOV?", "Top product?"]})
+
+    assert response.status_code == 200
+    assert [a["message"] for a in response.json()["answers"]] == ["AOV is $50.", "Hat"]
+    assert response.json()["data_plan"].startswith("Fetched once")
+    mock_agent_service.chat_batch.assert_called_with("s1", ["AOV?", "Top product?"])
+    assert client.post("/api/chat/batch", json={"session_id": "s1", "questions": []}).status_code == 422
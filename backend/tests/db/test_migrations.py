@@ -0,0 +1,45 @@
+from sqlalchemy import create_engine, inspect, text
+from app.db.database import apply_sqlite_pragmas
+from app.db.init_db import create_schema
+
+def test_fresh_database_gets_schema_and_indexes():
+    engine = create_engine("sqlite://")
+    create_schema(engine)
+    inspector = inspect(engine)
+
+    assert {"sessions", "messages", "jobs", "alembic_version"} <= set(inspector.get_table_names())
+    assert {"history_summary", "summarized_through", "preview"} <= {c["name"] for c in inspector.get_columns("sessions")}
+    assert [i["column_names"] for i in inspector.get_indexes("messages")] == [["session_id", "timestamp"]]
+    assert [i["column_names"] for i in inspector.get_indexes("sessions")] == [["last_active", "id"]]
+
+def test_pre_migration_database_is_upgraded_in_place(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE sessions (id VARCHAR NOT NULL PRIMARY KEY, store_url VARCHAR NOT NULL, created_at DATETIME, last_active DATETIME, history_summary TEXT)"))
+        connection.execute(text("CREATE TABLE messages (id VARCHAR NOT NULL PRIMARY KEY, session_id VARCHAR NOT NULL, role VARCHAR NOT NULL, content TEXT NOT NULL, timestamp DATETIME)"))
+        connection.execute(text("INSERT INTO sessions (id, store_url) VALUES ('s1', 'https://a.com')"))
+
+    create_schema(engine)
+    create_schema(engine)  # Re-running is a no-op
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0004"
+        assert connection.execute(text("SELECT id, preview FROM sessions")).all() == [("s1", None)]
+
+def test_sqlite_pragmas(tmp_path):
+    engine = apply_sqlite_pragmas(create_engine(f"sqlite:///{tmp_path / 'chat.db'}"))
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA cache_size")).scalar() == -65536
+
+def test_head_revision_matches_migrations(tmp_path):
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from app.db.init_db import ALEMBIC_INI, HEAD_REVISION, schema_is_current
+
+    assert ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head() == HEAD_REVISION
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    assert not schema_is_current(engine)
+    create_schema(engine)
+    assert schema_is_current(engine)
@@ -0,0 +1,74 @@
+import os
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import sessionmaker
+from app.db.database import build_engine, normalize_database_url
+from app.db.init_db import create_schema
+
+# e.g. TEST_DATABASE_URL=postgresql://postgres@localhost:5432/chat_test (the database is wiped)
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+requires_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+def test_postgres_urls_use_psycopg():
+    assert normalize_database_url("postgres://u:p@db/chat") == "postgresql+psycopg://u:p@db/chat"
+    assert normalize_database_url("postgresql://u:p@db/chat") == "postgresql+psycopg://u:p@db/chat"
+    assert normalize_database_url("postgresql+asyncpg://db/chat") == "postgresql+asyncpg://db/chat"
+    assert normalize_database_url("sqlite:///./chat_history.db") == "sqlite:///./chat_history.db"
+
+def test_sqlite_engine_keeps_pragmas(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+@pytest.fixture
+def pg_engine():
+    engine = build_engine(TEST_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS jobs, messages, sessions, alembic_version"))
+    create_schema(engine)
+    yield engine
+    engine.dispose()
+
+@requires_postgres
+def test_migrations_on_postgres(pg_engine):
+    create_schema(pg_engine)  # Re-running is a no-op
+    inspector = inspect(pg_engine)
+
+    assert {"sessions", "messages", "alembic_version"} <= set(inspector.get_table_names())
+    assert "ix_messages_session_id_timestamp" in {i["name"] for i in inspector.get_indexes("messages")}
+    assert pg_engine.pool.size() == 10
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_history_and_listing_on_postgres(pg_engine):
+    from app.models.database_models import Session
+    from app.services.agent_service import AgentService
+    from app.services.message_writer import MessageWriter
+
+    TestSession = sessionmaker(bind=pg_engine)
+    db = TestSession()
+    db.add_all([Session(id=f"s{i}", store_url="https://a.com", last_active=datetime(2025, 1, 1)) for i in range(3)])
+    db.commit()
+    db.close()
+
+    writer = MessageWriter(TestSession, max_delay=0.01)
+    await writer.start()
+    base = datetime(2025, 2, 1)
+    for i in range(6):
+        await writer.add_message("s1", "user" if i % 2 == 0 else "assistant", f"Message {i}",
+                                 timestamp=base + timedelta(minutes=i), preview="Message 0")
+    await writer.stop()
+
+    with patch("app.services.agent_service.ChatGroq"), patch("app.services.agent_service.SessionLocal", TestSession):
+        service = AgentService()
+        page, prev_cursor, _ = await service.get_history_page("s1", limit=4)
+        older, _, _ = await service.get_history_page("s1", limit=4, before=prev_cursor)
+        sessions, next_cursor = await service.list_sessions(limit=2)
+
+    assert [m.content for m in page] == ["Message 2", "Message 3", "Message 4", "Message 5"]
+    assert [m.content for m in older] == ["Message 0", "Message 1"]
+    assert [s["id"] for s in sessions] == ["s1", "s2"]
+    assert sessions[0]["preview"] == "Message 0"
+    assert next_cursor is not None
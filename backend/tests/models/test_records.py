@@ -0,0 +1,67 @@
+import json
+import pandas as pd
+from app.models.records import OrderRecord, ProductRecord, compact_records
+from app.models.shopify import Order
+
+RAW_ORDER = {
+    "id": 1, "created_at": "2025-12-01T10:00:00Z", "order_number": 1001, "currency": "USD",
+    "total_price": "100.10", "subtotal_price": "90.00", "total_tax": "10.10",
+    "customer": {"id": 7, "email": "a@test.com", "first_name": "Ann", "total_spent": "500.00"},
+    "billing_address": {"city": "Boston", "country": "US", "address1": "1 Main St"},
+    "line_items": [{"title": "Hat", "quantity": 2, "price": "50.05", "tax_lines": []}],
+    "client_details": {"browser_ip": "1.2.3.4"},
+    "note_attributes": [],
+}
+
+def test_schema_follows_pydantic_model():
+    for field in Order.model_fields:
+        assert field in OrderRecord._fields
+    assert "client_details" not in OrderRecord._fields
+
+def test_order_record_reads_like_a_dict():
+    order = compact_records("orders", [RAW_ORDER])[0]
+
+    assert order["id"] == 1
+    assert order.get("client_details") is None
+    assert order.get("billing_address", {}).get("city") == "Boston"
+    assert order["line_items"][0]["title"] == "Hat"
+    assert order["customer"]["first_name"] == "Ann"
+    assert "address1" not in order["billing_address"]
+    assert set(order.keys()) == set(OrderRecord._fields)
+
+def test_money_is_converted_in_bulk():
+    order = compact_records("orders", [RAW_ORDER])[0]
+
+    assert order["total_price"] == 100.1 and order["total_price_cents"] == 10010
+    assert order["line_items"][0]["price_cents"] == 5005
+    assert order["customer"]["total_spent_cents"] == 50000
+
+def test_defaults_and_overflow_keys():
+    order = compact_records("orders", [{"id": 2, "total_price": "1.00"}])[0]
+    assert order["billing_address"]["city"] == "Unknown"
+    assert order["customer"]["first_name"] == "Unknown"
+
+    order["segment"] = "vip"
+    assert order["segment"] == "vip"
+    assert "segment" in order
+    del order["segment"]
+    assert "segment" not in order
+
+def test_strings_are_interned():
+    first, second = compact_records("orders", json.loads(json.dumps([RAW_ORDER, RAW_ORDER])))
+    assert first["billing_address"]["city"] is second["billing_address"]["city"]
+    assert first["line_items"][0]["title"] is second["line_items"][0]["title"]
+
+def test_records_work_with_pandas_and_json():
+    orders = compact_records("orders", [RAW_ORDER, dict(RAW_ORDER, id=2)])
+    df = pd.DataFrame(orders)
+    assert df["total_price_cents"].sum() == 20020
+    assert json.loads(json.dumps(orders[0].to_dict()))["line_items"][0]["quantity"] == 2
+
+def test_products_and_unknown_resources():
+    product = compact_records("products", [{"id": 3, "title": "Hat", "variants": [{"id": 4, "price": "9.99"}]}])[0]
+    assert isinstance(product, ProductRecord)
+    assert product["variants"][0]["price_cents"] == 999
+
+    raw = [{"id": 1}]
+    assert compact_records("inventory", raw) is raw
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.services.agent_service import AgentService
 from app.models.agent import AgentResponse
 from langchain_core.messages import AIMessage
@@ -104,3 +104,307 @@ async def test_get_history(mock_agent_service):
     assert len(history) == 2
     assert history[0].role == "user"
     assert history[1].role == "assistant"
+
+@pytest.fixture
+def agent_service(tmp_path):
+    from sqlalchemy.orm import sessionmaker
+    from app.db.database import build_engine
+    from app.db.init_db import create_schema
+    from app.services.message_writer import MessageWriter
+
+    # A throwaway database, never ./chat_history.db
+    engine = build_engine(f"sqlite:///{tmp_path / 'chat_history.db'}")
+    create_schema(engine)
+    TestSession = sessionmaker(bind=engine)
+    with patch("app.services.agent_service.ChatGroq"), \
+            patch("app.services.agent_service.SessionLocal", TestSession), \
+            patch("app.services.agent_service.get_message_writer", return_value=MessageWriter(TestSession)):
+        service = AgentService()
+        service.llm = AsyncMock()
+        yield service
+    engine.dispose()
+
+def test_multi_resource_observation_injects_separate_variables(agent_service):
+    repl_locals = {}
+    tools = agent_service._create_tools_for_request(repl_locals)
+    tool_map = {t.name: t for t in tools}
+    observation = {
+        "orders_data": [{"id": 1, "total_price": "10.50"}],
+        "products_data": [{"id": 7, "title": "Hat"}],
+        "customers_data": 42
+    }
+    tool_input = {"requests": [{"resource": "orders"}, {"resource": "products"}, {"resource": "customers", "count_only": True}]}
+
+    summary = agent_service._handle_shopify_observation(observation, tool_input, repl_locals, tool_map)
+
+    assert repl_locals["orders_data"][0]["total_price"] == 10.5
+    assert repl_locals["products_data"][0]["title"] == "Hat"
+    assert "shopify_data" not in repl_locals
+    assert "Count: 42 matching customers." in summary
+    assert "Do NOT output the full data" in summary
+
+def test_single_resource_observation_keeps_other_datasets(agent_service):
+    repl_locals = {"orders_data": [{"id": 1}]}
+    tools = agent_service._create_tools_for_request(repl_locals)
+    tool_map = {t.name: t for t in tools}
+
+    agent_service._handle_shopify_observation([{"id": 7}], {"resource": "products"}, repl_locals, tool_map)
+
+    assert repl_locals["shopify_data"][0]["id"] == 7
+    assert repl_locals["products_data"] is repl_locals["shopify_data"]
+    assert repl_locals["orders_data"] == [{"id": 1}]
+
+@pytest.mark.asyncio
+async def test_repeated_action_is_memoized_and_forces_final_answer(agent_service):
+    session_id = await agent_service.create_session("https://test.com")
+    repeated = AIMessage(content="Thought: Check.\nAction: python_repl_ast\nAction Input: print(1 + 1)")
+    agent_service.llm.ainvoke.side_effect = [repeated, repeated, repeated, AIMessage(content="The answer is 2.")]
+
+    with patch("langchain_experimental.tools.PythonAstREPLTool._arun", new_callable=AsyncMock) as repl_run:
+        repl_run.return_value = "2"
+        response = await agent_service.chat(session_id, "What is 1 + 1?")
+
+    # Executed once, then served from the memo; the third repeat forces the answer
+    assert repl_run.call_count == 1
+    assert agent_service.llm.ainvoke.call_count == 4
+    assert response.message == "The answer is 2."
+    last_prompt = agent_service.llm.ainvoke.call_args[0][0][0].content
+    assert last_prompt.endswith("Final Answer:")
+
+@pytest.fixture
+def test_store(monkeypatch):
+    """Sessions read test-store.myshopify.com, through a fresh store registry."""
+    from app.core.config import settings
+    from app.services.store_registry import StoreRegistry
+    monkeypatch.setattr(settings, "SHOPIFY_STORE_URL", "test-store.myshopify.com")
+    monkeypatch.setattr(settings, "SHOPIFY_API_VERSION", "2025-07")
+    registry = StoreRegistry()
+    monkeypatch.setattr("app.services.agent_service.get_store_registry", lambda: registry)
+    return registry
+
+def action(tool, tool_input):
+    return AIMessage(content=f"Thought: Next step.\nAction: {tool}\nAction Input: {tool_input}")
+
+@pytest.mark.asyncio
+async def test_repl_memo_is_dropped_when_variables_change(agent_service):
+    session_id = await agent_service.create_session("https://test.com")
+    agent_service.llm.ainvoke.side_effect = [
+        action("python_repl_ast", "total = 5"),
+        action("python_repl_ast", "print(total)"),
+        action("python_repl_ast", "total = total * 2"),
+        action("python_repl_ast", "print(total)"),
+        AIMessage(content="Final Answer: 10"),
+    ]
+
+    await agent_service.chat(session_id, "Double it")
+
+    last_prompt = agent_service.llm.ainvoke.call_args[0][0][0].content
+    observations = [line for line in last_prompt.splitlines() if line.startswith("Observation: ")]
+    assert observations[-3:] == ["Observation: 5", "Observation: ", "Observation: 10"]
+
+@pytest.mark.asyncio
+async def test_repeated_fetch_binds_its_data_again(agent_service, test_store):
+    import respx
+    from httpx import Response
+    session_id = await agent_service.create_session("https://test.com")
+    agent_service.llm.ainvoke.side_effect = [
+        action("get_shopify_data", '{"resource": "orders"}'),
+        action("get_shopify_data", '{"resource": "products"}'),
+        action("get_shopify_data", '{"resource": "orders"}'),
+        action("python_repl_ast", "print(shopify_data[0]['id'])"),
+        AIMessage(content="Final Answer: done"),
+    ]
+
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as shopify:
+        orders = shopify.get("/orders.json").mock(return_value=Response(200, json={"orders": [{"id": 1, "total_price": "10.00"}]}))
+        shopify.get("/products.json").mock(return_value=Response(200, json={"products": [{"id": 5, "title": "Hat"}]}))
+        await agent_service.chat(session_id, "Orders and products")
+
+    # Served from the memo, but shopify_data is the orders again, not the products
+    assert orders.call_count == 1
+    last_prompt = agent_service.llm.ainvoke.call_args[0][0][0].content
+    assert last_prompt.rstrip().endswith("Observation: 1")
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried_not_replayed(agent_service, test_store):
+    import respx
+    from httpx import Response
+    session_id = await agent_service.create_session("https://test.com")
+    agent_service.llm.ainvoke.side_effect = [
+        action("get_shopify_data", '{"resource": "orders"}'),
+        action("get_shopify_data", '{"resource": "orders"}'),
+        AIMessage(content="Final Answer: done"),
+    ]
+
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as shopify:
+        orders = shopify.get("/orders.json").mock(side_effect=[
+            Response(503), Response(200, json={"orders": [{"id": 1, "total_price": "10.00"}]})
+        ])
+        await agent_service.chat(session_id, "Orders")
+
+    assert orders.call_count == 2
+    last_prompt = agent_service.llm.ainvoke.call_args[0][0][0].content
+    assert "Shopify Error" in last_prompt
+    assert "already ran in this request" not in last_prompt
+
+def test_injected_records_are_compact_with_exact_cents(agent_service):
+    repl_locals = {}
+    tools = agent_service._create_tools_for_request(repl_locals)
+    tool_map = {t.name: t for t in tools}
+    records = [{"id": 1, "total_price": "279.27", "total_tax": None, "unused": "x"}, {"id": 2, "total_price": "0.10"}]
+
+    summary = agent_service._handle_shopify_observation(records, {"resource": "orders"}, repl_locals, tool_map)
+
+    orders = repl_locals["orders_data"]
+    assert orders[0]["total_price_cents"] == 27927
+    assert orders[0]["total_price"] == 279.27
+    assert orders[0]["total_tax"] is None
+    assert orders[0]["total_tax_cents"] is None
+    assert "unused" not in orders[0]
+    assert orders[1]["billing_address"]["city"] == "Unknown"
+    assert "Row keys preview: [id, created_at" in summary
+    # Dataset versions let the REPL result cache recognise unchanged data
+    versions = tool_map["python_repl_ast"].versions
+    assert versions["orders_data"] == versions["shopify_data"]
+
+def test_join_index_built_when_products_injected(agent_service):
+    repl_locals = {}
+    tools = agent_service._create_tools_for_request(repl_locals)
+    tool_map = {t.name: t for t in tools}
+
+    agent_service._handle_shopify_observation([{"id": 1, "line_items": [{"title": "Hat", "quantity": 1}]}], {"resource": "orders"}, repl_locals, tool_map)
+    assert "join_index" not in repl_locals
+
+    summary = agent_service._handle_shopify_observation([{"id": 10, "title": "Hat", "variants": []}], {"resource": "products"}, repl_locals, tool_map)
+
+    join_index = repl_locals["join_index"]
+    assert tool_map["python_repl_ast"].locals["join_index"] is join_index
+    assert join_index.product_for({"title": "hat"})["id"] == 10
+    assert "join_index" in summary
+
+@pytest.mark.asyncio
+async def test_list_sessions_is_one_query_per_page(agent_service):
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.db.init_db import create_schema
+    from app.models.database_models import Session, Message
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    create_schema(engine)
+    TestSession = sessionmaker(bind=engine)
+    db = TestSession()
+    base = datetime(2025, 1, 1)
+    for i in range(5):
+        db.add(Session(id=f"s{i}", store_url="https://a.com", created_at=base, last_active=base + timedelta(hours=i % 3), preview=f"Question {i}" if i else None))
+    # Legacy session without a stored preview
+    db.add(Message(session_id="s0", role="user", content="A long first question about revenue by city last month", timestamp=base))
+    db.commit()
+    db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with patch("app.services.agent_service.SessionLocal", TestSession):
+        first, cursor = await agent_service.list_sessions(limit=3)
+        second, last = await agent_service.list_sessions(limit=3, cursor=cursor)
+        everything, no_cursor = await agent_service.list_sessions()
+
+    # last_active desc, id desc on ties; pages never overlap
+    assert [s["id"] for s in first] == ["s2", "s4", "s1"]
+    assert [s["id"] for s in second] == ["s3", "s0"]
+    assert last is None
+    assert [s["id"] for s in everything] == ["s2", "s4", "s1", "s3", "s0"] and no_cursor is None
+    assert second[1]["preview"] == "A long first question about revenue b..."
+    assert len([sql for sql in statements if sql.startswith("SELECT")]) == 3
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        with patch("app.services.agent_service.SessionLocal", TestSession):
+            await agent_service.list_sessions(cursor="not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_history_pages_by_keyset_with_etag(agent_service):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.db.init_db import create_schema
+    from app.models.database_models import Session, Message
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    create_schema(engine)
+    TestSession = sessionmaker(bind=engine)
+    db = TestSession()
+    base = datetime(2025, 1, 1)
+    db.add(Session(id="s1", store_url="https://a.com"))
+    for i in range(7):
+        db.add(Message(id=f"m{i}", session_id="s1", role="user" if i % 2 == 0 else "assistant", content=f"Message {i}", timestamp=base + timedelta(minutes=i)))
+    db.commit()
+    db.close()
+
+    with patch("app.services.agent_service.SessionLocal", TestSession):
+        etag = await agent_service.history_etag("s1")
+        latest, prev_cursor, next_cursor = await agent_service.get_history_page("s1", limit=3)
+        older, oldest_cursor, _ = await agent_service.get_history_page("s1", limit=3, before=prev_cursor)
+        first, none_left, _ = await agent_service.get_history_page("s1", limit=3, before=oldest_cursor)
+        newer, _, unchanged = await agent_service.get_history_page("s1", limit=3, after=next_cursor)
+
+        assert etag == '"m6"'
+        assert [m.content for m in latest] == ["Message 4", "Message 5", "Message 6"]
+        assert [m.content for m in older] == ["Message 1", "Message 2", "Message 3"]
+        assert [m.content for m in first] == ["Message 0"]
+        assert none_left is None
+        # Nothing new yet: the cursor is handed back for the next poll
+        assert newer == [] and unchanged == next_cursor
+
+        db = TestSession()
+        db.add(Message(id="m7", session_id="s1", role="user", content="Message 7", timestamp=base + timedelta(minutes=7)))
+        db.commit()
+        db.close()
+        newer, _, _ = await agent_service.get_history_page("s1", limit=3, after=next_cursor)
+        assert [m.content for m in newer] == ["Message 7"]
+        everything, no_older, _ = await agent_service.get_history_page("s1")
+        assert len(everything) == 8 and no_older is None
+        assert await agent_service.history_etag("s1") == '"m7"'
+
+        with pytest.raises(ValueError, match="Session not found"):
+            await agent_service.history_etag("missing")
+
+@pytest.mark.asyncio
+async def test_batch_fetches_each_dataset_once(agent_service, test_store):
+    import respx
+    from httpx import Response
+    from app.services.agent_service import get_message_writer
+    session_id = await agent_service.create_session("https://test.com")
+    await get_message_writer().add_message(session_id, "user", "An earlier question about refunds")
+    refetch = (
+        'Thought: Fetch orders.\nAction: get_shopify_data\n'
+        'Action Input: {"resource": "orders", "limit": 250, "filters": '
+        '{"created_at_min": "2025-11-01T00:00:00Z", "created_at_max": "2025-11-30T23:59:59Z"}}'
+    )
+
+    async def answer(messages, stop=None):
+        prompt = messages[0].content
+        # The format instructions mention "Observation:" once
+        observations = prompt.count("Observation:") - 1
+        if "New input: What is the AOV last month?" in prompt and not observations:
+            return AIMessage(content=refetch)
+        return AIMessage(content=f"Final Answer: done ({observations} observations)")
+
+    agent_service.llm.ainvoke.side_effect = answer
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07", assert_all_called=False) as shopify:
+        orders = shopify.get("/orders.json").mock(return_value=Response(200, json={"orders": [{"id": 1, "total_price": "10.00"}]}))
+        products = shopify.get("/products.json").mock(return_value=Response(200, json={"products": [{"id": 5, "title": "Hat"}]}))
+        answers, data_plan = await agent_service.chat_batch(session_id, ["What is the AOV last month?", "Top products last month"])
+
+    # The second question also reads orders, and the first one re-requests them: one fetch each
+    assert orders.call_count == 1
+    assert products.call_count == 1
+    assert [a.message for a in answers] == ["done (1 observations)", "done (0 observations)"]
+    assert data_plan.startswith("Fetched once for 2 questions: orders (2025-11-01 to 2025-11-30), products")
+    prompts = [call.args[0][0].content for call in agent_service.llm.ainvoke.call_args_list]
+    assert all("PRELOADED DATA" in prompt and "'orders_data'" in prompt for prompt in prompts)
+    assert any("'products_data'" in prompt and "join_index" in prompt for prompt in prompts)
+    # Batch questions are answered on their own and leave the conversation as it was
+    assert not any("earlier question" in prompt or "Human:" in prompt for prompt in prompts)
+    history = await agent_service.get_history(session_id)
+    assert [m.content for m in history] == ["An earlier question about refunds"]
+    with pytest.raises(ValueError, match="Session not found"):
+        await agent_service.chat_batch("missing", ["Revenue?"])
@@ -0,0 +1,29 @@
+from datetime import date
+from app.services.batch_planner import plan_batch
+
+REFERENCE = date(2025, 12, 21)
+
+def test_each_resource_is_requested_once():
+    plan = plan_batch([
+        "What is the AOV last month?",
+        "Top products last month",
+        "How many repeat customers did we have last month?",
+        "Revenue by city last month",
+    ], REFERENCE)
+
+    assert [r.resource for r in plan.requests] == ["orders", "products", "customers"]
+    assert plan.resources == [["orders"], ["orders", "products"], ["customers"], ["orders"]]
+    assert plan.requests[0].filters == {"created_at_min": "2025-11-01T00:00:00Z", "created_at_max": "2025-11-30T23:59:59Z"}
+    assert "orders (2025-11-01 to 2025-11-30)" in plan.describe()
+
+def test_orders_window_is_the_union_of_the_questions():
+    plan = plan_batch(["Revenue last 7 days", "Orders in November"], REFERENCE)
+    assert plan.requests[0].filters == {"created_at_min": "2025-11-01T00:00:00Z", "created_at_max": "2025-12-21T23:59:59Z"}
+
+    # A question without dates needs all orders
+    plan = plan_batch(["Revenue last 7 days", "What is our best-selling product?"], REFERENCE)
+    assert plan.requests[0].filters is None
+
+def test_question_without_keywords_reads_orders():
+    plan = plan_batch(["How are we doing?"], REFERENCE)
+    assert plan.resources == [["orders"]]
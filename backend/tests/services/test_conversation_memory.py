@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.db.init_db import create_schema
+from app.models.database_models import Message, Session
+from app.services.conversation_memory import HISTORY_WINDOW, SUMMARY_MAX_CHARS, fold_into_summary, load_conversation_context
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    create_schema(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def add_turns(db, session, count, start=0):
+    base = datetime(2025, 1, 1)
+    for i in range(start, start + count):
+        db.add(Message(session_id=session.id, role="user", content=f"Question {i}?", timestamp=base + timedelta(minutes=2 * i)))
+        db.add(Message(session_id=session.id, role="assistant", content=f"Answer {i}. Details follow.", timestamp=base + timedelta(minutes=2 * i + 1)))
+    db.commit()
+
+def test_short_session_has_no_summary(db):
+    session = Session(id="s1", store_url="https://a.com")
+    db.add(session)
+    add_turns(db, session, 2)
+
+    summary, recent = load_conversation_context(db, session)
+
+    assert summary is None
+    assert [m.content for m in recent] == ["Question 0?", "Answer 0. Details follow.", "Question 1?", "Answer 1. Details follow."]
+
+def test_older_turns_are_folded_incrementally(db):
+    session = Session(id="s1", store_url="https://a.com")
+    db.add(session)
+    add_turns(db, session, 5)
+
+    summary, recent = load_conversation_context(db, session)
+    assert len(recent) == HISTORY_WINDOW
+    assert recent[-1].content.startswith("Answer 4")
+    # 10 messages, 5 in the window: the older 5 are summarized, answers by their first sentence
+    assert summary.splitlines() == ["- User: Question 0?", "- AI: Answer 0", "- User: Question 1?", "- AI: Answer 1", "- User: Question 2?"]
+
+    # The next turn only folds the messages that slid out of the window
+    add_turns(db, session, 1, start=5)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    summary, recent = load_conversation_context(db, session)
+
+    assert summary.splitlines()[-2:] == ["- AI: Answer 2", "- User: Question 3?"]
+    assert len(summary.splitlines()) == 7
+    assert any("FROM messages" in sql for sql in statements)
+    assert all("LIMIT" in sql for sql in statements if "FROM messages" in sql)
+
+def test_summary_is_bounded():
+    lines = [Message(role="user", content="x" * 500) for _ in range(50)]
+    summary = fold_into_summary(None, lines)
+
+    assert len(summary) <= SUMMARY_MAX_CHARS
+    assert summary.endswith("...")
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+from app.services.fetch_cache import SharedFetchCache
+
+@pytest.mark.asyncio
+async def test_identical_reads_share_one_fetch():
+    cache = SharedFetchCache()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return [{"id": 1}]
+
+    key = SharedFetchCache.key("list", "orders", {"limit": 250, "status": "any"})
+    same = SharedFetchCache.key("list", "orders", {"status": "any", "limit": 250})
+    results = await asyncio.gather(*[cache.get(k, load) for k in (key, same, key)])
+
+    assert len(loads) == 1
+    assert results[0] is results[1] is results[2]
+    assert await cache.get(key, load) is results[0]
+    assert cache.fetches == 1
+
+@pytest.mark.asyncio
+async def test_failed_read_is_retried():
+    cache = SharedFetchCache()
+    key = SharedFetchCache.key("count", "orders", {})
+
+    async def fail():
+        raise RuntimeError("502")
+
+    async def succeed():
+        return 7
+
+    with pytest.raises(RuntimeError):
+        await cache.get(key, fail)
+    assert await cache.get(key, succeed) == 7
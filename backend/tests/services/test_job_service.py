@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.init_db import create_schema
+from app.models.agent import AgentResponse
+from app.models.database_models import Session
+from app.services.job_service import INTERRUPTED, JobRunner
+
+@pytest.fixture
+def factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    create_schema(engine)
+    TestSession = sessionmaker(bind=engine)
+    db = TestSession()
+    db.add(Session(id="s1", store_url="https://a.com"))
+    db.commit()
+    db.close()
+    return TestSession
+
+async def wait_finished(runner, job_id):
+    for _ in range(200):
+        job = runner.get(job_id)
+        if job.status in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+@pytest.mark.asyncio
+async def test_jobs_run_with_bounded_concurrency(factory):
+    running, peak = 0, 0
+
+    async def chat(session_id, message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return AgentResponse(session_id=session_id, message=f"Answer to {message}")
+
+    runner = JobRunner(chat, factory, concurrency=2)
+    await runner.start()
+    submitted = [await runner.submit("s1", f"Question {i}") for i in range(5)]
+    assert all(job.status == "queued" for job in submitted)
+
+    finished = [await wait_finished(runner, job.job_id) for job in submitted]
+    await runner.stop()
+
+    assert peak == 2
+    assert [job.status for job in finished] == ["succeeded"] * 5
+    assert finished[3].result.message == "Answer to Question 3"
+    assert finished[3].started_at <= finished[3].finished_at
+
+@pytest.mark.asyncio
+async def test_failed_job_keeps_its_error(factory):
+    async def chat(session_id, message):
+        raise RuntimeError("LLM unavailable")
+
+    runner = JobRunner(chat, factory)
+    await runner.start()
+    job = await wait_finished(runner, (await runner.submit("s1", "Revenue?")).job_id)
+    await runner.stop()
+
+    assert job.status == "failed"
+    assert job.error == "LLM unavailable"
+    assert job.result is None
+
+@pytest.mark.asyncio
+async def test_submit_validation_and_shutdown(factory):
+    release = asyncio.Event()
+
+    async def chat(session_id, message):
+        await release.wait()
+        return AgentResponse(session_id=session_id, message="done")
+
+    runner = JobRunner(chat, factory, concurrency=1, max_queue=1)
+    with pytest.raises(RuntimeError):
+        await runner.submit("s1", "Too early")
+    await runner.start()
+    with pytest.raises(ValueError, match="Session not found"):
+        await runner.submit("missing", "Hi")
+
+    running = await runner.submit("s1", "First")
+    await asyncio.sleep(0.01)
+    waiting = await runner.submit("s1", "Second")
+    with pytest.raises(ValueError, match="Too many"):
+        await runner.submit("s1", "Third")
+
+    # Shutdown interrupts the running job and fails the waiting one
+    await runner.stop()
+    assert runner.get(running.job_id).error == INTERRUPTED
+    assert runner.get(waiting.job_id).status == "failed"
+    assert runner.get("unknown") is None
@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.init_db import create_schema
+from app.models.database_models import Message, Session
+from app.services.conversation_memory import load_conversation_context
+from app.services.message_writer import MessageWriter
+
+@pytest.fixture
+def factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    create_schema(engine)
+    TestSession = sessionmaker(bind=engine)
+    db = TestSession()
+    for i in range(3):
+        db.add(Session(id=f"s{i}", store_url="https://a.com", last_active=datetime(2025, 1, 1)))
+    db.commit()
+    db.close()
+    return TestSession
+
+def committed(factory, session_id):
+    db = factory()
+    try:
+        return [m.content for m in db.query(Message).filter(Message.session_id == session_id).order_by(Message.timestamp)]
+    finally:
+        db.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_messages_commit_in_one_transaction(factory):
+    writer = MessageWriter(factory, max_delay=0.01)
+    commits = []
+    event.listen(factory.kw["bind"], "commit", lambda conn: commits.append(conn))
+    await writer.start()
+
+    base = datetime(2025, 2, 1)
+    await asyncio.gather(*[
+        writer.add_message(f"s{i % 3}", "user", f"Question {i}", timestamp=base + timedelta(seconds=i), preview=f"Question {i}")
+        for i in range(9)
+    ])
+    await writer.flush()
+
+    assert writer.batches == 1
+    assert len(commits) == 1
+    assert committed(factory, "s1") == ["Question 1", "Question 4", "Question 7"]
+    db = factory()
+    session = db.query(Session).filter(Session.id == "s1").one()
+    # last_active follows the newest message; the preview is the first question
+    assert session.last_active == base + timedelta(seconds=7)
+    assert session.preview == "Question 1"
+    db.close()
+    await writer.stop()
+
+@pytest.mark.asyncio
+async def test_queued_messages_are_readable_before_commit(factory):
+    writer = MessageWriter(factory, max_delay=60)
+    await writer.start()
+    await writer.add_message("s0", "user", "How many orders?")
+    await writer.add_message("s0", "assistant", "42 orders.")
+
+    # Not committed yet, but visible to the same session's reads
+    assert committed(factory, "s0") == []
+    assert [m.content for m in writer.pending_messages("s0")] == ["How many orders?", "42 orders."]
+    assert writer.pending_messages("s1") == []
+    db = factory()
+    session = db.query(Session).filter(Session.id == "s0").one()
+    _, recent = load_conversation_context(db, session, writer.pending_messages("s0"))
+    assert [m.content for m in recent] == ["How many orders?", "42 orders."]
+    db.close()
+
+    # Shutdown flushes the queue
+    await writer.stop()
+    assert committed(factory, "s0") == ["How many orders?", "42 orders."]
+    assert writer.pending_messages("s0") == []
+
+@pytest.mark.asyncio
+async def test_bounded_queue_applies_backpressure(factory):
+    writer = MessageWriter(factory, max_queue=2, max_batch=2, max_delay=0)
+    await writer.start()
+
+    await asyncio.gather(*[writer.add_message("s2", "user", f"Message {i}") for i in range(10)])
+    await writer.stop()
+
+    assert len(committed(factory, "s2")) == 10
+    assert writer.batches >= 5
+
+@pytest.mark.asyncio
+async def test_writes_through_when_not_started(factory):
+    writer = MessageWriter(factory)
+
+    await writer.add_message("s0", "user", "Hello", preview="Hello")
+
+    assert committed(factory, "s0") == ["Hello"]
+    assert writer.pending_messages("s0") == []
+
+@pytest.mark.asyncio
+async def test_messages_committed_but_still_pending_are_read_once(factory):
+    writer = MessageWriter(factory, max_delay=60)
+    await writer.start()
+    await writer.add_message("s0", "user", "How many orders?")
+    # The batch has committed but the writer has not cleared it from pending yet
+    writer._write([("s0", writer._pending["s0"][0], None, None)])
+
+    db = factory()
+    session = db.query(Session).filter(Session.id == "s0").one()
+    _, recent = load_conversation_context(db, session, writer.pending_messages("s0"))
+    db.close()
+
+    assert committed(factory, "s0") == ["How many orders?"]
+    assert [m.content for m in recent] == ["How many orders?"]
+    writer._task.cancel()
+
+class FlakyFactory:
+    """Session factory whose first `failures` sessions cannot be opened (e.g. a locked database)."""
+
+    def __init__(self, factory, failures):
+        self.factory = factory
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        return self.factory()
+
+@pytest.mark.asyncio
+async def test_failed_commits_are_retried_and_stay_readable(factory):
+    flaky = FlakyFactory(factory, failures=3)
+    writer = MessageWriter(flaky, max_delay=0, max_attempts=2, retry_delay=0.01)
+    await writer.start()
+
+    await writer.add_message("s0", "user", "How many orders?")
+    await writer.flush("s0")
+
+    # Both attempts of the first round failed; the next round committed the message
+    assert flaky.failures == 0
+    assert committed(factory, "s0") == ["How many orders?"]
+    assert writer.pending_messages("s0") == []
+    await writer.stop()
+
+@pytest.mark.asyncio
+async def test_stop_gives_up_on_messages_that_never_commit(factory):
+    writer = MessageWriter(FlakyFactory(factory, failures=100), max_delay=0, max_attempts=2, retry_delay=0.01)
+    await writer.start()
+    await writer.add_message("s0", "user", "How many orders?")
+    assert [m.content for m in writer.pending_messages("s0")] == ["How many orders?"]
+
+    await writer.stop()
+
+    assert writer.pending_messages("s0") == []
+    assert committed(factory, "s0") == []
@@ -0,0 +1,56 @@
+import pytest
+from app.services.query_planner import plan_query, PlannedResult
+
+@pytest.fixture
+def orders():
+    return [
+        {"id": 1, "total_price": "120.00", "billing_address": {"city": "Austin"},
+         "line_items": [{"title": "Leather Bag"}]},
+        {"id": 2, "total_price": "30.00", "billing_address": {"city": "austin"},
+         "line_items": [{"title": "Wool Hat"}]},
+        {"id": 3, "total_price": "80.00", "billing_address": None, "shipping_address": {"city": "Denver"},
+         "line_items": []},
+    ]
+
+def test_plan_splits_api_and_local_filters():
+    plan = plan_query("orders", {
+        "created_at_min": "2025-12-01T00:00:00Z",
+        "status": "any",
+        "city": "Austin",
+        "min_total_price": 50,
+        "favourite_colour": "blue"
+    })
+
+    assert plan.api_params == {"created_at_min": "2025-12-01T00:00:00Z", "status": "any"}
+    assert plan.local_filters == {"city": "Austin", "min_total_price": 50}
+    assert plan.ignored == ["favourite_colour"]
+
+def test_plan_applies_local_filters(orders):
+    plan = plan_query("orders", {"city": "AUSTIN", "min_total_price": "50"})
+    assert [o["id"] for o in plan.apply(orders)] == [1]
+
+    plan = plan_query("orders", {"product_title": "hat"})
+    assert [o["id"] for o in plan.apply(orders)] == [2]
+
+    # Falls back to the shipping address when billing is missing
+    plan = plan_query("orders", {"city": "Denver"})
+    assert [o["id"] for o in plan.apply(orders)] == [3]
+
+def test_plan_without_local_filters_is_passthrough(orders):
+    plan = plan_query("orders", {"status": "any"})
+    assert plan.apply(orders) is orders
+
+def test_fields_projection_dropped_when_filtering_locally():
+    plan = plan_query("orders", {"fields": "id,total_price", "city": "Austin"})
+    assert "fields" not in plan.api_params
+
+def test_describe_and_planned_result(orders):
+    plan = plan_query("orders", {"status": "any", "city": "Austin", "foo": 1})
+    description = plan.describe()
+    assert "API filters [status=any]" in description
+    assert "local filters [city=Austin]" in description
+    assert "ignored unsupported filters [foo]" in description
+
+    result = PlannedResult(plan.apply(orders), plan)
+    assert len(result) == 2
+    assert result.plan is plan
@@ -0,0 +1,64 @@
+import ast
+import pandas as pd
+from app.services.repl_cache import ReplResultCache, _estimated_bytes, dataset_version, detach, mutated_names, writes_in_place
+
+def key(code, scope, versions):
+    return ReplResultCache.key(ast.parse(code), scope, versions)
+
+def test_key_ignores_formatting_and_tracks_dataset_versions():
+    scope = {"orders_data": [], "pd": pd}
+    versions = {"orders_data": "v1"}
+
+    first = key("df = pd.DataFrame(orders_data)  # build\ndf.shape", scope, versions)
+    assert first == key("df=pd.DataFrame( orders_data )\ndf.shape", scope, versions)
+    assert first != key("df = pd.DataFrame(orders_data)\ndf.shape", scope, {"orders_data": "v2"})
+
+def test_unreproducible_code_has_no_key():
+    scope = {"orders_data": [], "df": pd.DataFrame()}
+    # Reads a variable of unknown provenance
+    assert key("df.shape", scope, {"orders_data": "v1"}) is None
+    assert key("datetime.now()", scope, {}) is None
+    assert key("df.sample(3)", scope, {"df": "v1"}) is None
+
+def test_mutated_names():
+    tree = ast.parse("df['x'] = 1\nitems.append(2)\nother.drop(columns=['a'], inplace=True)\ntotal += 1\nnew = df")
+    assert mutated_names(tree) == {"df", "items", "other", "total"}
+    assert mutated_names(ast.parse("df.drop(columns=['a'], inplace=False)")) == set()
+    assert writes_in_place(ast.parse("for o in orders_data:\n    o['x'] = 0"))
+    assert writes_in_place(ast.parse("rows()[0].update(x=1)"))
+    assert not writes_in_place(ast.parse("total = sum(o['x'] for o in orders_data)"))
+
+def test_dataset_version_follows_updated_at():
+    base = [{"id": 1, "updated_at": "2025-01-01T00:00:00Z"}]
+    assert dataset_version(base) == dataset_version([dict(base[0], total_price="9.00")])
+    assert dataset_version(base) != dataset_version([{"id": 1, "updated_at": "2025-01-02T00:00:00Z"}])
+    assert dataset_version(base) != dataset_version(base * 2)
+
+def test_detach_isolates_in_place_edits():
+    frame = pd.DataFrame({"a": [1, 2]})
+    copy = detach(frame)
+    copy.loc[0, "a"] = 99
+    assert frame.loc[0, "a"] == 1
+    records = [{"total_price": "10.00"}]
+    detach(records)[0]["total_price"] = "0.00"
+    assert records[0]["total_price"] == "10.00"
+
+def test_estimated_bytes_counts_contents():
+    records = [{"note": "x" * 10_000} for _ in range(10)]
+    assert _estimated_bytes(records) > 100_000
+    assert _estimated_bytes(pd.DataFrame(records)) > 100_000
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ReplResultCache(max_entries=2, max_bytes=10_000)
+    cache.put("a", "1", {})
+    cache.put("b", "2", {})
+    cache.get("a")
+    cache.put("c", "3", {})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ("1", {})
+    # Larger than the whole budget: never stored
+    cache.put("big", "x" * 20_000, {})
+    assert cache.get("big") is None
+    assert len(cache) == 2
+    assert cache.total_bytes <= 10_000
@@ -0,0 +1,41 @@
+import pytest
+from app.services.source_selector import (
+    COUNT_ENDPOINT, CUSTOMER_AGGREGATES, ORDERS_SCAN, ROLLUPS, counts_needed, pages, plan_source
+)
+
+def test_pages():
+    assert pages(0) == 1
+    assert pages(250) == 1
+    assert pages(251) == 2
+
+def test_rollups_win_for_free():
+    plan = plan_source("repeat_customers", all_time=True, rollups_ready=True)
+
+    assert plan.chosen.source == ROLLUPS
+    assert plan.chosen.requests == 0
+    assert counts_needed("repeat_customers", True, rollups_ready=True) == set()
+
+def test_customer_aggregates_beat_scanning_orders():
+    assert counts_needed("top_customers", True, rollups_ready=False) == {"orders", "customers"}
+    plan = plan_source("top_customers", all_time=True, rollups_ready=False, order_count=100_000, customer_count=2_000)
+
+    assert plan.chosen.source == CUSTOMER_AGGREGATES
+    assert plan.chosen.requests == 8
+    assert "orders scan ~400 requests" in plan.describe()
+    assert plan.describe().startswith("Source: customer aggregates")
+
+def test_windowed_customer_question_scans_orders():
+    assert counts_needed("repeat_customers", False, rollups_ready=False) == {"orders"}
+    plan = plan_source("repeat_customers", all_time=False, rollups_ready=False, order_count=600)
+
+    assert plan.chosen.source == ORDERS_SCAN
+    assert plan.chosen.requests == 3
+    assert "lifetime totals" in plan.describe()
+
+def test_order_count_uses_count_endpoint():
+    assert counts_needed("order_count", True, rollups_ready=False) == set()
+    assert plan_source("order_count", all_time=False, rollups_ready=False).chosen.source == COUNT_ENDPOINT
+
+def test_unknown_metric():
+    with pytest.raises(ValueError, match="Unknown metric"):
+        plan_source("ltv", all_time=True, rollups_ready=True)
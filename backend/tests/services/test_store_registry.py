@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+import respx
+from httpx import Response
+from unittest.mock import patch
+from app.services.shopify_client import ShopifyClient
+from app.services.store_registry import StoreRegistry, store_domain
+from app.tools.shopify_tool import GetShopifyDataTool
+
+STORES = {"https://alpha.myshopify.com": "alpha-token", "beta.myshopify.com": "beta-token"}
+
+def make_registry(**kwargs):
+    return StoreRegistry(stores=kwargs.pop("stores", STORES), default_store="main.myshopify.com",
+                         default_token="main-token", api_version="2025-07", **kwargs)
+
+def test_store_domain_normalizes_urls():
+    assert store_domain("https://Alpha.myshopify.com/admin/orders") == "alpha.myshopify.com"
+    assert store_domain("alpha.myshopify.com") == "alpha.myshopify.com"
+
+def test_single_store_deployment_serves_every_session_from_the_default_store():
+    registry = make_registry(stores={})
+
+    credentials = registry.credentials("https://anything.com")
+
+    assert credentials.domain == "main.myshopify.com"
+    assert credentials.access_token == "main-token"
+
+def test_configured_stores_resolve_to_their_own_credentials():
+    registry = make_registry()
+
+    assert registry.credentials("https://beta.myshopify.com/").access_token == "beta-token"
+    assert registry.credentials("https://main.myshopify.com").access_token == "main-token"
+    with pytest.raises(ValueError, match="not configured"):
+        registry.credentials("https://gamma.myshopify.com")
+
+@pytest.mark.asyncio
+async def test_each_store_gets_its_own_pooled_client_and_bucket():
+    registry = make_registry()
+
+    alpha = await registry.acquire("https://alpha.myshopify.com")
+    again = await registry.acquire("https://alpha.myshopify.com/admin")
+    beta = await registry.acquire("https://beta.myshopify.com")
+
+    assert again is alpha
+    assert alpha.leases == 2
+    assert beta.http is not alpha.http
+    assert beta.rate_limiter is not alpha.rate_limiter
+    assert (alpha.namespace, beta.namespace) == ("alpha.myshopify.com", "beta.myshopify.com")
+    assert not alpha.is_default
+    await registry.close()
+
+@pytest.mark.asyncio
+async def test_least_recently_used_idle_clients_are_closed():
+    registry = make_registry(max_clients=2)
+    main = await registry.acquire("https://main.myshopify.com")
+    alpha = await registry.acquire("https://alpha.myshopify.com")
+    registry.release(main)
+    registry.release(alpha)
+
+    beta = await registry.acquire("https://beta.myshopify.com")
+
+    assert "https://main.myshopify.com" not in registry
+    assert main.http.is_closed
+    assert len(registry) == 2 and not alpha.http.is_closed
+    # Leased clients stay open even past the limit
+    registry.max_clients = 1
+    await registry.acquire("https://main.myshopify.com")
+    assert "https://beta.myshopify.com" in registry and not beta.http.is_closed
+    assert alpha.http.is_closed
+    await registry.close()
+
+@pytest.mark.asyncio
+async def test_idle_clients_expire():
+    registry = make_registry(idle_seconds=0.01)
+    alpha = await registry.acquire("https://alpha.myshopify.com")
+    registry.release(alpha)
+    await asyncio.sleep(0.02)
+
+    await registry.acquire("https://beta.myshopify.com")
+
+    assert "https://alpha.myshopify.com" not in registry
+    assert alpha.http.is_closed
+    await registry.close()
+
+@pytest.mark.asyncio
+async def test_requests_use_the_session_store_and_keep_the_pool_open():
+    registry = make_registry()
+    beta = await registry.acquire("https://beta.myshopify.com")
+
+    async with respx.mock(base_url="https://beta.myshopify.com/admin/api/2025-07") as respx_mock:
+        route = respx_mock.get("/products.json").mock(return_value=Response(200, json={"products": [{"id": 1}]}))
+        result = await GetShopifyDataTool(store_client=beta)._arun(resource="products")
+        many = await GetShopifyDataTool(store_client=beta)._arun(
+            requests=[{"resource": "products"}, {"resource": "products", "name": "again"}]
+        )
+
+    assert result[0]["id"] == 1
+    assert len(many["again"]) == 1
+    assert route.calls[0].request.headers["X-Shopify-Access-Token"] == "beta-token"
+    # Closing a request's client leaves the store's pool to the registry
+    client = ShopifyClient(store_client=beta)
+    await client.close()
+    assert not beta.http.is_closed
+    assert client.rate_limiter is beta.rate_limiter
+    await registry.close()
+    assert beta.http.is_closed
+
+@pytest.mark.asyncio
+async def test_other_stores_do_not_see_the_default_store_local_data():
+    from app.services.agent_service import AgentService
+
+    registry = make_registry()
+    alpha = await registry.acquire("https://alpha.myshopify.com")
+    with patch("app.services.agent_service.ChatGroq"):
+        service = AgentService()
+    with patch("app.services.agent_service.get_local_store") as local_store:
+        tools = {tool.name: tool for tool in service._create_tools_for_request({}, store_client=alpha)}
+
+    local_store.assert_not_called()
+    assert set(tools) == {"get_shopify_data", "python_repl_ast", "get_store_metric"}
+    assert not tools["get_store_metric"].store.is_ready
+    assert tools["get_store_metric"].store_client is alpha
+    assert tools["get_shopify_data"].store_client is alpha
+    assert tools["python_repl_ast"].namespace == "alpha.myshopify.com"
+    await registry.close()
@@ -0,0 +1,57 @@
+import pytest
+from datetime import datetime, timezone
+import respx
+from httpx import Response
+from app.analytics.store import LocalOrderStore
+from app.services.sync_service import OrderSyncService
+from app.core.config import settings
+
+settings.SHOPIFY_STORE_URL = "test-store.myshopify.com"
+settings.SHOPIFY_ACCESS_TOKEN = "test-token"
+settings.SHOPIFY_API_VERSION = "2025-07"
+
+ORDER = {
+    "id": 1, "created_at": "2025-12-01T10:00:00Z", "updated_at": "2025-12-01T10:00:00Z",
+    "total_price": "100.00", "billing_address": {"city": "New York"},
+    "line_items": [{"title": "Product A", "quantity": 1, "price": "100.00"}]
+}
+
+@pytest.mark.asyncio
+async def test_sync_is_incremental():
+    store = LocalOrderStore()
+    service = OrderSyncService(store=store)
+
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        first = respx_mock.get("/orders.json", params={"order": "updated_at asc", "status": "any"}).mock(
+            return_value=Response(200, json={"orders": [ORDER]})
+        )
+        result = await service.sync()
+
+        assert first.called
+        assert "updated_at_min" not in first.calls.last.request.url.params
+        assert result == {"fetched": 1, "applied": 1, "orders_in_store": 1}
+        assert store.updated_at_watermark == "2025-12-01T10:00:00Z"
+
+        updated = dict(ORDER, total_price="80.00", updated_at="2025-12-02T09:00:00Z")
+        first.mock(return_value=Response(200, json={"orders": [updated]}))
+        await service.sync()
+
+        assert first.calls.last.request.url.params["updated_at_min"] == "2025-12-01T10:00:00Z"
+        assert len(store.rollups) == 1
+        assert store.updated_at_watermark == "2025-12-02T09:00:00Z"
+
+@pytest.mark.asyncio
+async def test_sync_cut_short_by_the_page_cap_covers_only_what_it_fetched():
+    store = LocalOrderStore()
+    service = OrderSyncService(store=store, max_pages=1)
+    page = [dict(ORDER, id=i, updated_at=f"2025-12-01T10:{i // 60:02d}:{i % 60:02d}Z") for i in range(250)]
+
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        route = respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": page}))
+        await service.sync()
+        assert store.synced_through.isoformat() == "2025-12-01T10:04:09+00:00"
+
+        route.mock(return_value=Response(200, json={"orders": page[-1:]}))
+        await service.sync()
+        # Everything arrived: covered up to when the run started
+        assert store.synced_through > datetime(2026, 1, 1, tzinfo=timezone.utc)
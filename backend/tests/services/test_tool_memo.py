@@ -0,0 +1,45 @@
+from app.services.tool_memo import ToolCallMemo, fetch_failed, repl_state_changed
+
+def test_canonical_input_ignores_formatting():
+    memo = ToolCallMemo()
+    assert memo.key("get_shopify_data", {"resource": "orders", "limit": 250}) == \
+        memo.key("get_shopify_data", {"limit": 250, "resource": "orders"})
+    assert memo.key("python_repl_ast", "x = 1\nprint(x)  # show") == \
+        memo.key("python_repl_ast", "x=1\n\nprint( x )")
+    assert memo.key("python_repl_ast", "print(1)") != memo.key("python_repl_ast", "print(2)")
+
+def test_store_get_and_invalidate():
+    memo = ToolCallMemo()
+    repl_key = memo.key("python_repl_ast", "print(len(orders_data))")
+    data_key = memo.key("get_shopify_data", {"resource": "orders"})
+    memo.store(repl_key, "15")
+    memo.store(data_key, "Successfully fetched 15 orders records.")
+
+    memo.invalidate("python_repl_ast")
+
+    assert memo.get(repl_key) is None
+    assert memo.get(data_key) == "Successfully fetched 15 orders records."
+
+def test_loop_detection():
+    memo = ToolCallMemo(max_repeats=2)
+    key = memo.key("python_repl_ast", "print(1)")
+    assert memo.record_call(key) == 1
+    assert not memo.is_looping(key)
+    memo.record_call(key)
+    assert memo.is_looping(key)
+
+def test_repl_state_changed():
+    total = 5
+    assert not repl_state_changed("print(total)", {"total": total}, {"total": total})
+    assert repl_state_changed("total = total * 2", {"total": total}, {"total": 10})
+    assert repl_state_changed("x = 1", {}, {"x": 1})
+    # In-place edits keep the same object but change what it prints
+    items = []
+    assert repl_state_changed("items.append(1)", {"items": items}, {"items": items})
+
+def test_fetch_failed():
+    assert not fetch_failed([{"id": 1}])
+    assert not fetch_failed(3)
+    assert not fetch_failed({"orders_q1": [], "orders_q2": [{"id": 1}]})
+    assert fetch_failed("Shopify Error: 429 Too Many Requests")
+    assert fetch_failed({"orders_q1": [], "orders_q2": "Unexpected Error: timeout"})
@@ -9,3 +9,29 @@ def test_health_check():
     data = response.json()
     assert data["status"] == "healthy"
     assert "app_env" in data
+
+def test_message_writer_runs_for_app_lifetime(tmp_path):
+    from unittest.mock import patch
+    from app.db.database import build_engine
+    from app.db.init_db import create_schema
+    from app.services.message_writer import get_message_writer
+    # Migrate a throwaway database, not ./chat_history.db
+    engine = build_engine(f"sqlite:///{tmp_path / 'chat_history.db'}")
+    with patch("app.main.create_schema", lambda: create_schema(engine)), TestClient(app) as running:
+        assert running.get("/health").status_code == 200
+        assert get_message_writer().is_running
+    assert not get_message_writer().is_running
+
+def test_import_is_lazy():
+    import os
+    import subprocess
+    import sys
+    probe = (
+        "import sys, app.main\n"
+        "from app.db import database\n"
+        "from app.api import routes\n"
+        "assert database._engine is None and routes._agent_service is None\n"
+        "assert not {'langchain_groq', 'langchain_experimental', 'pandas', 'alembic'} & set(sys.modules)\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", probe], cwd=backend, check=True)
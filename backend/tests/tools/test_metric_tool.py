@@ -0,0 +1,92 @@
+import pytest
+import respx
+from datetime import datetime, time, timedelta, timezone
+from httpx import Response
+from app.analytics.rollups import order_day
+from app.analytics.store import LocalOrderStore
+from app.core.config import settings
+from app.tools.metric_tool import GetStoreMetricTool
+
+settings.SHOPIFY_STORE_URL = "test-store.myshopify.com"
+settings.SHOPIFY_ACCESS_TOKEN = "test-token"
+settings.SHOPIFY_API_VERSION = "2025-07"
+
+BASE_URL = "https://test-store.myshopify.com/admin/api/2025-07"
+
+@pytest.mark.asyncio
+async def test_synced_store_answers_from_rollups(sample_orders_data):
+    store = LocalOrderStore()
+    store.apply_orders(sample_orders_data)
+    tool = GetStoreMetricTool(store=store)
+
+    # No HTTP mock: any request would fail the test
+    with respx.mock(base_url=BASE_URL, assert_all_called=False):
+        result = await tool._arun(metric="repeat_customers")
+
+    assert "Found **1** repeat customers (50.0%" in result
+    assert "Source: local rollups (~0 API requests, orders synced through " in result
+
+@pytest.mark.asyncio
+async def test_all_time_customer_question_uses_customer_aggregates():
+    tool = GetStoreMetricTool(store=LocalOrderStore())
+    async with respx.mock(base_url=BASE_URL, assert_all_called=False) as respx_mock:
+        respx_mock.get("/orders/count.json").mock(return_value=Response(200, json={"count": 5000}))
+        respx_mock.get("/customers/count.json").mock(return_value=Response(200, json={"count": 3}))
+        customers = respx_mock.get("/customers.json").mock(return_value=Response(200, json={"customers": [
+            {"id": 1, "orders_count": 3, "total_spent": "90.10"},
+            {"id": 2, "orders_count": 1, "total_spent": "500.00"},
+            {"id": 3, "orders_count": 0, "total_spent": "0.00"},
+        ]}))
+        orders = respx_mock.get("/orders.json")
+
+        result = await tool._arun(metric="top_customers", limit=2)
+
+    assert customers.called and not orders.called
+    assert "| 2 | 1 | $500.00 |" in result
+    assert "| 1 | 3 | $90.10 |" in result
+    assert "Source: customer aggregates" in result
+    assert "orders scan ~20 requests" in result
+
+@pytest.mark.asyncio
+async def test_windowed_question_scans_orders_and_counts_use_endpoint(sample_orders_data):
+    tool = GetStoreMetricTool(store=LocalOrderStore())
+    async with respx.mock(base_url=BASE_URL) as respx_mock:
+        respx_mock.get("/orders/count.json", params={"status": "cancelled"}).mock(return_value=Response(200, json={"count": 1}))
+        respx_mock.get("/orders/count.json").mock(return_value=Response(200, json={"count": 3}))
+        respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": sample_orders_data}))
+
+        revenue = await tool._arun(metric="revenue", start_date="2000-01-01", end_date="2100-01-01")
+        count = await tool._arun(metric="order_count", start_date="2000-01-01", end_date="2100-01-01")
+
+    assert revenue.startswith("Revenue: **$350.00** (from 3 orders)")
+    assert "Source: orders scan (~1 API requests)" in revenue
+    assert count.startswith("Orders: **2**")
+    assert "Source: orders count endpoint" in count
+
+@pytest.mark.asyncio
+async def test_input_errors():
+    tool = GetStoreMetricTool(store=LocalOrderStore())
+    assert "Unknown metric" in await tool._arun(metric="ltv")
+    assert "both start_date and end_date" in await tool._arun(metric="revenue", start_date="2025-01-01")
+
+@pytest.mark.asyncio
+async def test_windows_beyond_the_synced_range_use_the_api(sample_orders_data):
+    store = LocalOrderStore()
+    first_day, last_day = min(order_day(o["created_at"]) for o in sample_orders_data), max(order_day(o["created_at"]) for o in sample_orders_data)
+    synced_through = datetime.combine(last_day, time(12), tzinfo=timezone.utc)
+    store.apply_orders(sample_orders_data, synced_through=synced_through)
+    tool = GetStoreMetricTool(store=store)
+    through = f"orders synced through {synced_through:%Y-%m-%d %H:%M} UTC"
+
+    assert store.coverage_gap((first_day, last_day - timedelta(days=1))) is None
+    # The last day is only synced until noon, and nothing before the first order
+    assert store.coverage_gap((first_day, last_day)) == through
+    assert store.coverage_gap((first_day - timedelta(days=1), first_day)) == f"synced orders start on {first_day}"
+    async with respx.mock(base_url=BASE_URL) as respx_mock:
+        respx_mock.get("/orders/count.json").mock(return_value=Response(200, json={"count": 3}))
+        respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": sample_orders_data}))
+
+        revenue = await tool._arun(metric="revenue", start_date=first_day.isoformat(), end_date=last_day.isoformat())
+
+    assert "Source: orders scan (~1 API requests)" in revenue
+    assert f"local rollups unavailable ({through})" in revenue
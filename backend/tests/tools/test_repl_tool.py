@@ -0,0 +1,66 @@
+from unittest.mock import patch
+from langchain_experimental.tools import PythonAstREPLTool
+from app.services.repl_cache import ReplResultCache
+from app.tools.repl_tool import CachedPythonREPLTool
+
+GROUPBY = "import pandas as pd\ndf = pd.DataFrame(orders_data)\ndf.groupby('city')['total'].sum().to_dict()"
+
+def make_tool(cache, orders, version):
+    return CachedPythonREPLTool(locals={"orders_data": orders}, versions={"orders_data": version}, cache=cache)
+
+def test_repeated_analysis_over_same_data_is_served_from_cache():
+    cache = ReplResultCache()
+    orders = [{"city": "NY", "total": 2}, {"city": "LA", "total": 3}, {"city": "NY", "total": 1}]
+    first = make_tool(cache, orders, "v1")
+    assert first.run(GROUPBY) == {"NY": 3, "LA": 3}
+
+    # A later request over the same dataset version: no execution, and `df` is restored
+    first.run("len(df)")
+    second = make_tool(cache, list(orders), "v1")
+    with patch.object(PythonAstREPLTool, "_run", side_effect=AssertionError("executed")):
+        assert second.run("import pandas as pd\ndf = pd.DataFrame( orders_data )  # again\ndf.groupby('city')['total'].sum().to_dict()") == {"NY": 3, "LA": 3}
+        # Chained snippets over restored variables hit too
+        assert second.run("len(df)") == 3
+    assert second.locals["df"] is not first.locals["df"]
+    assert cache.hits == 2
+
+def test_new_data_version_reexecutes():
+    cache = ReplResultCache()
+    make_tool(cache, [{"city": "NY", "total": 1}], "v1").run(GROUPBY)
+
+    assert make_tool(cache, [{"city": "SF", "total": 5}], "v2").run(GROUPBY) == {"SF": 5}
+
+def test_in_place_edits_are_not_cached_and_drop_versions():
+    cache = ReplResultCache()
+    tool = make_tool(cache, [{"city": "NY", "total": 1}], "v1")
+    tool.run(GROUPBY)
+
+    tool.run("df['total'] = df['total'] * 10")
+    assert "df" not in tool.versions
+    assert tool.run("int(df['total'].sum())") == 10
+    assert len(cache) == 1
+
+def test_edits_through_aliases_and_loop_variables_drop_every_version():
+    total = "sum(o['total'] for o in orders_data)"
+    for edit in ["for o in orders_data:\n    o['total'] = 0", "first = orders_data[0]\nfirst['total'] = 0"]:
+        cache = ReplResultCache()
+        orders = [{"city": "NY", "total": 5}, {"city": "LA", "total": 10}]
+        make_tool(cache, [dict(o) for o in orders], "v1").run(total)
+        tool = make_tool(cache, orders, "v1")
+
+        tool.run(edit)
+
+        assert tool.versions == {}
+        # Recomputed over the edited data, not the result cached for "v1"
+        assert tool.run(total) == orders[1]["total"]
+        assert cache.hits == 0
+
+def test_stores_do_not_share_cached_results():
+    cache = ReplResultCache()
+    orders = [{"city": "NY", "total": 1}]
+    CachedPythonREPLTool(locals={"orders_data": orders}, versions={"orders_data": "v1"}, cache=cache, namespace="a").run(GROUPBY)
+
+    # Same code and same dataset version, but another store's namespace
+    other = CachedPythonREPLTool(locals={"orders_data": [{"city": "SF", "total": 5}]}, versions={"orders_data": "v1"}, cache=cache, namespace="b")
+    assert other.run(GROUPBY) == {"SF": 5}
+    assert cache.hits == 0
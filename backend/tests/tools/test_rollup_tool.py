@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime, timezone
+from app.analytics.rollups import order_day
+from app.analytics.store import LocalOrderStore
+from app.tools.rollup_tool import QueryStoreMetricsTool, EstimateStoreMetricsTool
+
+SYNCED_THROUGH = datetime(2100, 1, 2, tzinfo=timezone.utc)
+
+def synced_store(orders, synced_through=SYNCED_THROUGH):
+    store = LocalOrderStore()
+    store.apply_orders(orders, synced_through=synced_through)
+    return store
+
+def first_day(orders):
+    return min(order_day(o["created_at"]) for o in orders).isoformat()
+
+@pytest.fixture
+def rollup_tool(sample_orders_data):
+    return QueryStoreMetricsTool(store=synced_store(sample_orders_data))
+
+@pytest.mark.asyncio
+async def test_query_revenue_by_city(rollup_tool, sample_orders_data):
+    result = await rollup_tool._arun(measure="revenue_cents", group_by="city", start_date=first_day(sample_orders_data), end_date="2100-01-01")
+
+    assert "| City | Revenue |" in result
+    assert "| New York | $300.00 |" in result
+    assert "| Chicago | $50.00 |" in result
+
+@pytest.mark.asyncio
+async def test_query_errors_are_returned(rollup_tool, sample_orders_data):
+    assert "cannot be grouped" in await rollup_tool._arun(measure="orders", group_by="product", start_date=first_day(sample_orders_data), end_date="2100-01-01")
+    assert "YYYY-MM-DD" in await rollup_tool._arun(measure="orders", start_date="yesterday", end_date="2025-12-31")
+
+@pytest.mark.asyncio
+async def test_ranges_the_sync_does_not_cover_are_refused(sample_orders_data):
+    start = first_day(sample_orders_data)
+    store = synced_store(sample_orders_data, synced_through=datetime(2099, 12, 31, 12, tzinfo=timezone.utc))
+    query, estimate = QueryStoreMetricsTool(store=store), EstimateStoreMetricsTool(store=store)
+
+    # Before the first synced day, and past the end of the sync
+    assert f"synced orders start on {start}" in await query._arun(measure="orders", start_date="2000-01-01", end_date="2100-01-01")
+    late = await query._arun(measure="orders", start_date=start, end_date="2099-12-31")
+    assert late.startswith("Error: The synced orders do not cover")
+    assert "orders synced through 2099-12-31 12:00 UTC" in late
+    assert "get_shopify_data" in await estimate._arun(metric="distinct_customers", start_date=start, end_date="2099-12-31")
+    assert "| Orders |" in await query._arun(measure="orders", start_date=start, end_date="2099-12-30")
+
+@pytest.mark.asyncio
+async def test_estimate_tool_labels_estimates(sample_orders_data):
+    tool = EstimateStoreMetricsTool(store=synced_store(sample_orders_data))
+    start = first_day(sample_orders_data)
+
+    result = await tool._arun(metric="distinct_customers", start_date=start, end_date="2100-01-01")
+    assert result.startswith("Distinct customers: **~2**")
+    assert "estimate" in result
+    assert "Unknown metric" in await tool._arun(metric="ltv", start_date=start, end_date="2100-01-01")
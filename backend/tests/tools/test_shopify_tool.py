@@ -97,3 +97,121 @@ async def test_auth_error(shopify_tool):
         result = await shopify_tool._arun(resource="orders")
         assert "Shopify Error" in result
         assert "Authentication failed" in result
+
+@pytest.mark.asyncio
+async def test_default_filters_apply_to_orders_only():
+    tool = GetShopifyDataTool(default_filters={"created_at_min": "2025-12-14T00:00:00Z"})
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        route = respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": [{"id": 1}]}))
+        products_route = respx_mock.get("/products.json").mock(return_value=Response(200, json={"products": []}))
+
+        await tool._arun(resource="orders")
+        await tool._arun(resource="products")
+
+        assert route.calls[0].request.url.params["created_at_min"] == "2025-12-14T00:00:00Z"
+        assert "created_at_min" not in products_route.calls[0].request.url.params
+
+@pytest.mark.asyncio
+async def test_default_range_is_not_mixed_into_a_partial_one():
+    tool = GetShopifyDataTool(default_filters={"created_at_min": "2025-12-14T00:00:00Z", "created_at_max": "2025-12-20T23:59:59Z"})
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        route = respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": []}))
+
+        # A comparison period that only sets its start
+        await tool._arun(resource="orders", filters={"created_at_min": "2025-11-01T00:00:00Z"})
+        await tool._arun(resource="orders", filters={"financial_status": "paid"})
+
+        compared, default = (call.request.url.params for call in route.calls)
+        assert compared["created_at_min"] == "2025-11-01T00:00:00Z"
+        assert "created_at_max" not in compared
+        assert default["created_at_max"] == "2025-12-20T23:59:59Z"
+
+@pytest.mark.asyncio
+async def test_count_only_uses_count_endpoint(shopify_tool):
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07", assert_all_called=False) as respx_mock:
+        count_route = respx_mock.get("/orders/count.json").mock(return_value=Response(200, json={"count": 200000}))
+        list_route = respx_mock.get("/orders.json")
+
+        result = await shopify_tool._arun(
+            resource="orders",
+            filters={"created_at_min": "2025-12-14T00:00:00Z"},
+            count_only=True
+        )
+
+        assert result == 200000
+        assert not list_route.called
+        params = count_route.calls[0].request.url.params
+        assert params["created_at_min"] == "2025-12-14T00:00:00Z"
+        assert params["status"] == "any"
+        assert "limit" not in params
+
+@pytest.mark.asyncio
+async def test_multi_resource_fetch(shopify_tool):
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": [{"id": 1}, {"id": 2}]}))
+        respx_mock.get("/products.json").mock(return_value=Response(200, json={"products": [{"id": 9}]}))
+        respx_mock.get("/customers/count.json").mock(return_value=Response(200, json={"count": 3}))
+
+        result = await shopify_tool._arun(requests=[
+            {"resource": "orders"},
+            {"resource": "products"},
+            {"resource": "customers", "count_only": True},
+            {"resource": "invalid_resource"}
+        ])
+
+        assert [o["id"] for o in result["orders_data"]] == [1, 2]
+        assert result["products_data"] == [{"id": 9}]
+        assert result["customers_data"] == 3
+        assert "not supported" in result["invalid_resource_data"]
+
+@pytest.mark.asyncio
+async def test_local_filters_are_not_sent_to_shopify(shopify_tool):
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07", assert_all_called=False) as respx_mock:
+        route = respx_mock.get("/orders.json").mock(return_value=Response(200, json={"orders": [
+            {"id": 1, "billing_address": {"city": "Austin"}},
+            {"id": 2, "billing_address": {"city": "Denver"}}
+        ]}))
+        count_route = respx_mock.get("/orders/count.json")
+
+        result = await shopify_tool._arun(resource="orders", filters={"city": "Austin", "financial_status": "paid"})
+        count = await shopify_tool._arun(resource="orders", filters={"city": "Austin"}, count_only=True)
+
+        params = route.calls[0].request.url.params
+        assert "city" not in params
+        assert params["financial_status"] == "paid"
+        assert [o["id"] for o in result] == [1]
+        assert "local filters [city=Austin]" in result.plan.describe()
+        # Local predicates cannot use the count endpoint
+        assert count == 1
+        assert not count_route.called
+
+@pytest.mark.asyncio
+async def test_multi_resource_fetch_rejects_clashing_names(shopify_tool):
+    with respx.mock(assert_all_called=False) as respx_mock:
+        route = respx_mock.get(url__regex=r".*")
+
+        duplicate = await shopify_tool._arun(requests=[
+            {"resource": "orders", "filters": {"created_at_min": "2025-01-01"}},
+            {"resource": "orders", "filters": {"created_at_min": "2025-02-01"}}
+        ])
+        reserved = await shopify_tool._arun(requests=[{"resource": "orders", "name": "join_index"}])
+        invalid = await shopify_tool._arun(requests=[{"resource": "orders", "name": "import"}])
+
+        assert "Two requests would both be stored in 'orders_data'" in duplicate
+        assert "'join_index' cannot be used" in reserved
+        assert "'import' cannot be used" in invalid
+        assert not route.called
+
+@pytest.mark.asyncio
+async def test_same_resource_with_distinct_names(shopify_tool):
+    async with respx.mock(base_url="https://test-store.myshopify.com/admin/api/2025-07") as respx_mock:
+        respx_mock.get("/orders.json", params={"created_at_min": "2025-01-01"}).mock(return_value=Response(200, json={"orders": [{"id": 1}]}))
+        respx_mock.get("/orders.json", params={"created_at_min": "2025-02-01"}).mock(return_value=Response(200, json={"orders": [{"id": 2}]}))
+
+        result = await shopify_tool._arun(requests=[
+            {"resource": "orders", "filters": {"created_at_min": "2025-01-01"}, "name": "january"},
+            {"resource": "orders", "filters": {"created_at_min": "2025-02-01"}, "name": "february"}
+        ])
+
+        assert [o["id"] for o in result["january"]] == [1]
+        assert [o["id"] for o in result["february"]] == [2]
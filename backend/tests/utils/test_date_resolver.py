@@ -0,0 +1,52 @@
+from datetime import date
+from app.utils.date_resolver import resolve_date_ranges
+from app.core.prompts import build_date_context
+
+REFERENCE = date(2025, 12, 21)  # Sunday
+
+def test_last_n_days():
+    ranges = resolve_date_ranges("How many orders did we get in the last 7 days?", REFERENCE)
+    assert len(ranges) == 1
+    assert ranges[0].phrase == "last 7 days"
+    assert ranges[0].as_filters() == {
+        "created_at_min": "2025-12-14T00:00:00Z",
+        "created_at_max": "2025-12-21T23:59:59Z"
+    }
+
+def test_this_month_and_last_calendar_week():
+    this_month = resolve_date_ranges("Top products this month", REFERENCE)[0]
+    assert this_month.start_iso == "2025-12-01T00:00:00Z"
+    assert this_month.end_iso == "2025-12-21T23:59:59Z"
+
+    last_week = resolve_date_ranges("Sales for last calendar week", REFERENCE)[0]
+    assert last_week.start_iso == "2025-12-08T00:00:00Z"
+    assert last_week.end_iso == "2025-12-14T23:59:59Z"
+
+def test_quarters():
+    q3 = resolve_date_ranges("Revenue in Q3", REFERENCE)[0]
+    assert q3.start_iso == "2025-07-01T00:00:00Z"
+    assert q3.end_iso == "2025-09-30T23:59:59Z"
+
+    # A bare quarter that has not started yet refers to the previous year
+    q1 = resolve_date_ranges("revenue in q1", date(2025, 2, 1))[0]
+    assert q1.start_iso == "2025-01-01T00:00:00Z"
+    q4 = resolve_date_ranges("revenue in q4", date(2025, 2, 1))[0]
+    assert q4.start_iso == "2024-10-01T00:00:00Z"
+
+def test_multiple_phrases_in_order():
+    ranges = resolve_date_ranges("Compare Q4 2024 with last month", REFERENCE)
+    assert [r.phrase for r in ranges] == ["q4 2024", "last month"]
+    assert ranges[1].start_iso == "2025-11-01T00:00:00Z"
+    assert ranges[1].end_iso == "2025-11-30T23:59:59Z"
+
+def test_ambiguous_and_absent_phrases():
+    # "last week" is intentionally left for the agent to clarify
+    assert resolve_date_ranges("Show me sales for last week", REFERENCE) == []
+    assert resolve_date_ranges("May I see the top products?", REFERENCE) == []
+    assert resolve_date_ranges("", REFERENCE) == []
+
+def test_build_date_context():
+    assert build_date_context([]) == ""
+    context = build_date_context(resolve_date_ranges("last 30 days", REFERENCE))
+    assert "Resolved Date Ranges" in context
+    assert "created_at_min=2025-11-21T00:00:00Z" in context
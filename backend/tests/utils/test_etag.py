@@ -0,0 +1,12 @@
+from app.utils.etag import etag_matches, make_etag
+
+def test_etag_matches():
+    etag = make_etag("abc")
+    assert etag == '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"old", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"old"', etag)
+    assert not etag_matches(None, etag)
+    assert make_etag(None) == '"empty"'
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from app.utils.money import to_cents, format_cents, format_cents_series
+
+def test_to_cents_strings():
+    cents = to_cents(["279.27", "10", "-5.5", "1.999", None, "garbage", ""])
+    assert cents.dtype == np.int64
+    assert cents.tolist() == [27927, 1000, -550, 200, 0, 0, 0]
+
+def test_to_cents_numbers():
+    assert to_cents(pd.Series([1.1, 2.5, None])).tolist() == [110, 250, 0]
+    assert to_cents([]).tolist() == []
+
+def test_cents_sum_is_exact():
+    prices = ["0.10"] * 1000 + ["0.20"] * 1000
+    assert int(to_cents(prices).sum()) == 30000
+    # The float path drifts
+    assert sum(float(p) for p in prices) != 300.0
+
+def test_format_cents():
+    assert format_cents(123456) == "$1,234.56"
+    assert format_cents(5) == "$0.05"
+    assert format_cents(-550) == "-$5.50"
+    assert format_cents_series(pd.Series([100, 2599])).tolist() == ["$1.00", "$25.99"]
@@ -0,0 +1,13 @@
+import pytest
+from datetime import datetime
+from app.utils.pagination import decode_cursor, encode_cursor
+
+def test_cursor_round_trip():
+    stamp = datetime(2025, 12, 1, 10, 30, 0, 123456)
+    assert decode_cursor(encode_cursor(stamp, "a|b")) == (stamp, "a|b")
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("%%%")
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(encode_cursor(datetime(2025, 1, 1), "x")[:-4])